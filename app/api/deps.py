@@ -0,0 +1,186 @@
+import importlib
+import time
+from functools import cached_property
+from app.core.config import settings
+
+# Imported lazily to keep cold start short; warm_up() loads them once the worker is serving
+HEAVY_MODULES = ("google.generativeai", "fpdf", "pypdf")
+
+
+class Container:
+    """
+    The service graph of one worker process, built on first use.
+
+    Nothing here runs at import time, so a gunicorn master (or --preload) never creates
+    clients, thread pools or SQLite handles that forked workers would then share; each
+    worker builds its own on its first request or at startup. Services that hold state
+    meant to be shared across workers (result cache, Gemini quota, jobs, revisions)
+    take it from the SQLite backends selected in the settings.
+
+    Endpoints get services through the get_* dependencies below, so tests can swap
+    them with app.dependency_overrides; benchmarks patch the container's attributes.
+    """
+
+    @cached_property
+    def result_cache(self):
+        from app.services.cache import ResultCache
+        return ResultCache.from_settings()
+
+    @cached_property
+    def llm_client(self):
+        from app.services.llm import default_client
+        return default_client()
+
+    @cached_property
+    def editor_service(self):
+        from app.services.editor import ScriptEditorService
+        return ScriptEditorService(cache=self.result_cache, llm=self.llm_client)
+
+    @cached_property
+    def parser_service(self):
+        from app.services.ai_parser import AIParserService
+        return AIParserService(cache=self.result_cache, llm=self.llm_client)
+
+    @cached_property
+    def report_uploader(self):
+        from app.services.storage import storage_from_settings
+        from app.services.uploader import ReportUploader
+        return ReportUploader(
+            storage_from_settings(),
+            workers=settings.REPORT_UPLOAD_WORKERS,
+            queue_size=settings.REPORT_UPLOAD_QUEUE_SIZE,
+            retries=settings.REPORT_UPLOAD_RETRIES,
+            cache=self.result_cache,
+        )
+
+    @cached_property
+    def pdf_service(self):
+        from app.services.pdf_builder import PDFService
+        return PDFService(uploader=self.report_uploader)
+
+    @cached_property
+    def report_service(self):
+        from app.services.reports import ReportService, ReportStore
+        return ReportService(
+            ReportStore(settings.REPORTS_DB_PATH, settings.REPORT_STORE_MAX_BYTES, settings.REPORT_TTL_SECONDS),
+            pdf=self.pdf_service,
+            base_url=settings.PUBLIC_BASE_URL,
+        )
+
+    @cached_property
+    def research_service(self):
+        from app.services.researcher import ResearchService
+        return ResearchService(cache=self.result_cache)
+
+    @cached_property
+    def hook_miner(self):
+        from app.services.transcripts import HookMiner, TranscriptCache, YouTubeTranscriptFetcher
+        return HookMiner(
+            YouTubeTranscriptFetcher(lang.strip() for lang in settings.TRANSCRIPT_LANGUAGES.split(",") if lang.strip()),
+            cache=TranscriptCache(settings.TRANSCRIPTS_DB_PATH, settings.TRANSCRIPT_CACHE_TTL_SECONDS,
+                                  settings.TRANSCRIPT_MISS_TTL_SECONDS),
+            videos=settings.HOOK_VIDEOS,
+            min_seconds=settings.HOOK_MIN_SECONDS,
+            max_seconds=settings.HOOK_MAX_SECONDS,
+            timeout=settings.TRANSCRIPT_TIMEOUT_SECONDS,
+            wait=settings.HOOK_WAIT_SECONDS,
+            summary_chars=settings.HOOK_SUMMARY_CHARS,
+        )
+
+    @cached_property
+    def reader_service(self):
+        from app.services.download_cache import DownloadCache
+        from app.services.pdf_reader import PDFReaderService
+        return PDFReaderService(cache=DownloadCache(settings.DOWNLOAD_CACHE_PATH))
+
+    @cached_property
+    def revision_service(self):
+        from app.services.revisions import RevisionService, RevisionStore
+        return RevisionService(
+            RevisionStore(settings.REVISIONS_DB_PATH, settings.REVISION_TTL_SECONDS),
+            editor=self.editor_service,
+            parser=self.parser_service,
+        )
+
+    @cached_property
+    def admission(self):
+        from app.core.admission import AdmissionController
+        return AdmissionController(settings.VALIDATE_CONCURRENCY, settings.VALIDATE_QUEUE_DEPTH,
+                                   settings.VALIDATE_QUEUE_TIMEOUT_SECONDS)
+
+    @cached_property
+    def pipeline(self):
+        from app.services.pipeline import ValidationPipeline
+        return ValidationPipeline(
+            editor=self.editor_service,
+            parser=self.parser_service,
+            reader=self.reader_service,
+            pdf=self.pdf_service,
+            research=self.research_service,
+            cache=self.result_cache,
+            revisions=self.revision_service,
+            reports=self.report_service if settings.LAZY_REPORTS else None,
+            hooks=self.hook_miner if settings.COMPETITOR_HOOKS else None,
+        )
+
+    @cached_property
+    def batch_validator(self):
+        from app.services.batch import BatchValidator
+        return BatchValidator(self.pipeline, research=self.research_service, pdf=self.pdf_service)
+
+    @cached_property
+    def job_queue(self):
+        from app.services.jobs import JobQueue, JobStore
+        return JobQueue(JobStore(settings.JOBS_DB_PATH), self.pipeline, workers=settings.JOB_WORKERS,
+                        lease=settings.JOB_LEASE_SECONDS, poll=settings.JOB_POLL_SECONDS)
+
+    def warm_up(self):
+        """Loads the heavy SDKs and builds the Gemini models (WARM_UP_ON_START), off the event loop."""
+        start = time.perf_counter()
+        for name in HEAVY_MODULES:
+            importlib.import_module(name)
+        for service in (self.editor_service, self.parser_service):
+            # Stub models (benchmarks) have nothing to warm up
+            if hasattr(service.model, "warm_up"):
+                service.model.warm_up()
+        print(f"🔥 Warm-up done in {time.perf_counter() - start:.2f}s")
+
+    def built(self, name: str):
+        """The service if this process has created it, else None (shutdown only closes what exists)."""
+        return self.__dict__.get(name)
+
+
+container = Container()
+
+
+# --- FASTAPI DEPENDENCIES ---
+def get_pipeline():
+    return container.pipeline
+
+
+def get_batch_validator():
+    return container.batch_validator
+
+
+def get_job_queue():
+    return container.job_queue
+
+
+def get_report_uploader():
+    return container.report_uploader
+
+
+def get_result_cache():
+    return container.result_cache
+
+
+def get_reader_service():
+    return container.reader_service
+
+
+def get_report_service():
+    return container.report_service
+
+
+def get_admission():
+    return container.admission
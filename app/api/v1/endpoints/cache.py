@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from typing import Optional
+from app.api.deps import get_result_cache
+
+router = APIRouter()
+
+@router.get("/cache/stats")
+def cache_stats(result_cache=Depends(get_result_cache)):
+    return result_cache.stats()
+
+@router.delete("/cache")
+def invalidate_cache(script_hash: Optional[str] = None, namespace: Optional[str] = None,
+                     result_cache=Depends(get_result_cache)):
+    """
+    Invalidates cached results.
+    Pass script_hash (from a /validate response) and/or namespace ("audit", "scenes", "report")
+    to narrow it down: script_hash drops every entry made for that script, including the table
+    and report of its patched text. With no parameters the whole cache is cleared.
+    """
+    removed = result_cache.invalidate(script_hash=script_hash, namespace=namespace)
+    return {"removed": removed}
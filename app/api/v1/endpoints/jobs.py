@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.api.deps import get_job_queue, get_report_uploader
+from app.schemas.script import JobRequest, JobStatus
+
+router = APIRouter()
+
+@router.post("/jobs", response_model=JobStatus, status_code=202)
+async def create_job(payload: JobRequest, job_queue=Depends(get_job_queue)):
+    """Queues a validation run and returns immediately. Poll GET /jobs/{id} or pass webhook_url."""
+    if not payload.content and not payload.script_url:
+        raise HTTPException(status_code=400, detail="Provide content or script_url.")
+    job_id = await job_queue.submit(payload)
+    return await job_queue.get(job_id)
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, job_queue=Depends(get_job_queue), report_uploader=Depends(get_report_uploader)):
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if job.result is not None:
+        # Hand out the CDN URL once the background upload has landed
+        job.result.pdf_download_url = await report_uploader.resolve(job.result.pdf_download_url)
+    return job
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from app.api.deps import get_report_service
+from app.services.reports import FORMATS, ReportNotFoundError
+
+router = APIRouter()
+
+@router.get("/reports/{report_id}.{fmt}")
+async def get_report(report_id: str, fmt: str, request: Request, report_service=Depends(get_report_service)):
+    """
+    A validation report as pdf, html or json (edits as before/after plus the edited scenes).
+    Rendered on first request; the ID is a content hash, so responses never change and cache forever.
+    """
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=404, detail=f"Unknown report format '{fmt}'. Use one of: {', '.join(FORMATS)}.")
+    etag = f'"{report_id}.{fmt}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    try:
+        # An expired report is gone, even for a client that still holds its ETag
+        spec = await report_service.spec(report_id)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        data, spec = await report_service.get(report_id, fmt, spec)
+    except ReportNotFoundError:
+        raise HTTPException(status_code=404, detail="Report not found or expired.")
+    headers["Content-Disposition"] = f'inline; filename="{report_service.filename(report_id, spec, fmt)}"'
+    return Response(content=data, media_type=FORMATS[fmt], headers=headers)
@@ -1,86 +1,206 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.requests import ClientDisconnect
+import asyncio
+import json
+import math
 import traceback
-from app.schemas.script import ScriptRequest, ScriptResponse, AnalysisResult
-from app.services.editor import ScriptEditorService
-from app.services.pdf_builder import PDFService
-from app.services.researcher import ResearchService
-from app.services.pdf_reader import PDFReaderService
-from app.services.ai_parser import AIParserService
+from app.api.deps import get_pipeline, get_batch_validator, get_reader_service, get_admission
+from app.schemas.script import ScriptRequest, ScriptResponse, BatchRequest
+from app.core.admission import Overloaded
+from app.core.config import settings
+from app.core.deadlines import DeadlineExceeded, deadline_scope, remaining, request_timeout, run_within
+from app.services.pdf_reader import DownloadTooLargeError
+from app.services.pipeline import EmptyScriptError
+from app.services.llm import LLMUnavailableError
+from app.services.upload import ScriptUpload, UploadFormatError
 
 router = APIRouter()
 
-# Initialize Services
-editor_service = ScriptEditorService()
-pdf_service = PDFService()
-research_service = ResearchService()
-reader_service = PDFReaderService()
-parser_service = AIParserService()
+# Services come from the per-process container (app/api/deps.py), built on first use
+
+# The validation endpoints go through admission control (app/core/admission.py) and run under a
+# deadline (X-Request-Timeout, app/core/deadlines.py) that covers the wait for a slot too.
+# 499: the client closed the connection (nginx convention); nobody reads the response.
+CLIENT_CLOSED = 499
+
+def overloaded(e: Overloaded) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(math.ceil(e.retry_after))})
 
 @router.post("/validate", response_model=ScriptResponse)
-async def validate_script(payload: ScriptRequest):
+async def validate_script(payload: ScriptRequest, request: Request, pipeline=Depends(get_pipeline),
+                          admission=Depends(get_admission)):
+    timeout = request_timeout(request.headers)
     try:
-        # --- 1. GET RAW TEXT ---
-        script_content = ""
-        if payload.script_url:
-            print(f"📥 [Validator] Downloading PDF: {payload.script_url}")
-            script_content = await reader_service.download_and_parse(payload.script_url)
-        elif payload.content:
-            script_content = payload.content
-            
-        if not script_content:
-            raise HTTPException(status_code=400, detail="No text found in input.")
-
-        # --- 2. GET INTELLIGENT EDITS ---
-        print("🤖 [Validator] Agent is auditing the script...")
-        edits, score, critique = await editor_service.analyze_script(script_content, payload.tone)
-        
-        # --- 3. APPLY EDITS TO TEXT ---
-        # The Fuzzy Logic in Editor Service will now find and replace the text
-        final_script_flat = editor_service.apply_patches(script_content, edits)
-        
-        # --- 4. RECONSTRUCT THE TABLE ---
-        print("🏗️  [Validator] Reconstructing original table format...")
-        scenes = parser_service.parse_messy_text_to_json(final_script_flat)
-        
-        # --- 5. GREEN HIGHLIGHT LOGIC ---
-        print(f"🎨 [Validator] Highlighting {len(edits)} edits...")
-        for scene in scenes:
-            scene['is_edited'] = False
-            # Flatten scene text to search for edits
-            row_text = (str(scene.get('visual_cue', '')) + " " + str(scene.get('audio_dialogue', ''))).lower()
-            
-            for edit in edits:
-                # Normalize the improved snippet for matching
-                snippet = edit.improved_snippet.strip().lower()
-                # If we find the improved text in this row, Mark it Green!
-                if len(snippet) > 5 and snippet in row_text:
-                    scene['is_edited'] = True
-                    break
+        with deadline_scope(timeout):
+            async with admission.admit(remaining()):
+                return await run_within(pipeline.run(payload), request.receive)
+
+    except Overloaded as e:
+        raise overloaded(e)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClientDisconnect:
+        return Response(status_code=CLIENT_CLOSED)
+    except EmptyScriptError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except DownloadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except LLMUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+    except Exception as e:
+        print(f"❌ CRITICAL ERROR: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Form fields /validate/upload reads (the script itself is the "file" part)
+UPLOAD_FIELDS = ("tone", "topic", "fetch_competitors", "previous_validation_id")
+
+@router.post("/validate/upload", response_model=ScriptResponse)
+async def validate_upload(request: Request, pipeline=Depends(get_pipeline), reader_service=Depends(get_reader_service),
+                          admission=Depends(get_admission)):
+    """
+    Same as /validate, for a script file (PDF or text) sent as multipart/form-data.
+    Put the form fields (tone, topic, fetch_competitors, previous_validation_id) before
+    the "file" part: the pipeline starts as soon as the file begins, while it is still uploading.
+    """
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > settings.UPLOAD_MAX_BYTES + 64 * 1024:
+        raise HTTPException(status_code=413, detail=f"Upload is {int(declared)} bytes, the limit is {settings.UPLOAD_MAX_BYTES}.")
+    try:
+        upload = ScriptUpload(request.headers.get("content-type", ""), request.stream(),
+                              settings.UPLOAD_MAX_BYTES, settings.UPLOAD_SPOOL_BYTES)
+    except UploadFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    document = None
+    timeout = request_timeout(request.headers)
+    try:
+        with deadline_scope(timeout):
+            # Admitted before reading the body, so a full server doesn't take in uploads it won't process
+            async with admission.admit(remaining()):
+                fields = await upload.receive_fields()
+                payload = ScriptRequest(**{name: value for name, value in fields.items() if name in UPLOAD_FIELDS})
+
+                async def receive_document():
+                    file = await upload.receive_file()
+                    return await reader_service.read_file(file, upload.size, upload.content_type)
 
-        # --- 6. PRINT THE PDF ---
-        print("📄 [Validator] Printing Final PDF...")
-        # We pass score & critique so they appear at the top of the PDF
-        pdf_url = pdf_service.create_table_report(
-            scenes=scenes,
-            score=score,
-            critique=critique,
-            project_name=payload.topic or "Validated_Script"
-        )
-        
-        print(f"✅ [Validator] Done! URL: {pdf_url}")
-
-        # --- 7. RETURN CLEAN RESPONSE ---
-        return ScriptResponse(
-            analysis=AnalysisResult(score=score, critique=critique),
-            applied_edits=edits,
-            competitors=[],
-            # IMPORTANT: We send empty string here so your JSON response isn't huge.
-            # The full script is already inside the PDF URL.
-            final_script="", 
-            pdf_download_url=pdf_url
-        )
+                document = asyncio.create_task(receive_document())
+                # The pipeline reads the body itself: disconnects are watched for once it is all in
+                return await run_within(pipeline.run(payload, document=document), request.receive, after=document)
 
+    except Overloaded as e:
+        raise overloaded(e)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClientDisconnect:
+        return Response(status_code=CLIENT_CLOSED)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    except (EmptyScriptError, UploadFormatError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except DownloadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except LLMUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
     except Exception as e:
         print(f"❌ CRITICAL ERROR: {e}")
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if document is not None and not document.done():
+            document.cancel()
+            await asyncio.gather(document, return_exceptions=True)
+        upload.close()
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/validate/stream")
+async def validate_script_stream(payload: ScriptRequest, request: Request, pipeline=Depends(get_pipeline),
+                                 admission=Depends(get_admission)):
+    """
+    Same pipeline as /validate, streamed as server-sent events:
+    download, audit (score + critique), patch (applied edits), reconstruct,
+    one scene event per row, highlight, render (PDF URL), then done with the
+    full ScriptResponse. Failures arrive as an error event.
+    """
+    events = asyncio.Queue()
+
+    async def progress(stage: str, data: dict):
+        # The final "done" event carries the full response instead
+        if stage != "done":
+            await events.put((stage, data))
+
+    async def run(started: float):
+        try:
+            response = await run_within(pipeline.run(payload, progress=progress))
+            await events.put(("done", response.model_dump(mode="json")))
+        except DeadlineExceeded as e:
+            await events.put(("error", {"status_code": 504, "detail": str(e)}))
+        except EmptyScriptError as e:
+            await events.put(("error", {"status_code": 400, "detail": str(e)}))
+        except DownloadTooLargeError as e:
+            await events.put(("error", {"status_code": 413, "detail": str(e)}))
+        except LLMUnavailableError as e:
+            await events.put(("error", {"status_code": 503, "detail": str(e), "retry_after": math.ceil(e.retry_after)}))
+        except Exception as e:
+            print(f"❌ CRITICAL ERROR: {e}")
+            traceback.print_exc()
+            await events.put(("error", {"status_code": 500, "detail": str(e)}))
+        finally:
+            admission.release(started)
+            await events.put(None)
+
+    with deadline_scope(request_timeout(request.headers)):
+        try:
+            started = await admission.acquire(remaining())
+        except Overloaded as e:
+            raise overloaded(e)
+        # Started here, inside the deadline scope; it holds the slot until the pipeline ends
+        task = asyncio.create_task(run(started))
+
+    async def stream():
+        try:
+            while True:
+                item = await events.get()
+                if item is None:
+                    break
+                yield format_sse(*item)
+        finally:
+            # Client went away: stop paying for the rest of the pipeline
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/validate/batch")
+async def validate_batch(payload: BatchRequest, batch_validator=Depends(get_batch_validator)):
+    """
+    Validates many scripts in one request, streamed as NDJSON: one line per item
+    as it finishes ({"event": "item", "index", "status", "result" | "status_code" + "detail"}),
+    then a summary line ({"event": "summary", ..., "combined_pdf_url"}).
+    A failing item does not stop the rest of the batch.
+    """
+    if not payload.items:
+        raise HTTPException(status_code=400, detail="Provide at least one item.")
+    if len(payload.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BATCH_MAX_ITEMS} items per batch.")
+
+    async def stream():
+        async for line in batch_validator.run(payload):
+            yield line.model_dump_json() + "\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
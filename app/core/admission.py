@@ -0,0 +1,80 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from app.core.telemetry import ADMISSIONS
+
+
+class Overloaded(Exception):
+    """No capacity for the request: 429 when the queue is full, 503 when it waited too long for a slot."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency cap with a bounded queue in front of the validation endpoints (per process).
+
+    Up to `limit` requests run at once; up to `queue` more wait, first come first served,
+    for at most `queue_timeout` seconds (or their own deadline). Anything beyond that is
+    turned away at once instead of piling up behind Gemini. Retry-After is estimated
+    from the recent run time of admitted requests and the length of the queue.
+    """
+
+    def __init__(self, limit: int, queue: int, queue_timeout: float):
+        self.limit = limit
+        self.queue = queue
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(limit)
+        # Exponentially weighted mean run time of admitted requests
+        self._service_seconds = 5.0
+
+    def retry_after(self) -> int:
+        """Seconds until a request sent now would probably get a slot."""
+        return max(1, math.ceil(self._service_seconds * (self.waiting + 1) / self.limit))
+
+    @asynccontextmanager
+    async def admit(self, wait: float):
+        """Holds a slot for the block. Raises Overloaded (waiting at most min(wait, queue_timeout))."""
+        started = await self.acquire(wait)
+        try:
+            yield
+        finally:
+            self.release(started)
+
+    async def acquire(self, wait: float) -> float:
+        """admit() for slots that outlive one block (streamed responses): pass the result to release()."""
+        if self._slots.locked() and self.waiting >= self.queue:
+            ADMISSIONS.inc(result="rejected")
+            raise Overloaded(429, f"Server is at capacity ({self.running} running, {self.waiting} queued). "
+                                  "Retry later.", self.retry_after())
+        queued = self._slots.locked()
+        if queued:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=min(wait, self.queue_timeout))
+            except asyncio.TimeoutError:
+                ADMISSIONS.inc(result="timed_out")
+                raise Overloaded(503, "Server is busy: no capacity freed up in time. Retry later.", self.retry_after())
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+        ADMISSIONS.inc(result="queued" if queued else "admitted")
+        self.running += 1
+        return time.monotonic()
+
+    def release(self, started: float):
+        self.running -= 1
+        self._slots.release()
+        self._service_seconds += 0.2 * (time.monotonic() - started - self._service_seconds)
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "queue": self.queue, "running": self.running, "waiting": self.waiting,
+                "retry_after": self.retry_after()}
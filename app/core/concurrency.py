@@ -0,0 +1,65 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from app.core.config import settings
+
+# Max in-flight calls per pipeline stage. A stage that is full makes its
+# callers wait, without blocking the event loop or the other stages.
+STAGE_LIMITS = {
+    "download": settings.DOWNLOAD_CONCURRENCY,
+    "parse": settings.PARSE_CONCURRENCY,
+    "audit": settings.AUDIT_CONCURRENCY,
+    "reconstruct": settings.RECONSTRUCT_CONCURRENCY,
+    "render": settings.RENDER_CONCURRENCY,
+    "upload": settings.UPLOAD_CONCURRENCY,
+    "research": settings.RESEARCH_CONCURRENCY,
+    "transcripts": settings.TRANSCRIPT_CONCURRENCY,
+    "store": settings.STORE_CONCURRENCY,
+    # Not a pipeline stage: every Gemini call also holds a slot here, across stages
+    "gemini": settings.GEMINI_CONCURRENCY,
+}
+
+_executor = None
+_semaphores = {}
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Shared, bounded thread pool for sync-only and CPU-bound steps."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.WORKER_THREADS, thread_name_prefix="validator")
+    return _executor
+
+
+def get_semaphore(name: str) -> asyncio.Semaphore:
+    if name not in _semaphores:
+        if name not in STAGE_LIMITS:
+            raise KeyError(f"Unknown pipeline stage: {name}")
+        _semaphores[name] = asyncio.Semaphore(STAGE_LIMITS[name])
+    return _semaphores[name]
+
+
+@asynccontextmanager
+async def stage(name: str):
+    """Holds one slot of the stage's concurrency limit for the duration of the block."""
+    async with get_semaphore(name):
+        yield
+
+
+async def run_blocking(stage_name: str, func, *args, **kwargs):
+    """
+    Runs a blocking function in the shared thread pool, under the
+    concurrency limit of the given stage.
+    """
+    async with stage(stage_name):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    _semaphores.clear()
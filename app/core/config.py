@@ -8,10 +8,171 @@ class Settings:
     VERSION: str = "1.0.0"
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY")
     SERPER_API_KEY: str = os.getenv("SERPER_API_KEY")
-    
+
     # Cloudinary Config
     CLOUDINARY_CLOUD_NAME: str = os.getenv("CLOUDINARY_CLOUD_NAME")
     CLOUDINARY_API_KEY: str = os.getenv("CLOUDINARY_API_KEY")
     CLOUDINARY_API_SECRET: str = os.getenv("CLOUDINARY_API_SECRET")
 
-settings = Settings()
\ No newline at end of file
+    # Execution Layer (thread pool for sync-only / CPU-bound work)
+    WORKER_THREADS: int = int(os.getenv("WORKER_THREADS", "8"))
+
+    # Per-stage concurrency limits (max in-flight calls per stage, per process)
+    DOWNLOAD_CONCURRENCY: int = int(os.getenv("DOWNLOAD_CONCURRENCY", "16"))
+    PARSE_CONCURRENCY: int = int(os.getenv("PARSE_CONCURRENCY", "4"))
+    AUDIT_CONCURRENCY: int = int(os.getenv("AUDIT_CONCURRENCY", "8"))
+    RECONSTRUCT_CONCURRENCY: int = int(os.getenv("RECONSTRUCT_CONCURRENCY", "8"))
+    RENDER_CONCURRENCY: int = int(os.getenv("RENDER_CONCURRENCY", "4"))
+    UPLOAD_CONCURRENCY: int = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+    RESEARCH_CONCURRENCY: int = int(os.getenv("RESEARCH_CONCURRENCY", "8"))
+    TRANSCRIPT_CONCURRENCY: int = int(os.getenv("TRANSCRIPT_CONCURRENCY", "4"))
+    # Reads and writes of the SQLite stores (jobs, reports, shared quota) made from async code
+    STORE_CONCURRENCY: int = int(os.getenv("STORE_CONCURRENCY", "8"))
+    # Global cap on in-flight Gemini calls, shared by the audit and reconstruct stages of every request
+    GEMINI_CONCURRENCY: int = int(os.getenv("GEMINI_CONCURRENCY", "8"))
+
+    # Gemini Client (app/services/llm.py): quota, retries, deadlines, circuit breaker, hedging
+    GEMINI_RPM: float = float(os.getenv("GEMINI_RPM", "1000"))
+    GEMINI_TPM: float = float(os.getenv("GEMINI_TPM", "1000000"))
+    GEMINI_MAX_RETRIES: int = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+    GEMINI_BACKOFF_BASE_SECONDS: float = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", "1"))
+    GEMINI_BACKOFF_MAX_SECONDS: float = float(os.getenv("GEMINI_BACKOFF_MAX_SECONDS", "20"))
+    GEMINI_ATTEMPT_TIMEOUT_SECONDS: float = float(os.getenv("GEMINI_ATTEMPT_TIMEOUT_SECONDS", "60"))
+    GEMINI_DEADLINE_SECONDS: float = float(os.getenv("GEMINI_DEADLINE_SECONDS", "120"))
+    # 0 disables hedging (a hedged call is paid twice)
+    GEMINI_HEDGE_AFTER_SECONDS: float = float(os.getenv("GEMINI_HEDGE_AFTER_SECONDS", "0"))
+    GEMINI_BREAKER_FAILURES: int = int(os.getenv("GEMINI_BREAKER_FAILURES", "5"))
+    GEMINI_BREAKER_RESET_SECONDS: float = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30"))
+    GEMINI_BREAKER_WINDOW_SECONDS: float = float(os.getenv("GEMINI_BREAKER_WINDOW_SECONDS", "30"))
+    # Send Gemini calls to another server instead (e.g. http://127.0.0.1:8765 for benchmarks/fake_gemini.py)
+    GEMINI_API_ENDPOINT: str = os.getenv("GEMINI_API_ENDPOINT", "")
+    # Structured output: calls for answers that fail their response schema (0 = fail right away),
+    # and whether table rebuilds are streamed (rows parsed as they arrive, kept if the answer breaks off)
+    GEMINI_REPAIR_ATTEMPTS: int = int(os.getenv("GEMINI_REPAIR_ATTEMPTS", "1"))
+    GEMINI_STREAM_TABLES: bool = os.getenv("GEMINI_STREAM_TABLES", "true").lower() in ("1", "true", "yes")
+
+    # Result Cache ("memory" = in-process LRU, "sqlite" = on-disk, survives restarts)
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", "86400"))
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    CACHE_PATH: str = os.getenv("CACHE_PATH", "validator_cache.sqlite3")
+
+    # Competitor Research (Serper)
+    RESEARCH_TIMEOUT_SECONDS: float = float(os.getenv("RESEARCH_TIMEOUT_SECONDS", "3"))
+    RESEARCH_CACHE_TTL_SECONDS: int = int(os.getenv("RESEARCH_CACHE_TTL_SECONDS", "21600"))
+
+    # Competitor Hooks: the opening HOOK_MIN_SECONDS-HOOK_MAX_SECONDS of the top HOOK_VIDEOS competitor
+    # transcripts (YouTube) are summarized into the audit prompt. The audit waits at most HOOK_WAIT_SECONDS
+    # (counted from the start of the request) for them and runs without them otherwise. Hooks are cached on
+    # disk per video, TRANSCRIPT_MISS_TTL_SECONDS for videos without a usable transcript.
+    COMPETITOR_HOOKS: bool = os.getenv("COMPETITOR_HOOKS", "true").lower() in ("1", "true", "yes")
+    HOOK_VIDEOS: int = int(os.getenv("HOOK_VIDEOS", "3"))
+    HOOK_MIN_SECONDS: float = float(os.getenv("HOOK_MIN_SECONDS", "30"))
+    HOOK_MAX_SECONDS: float = float(os.getenv("HOOK_MAX_SECONDS", "60"))
+    HOOK_WAIT_SECONDS: float = float(os.getenv("HOOK_WAIT_SECONDS", "5"))
+    HOOK_SUMMARY_CHARS: int = int(os.getenv("HOOK_SUMMARY_CHARS", "1500"))
+    TRANSCRIPT_TIMEOUT_SECONDS: float = float(os.getenv("TRANSCRIPT_TIMEOUT_SECONDS", "4"))
+    TRANSCRIPT_LANGUAGES: str = os.getenv("TRANSCRIPT_LANGUAGES", "en")
+    TRANSCRIPTS_DB_PATH: str = os.getenv("TRANSCRIPTS_DB_PATH", "validator_transcripts.sqlite3")
+    TRANSCRIPT_CACHE_TTL_SECONDS: int = int(os.getenv("TRANSCRIPT_CACHE_TTL_SECONDS", str(7 * 86400)))
+    TRANSCRIPT_MISS_TTL_SECONDS: int = int(os.getenv("TRANSCRIPT_MISS_TTL_SECONDS", "86400"))
+
+    # Admission Control (/validate, /validate/upload, /validate/stream), per worker process: at most VALIDATE_CONCURRENCY
+    # requests run at once and VALIDATE_QUEUE_DEPTH more wait up to VALIDATE_QUEUE_TIMEOUT_SECONDS for a slot. Past that,
+    # requests get an immediate 429 (queue full) or 503 (no slot in time), both with Retry-After.
+    VALIDATE_CONCURRENCY: int = int(os.getenv("VALIDATE_CONCURRENCY", "16"))
+    VALIDATE_QUEUE_DEPTH: int = int(os.getenv("VALIDATE_QUEUE_DEPTH", "32"))
+    VALIDATE_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("VALIDATE_QUEUE_TIMEOUT_SECONDS", "10"))
+
+    # Request Deadlines: each validation request has REQUEST_TIMEOUT_SECONDS, or what the client sends in
+    # X-Request-Timeout (capped at REQUEST_MAX_TIMEOUT_SECONDS), for everything including its time in the queue.
+    # Gemini retries and searches stay within it; whatever is still running when it passes (504), or when the
+    # client disconnects, is cancelled.
+    REQUEST_TIMEOUT_SECONDS: float = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "120"))
+    REQUEST_MAX_TIMEOUT_SECONDS: float = float(os.getenv("REQUEST_MAX_TIMEOUT_SECONDS", "300"))
+
+    # Background Jobs
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOBS_DB_PATH: str = os.getenv("JOBS_DB_PATH", "validator_jobs.sqlite3")
+    WEBHOOK_TIMEOUT_SECONDS: float = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", "10"))
+    WEBHOOK_RETRIES: int = int(os.getenv("WEBHOOK_RETRIES", "3"))
+    # Running jobs heartbeat every JOB_LEASE_SECONDS / 3; a job whose worker process stopped is
+    # restarted elsewhere once its lease expires. Idle job workers check the store every JOB_POLL_SECONDS.
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+    JOB_POLL_SECONDS: float = float(os.getenv("JOB_POLL_SECONDS", "2"))
+
+    # Table Reconstruction: the local ScriptParser result is used as-is at or above this confidence,
+    # below it the Gemini rebuild runs
+    LOCAL_PARSER_MIN_CONFIDENCE: float = float(os.getenv("LOCAL_PARSER_MIN_CONFIDENCE", "0.85"))
+
+    # Long scripts: chunk sizes in (locally estimated) tokens for the audit and the table rebuild. Both are
+    # also held under the model's context window, and a table chunk's JSON answer must fit its output limit
+    AUDIT_CHUNK_TOKENS: int = int(os.getenv("AUDIT_CHUNK_TOKENS", "6000"))
+    AUDIT_CHUNK_OVERLAP_TOKENS: int = int(os.getenv("AUDIT_CHUNK_OVERLAP_TOKENS", "375"))
+    RECONSTRUCT_CHUNK_TOKENS: int = int(os.getenv("RECONSTRUCT_CHUNK_TOKENS", "5000"))
+
+    # Context Caching: the static instructions of each prompt template are kept in a Gemini context cache
+    # (per worker process, GEMINI_CACHE_TTL_SECONDS), so calls only send the script part. Gemini only caches
+    # prefixes of GEMINI_CACHE_MIN_TOKENS or more; shorter ones are sent inline, first in the prompt
+    GEMINI_CONTEXT_CACHE: bool = os.getenv("GEMINI_CONTEXT_CACHE", "true").lower() in ("1", "true", "yes")
+    GEMINI_CACHE_TTL_SECONDS: int = int(os.getenv("GEMINI_CACHE_TTL_SECONDS", "3600"))
+    GEMINI_CACHE_MIN_TOKENS: int = int(os.getenv("GEMINI_CACHE_MIN_TOKENS", "4096"))
+
+    # Script Downloads (script_url): per-read timeout, hard size cap, and the on-disk cache of extracted
+    # text, revalidated with conditional GETs (ETag / Last-Modified)
+    DOWNLOAD_TIMEOUT_SECONDS: float = float(os.getenv("DOWNLOAD_TIMEOUT_SECONDS", "30"))
+    DOWNLOAD_MAX_BYTES: int = int(os.getenv("DOWNLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+    DOWNLOAD_CACHE_PATH: str = os.getenv("DOWNLOAD_CACHE_PATH", "validator_downloads.sqlite3")
+
+    # Script Uploads (/validate/upload): size cap on the uploaded file, and how much of it is kept in memory
+    # before the spooled buffer moves to a temporary file on disk
+    UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+    UPLOAD_SPOOL_BYTES: int = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+
+    # Report PDFs: served from STATIC_DIR right away, then uploaded to REPORT_STORAGE ("cloudinary" or "local")
+    # in the background; the local copy is removed LOCAL_REPORT_RETENTION_SECONDS after the upload lands
+    REPORT_STORAGE: str = os.getenv("REPORT_STORAGE", "cloudinary")
+    STATIC_DIR: str = os.getenv("STATIC_DIR", "static")
+    # Origin put in front of report links; unset, each link uses the origin of the request that made it
+    PUBLIC_BASE_URL: str = os.getenv("PUBLIC_BASE_URL", "")
+    REPORT_UPLOAD_WORKERS: int = int(os.getenv("REPORT_UPLOAD_WORKERS", "2"))
+    REPORT_UPLOAD_QUEUE_SIZE: int = int(os.getenv("REPORT_UPLOAD_QUEUE_SIZE", "100"))
+    REPORT_UPLOAD_RETRIES: int = int(os.getenv("REPORT_UPLOAD_RETRIES", "3"))
+    LOCAL_REPORT_RETENTION_SECONDS: int = int(os.getenv("LOCAL_REPORT_RETENTION_SECONDS", "86400"))
+
+    # Lazy Reports: /validate hands out /api/v1/reports/{id}.pdf (also .html and .json), where the ID hashes
+    # the report's contents; each format is rendered on first request and kept in REPORTS_DB_PATH up to
+    # REPORT_STORE_MAX_BYTES (least recently served evicted first). Report contents are kept REPORT_TTL_SECONDS.
+    # LAZY_REPORTS=false renders and uploads the PDF during every /validate call instead.
+    LAZY_REPORTS: bool = os.getenv("LAZY_REPORTS", "true").lower() in ("1", "true", "yes")
+    REPORTS_DB_PATH: str = os.getenv("REPORTS_DB_PATH", "validator_reports.sqlite3")
+    REPORT_STORE_MAX_BYTES: int = int(os.getenv("REPORT_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+    REPORT_TTL_SECONDS: int = int(os.getenv("REPORT_TTL_SECONDS", str(30 * 86400)))
+
+    # Batch Validation (/validate/batch): max items per request, and how many run at once
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "200"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+    # Incremental Re-validation: past validations are kept REVISION_TTL_SECONDS so a resubmitted script
+    # (previous_validation_id) only re-audits changed scenes, with REVISION_CONTEXT_SCENES of context on each
+    # side. Above REVISION_MAX_CHANGED_RATIO changed scenes the whole script is re-audited. The rebuilt table
+    # is stored in blocks of whole scenes of up to REVISION_BLOCK_CHARS, reused when none of their scenes changed.
+    REVISIONS_DB_PATH: str = os.getenv("REVISIONS_DB_PATH", "validator_revisions.sqlite3")
+    REVISION_TTL_SECONDS: int = int(os.getenv("REVISION_TTL_SECONDS", str(7 * 86400)))
+    REVISION_CONTEXT_SCENES: int = int(os.getenv("REVISION_CONTEXT_SCENES", "1"))
+    REVISION_MAX_CHANGED_RATIO: float = float(os.getenv("REVISION_MAX_CHANGED_RATIO", "0.5"))
+    REVISION_BLOCK_CHARS: int = int(os.getenv("REVISION_BLOCK_CHARS", "4000"))
+
+    # Telemetry: per-stage timing spans, Prometheus /metrics and the X-Trace-ID header
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    # Multi-worker Deployment (gunicorn.conf.py): "sqlite" shares the Gemini RPM/TPM buckets between
+    # worker processes on one host ("memory" gives each process the full quota). WARM_UP_ON_START loads
+    # the Gemini / PDF SDKs in the background once a worker is up, instead of on its first request.
+    # Each process reserves shared quota RATE_LIMIT_BATCH of a minute's worth at a time.
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_DB_PATH: str = os.getenv("RATE_LIMIT_DB_PATH", "validator_ratelimit.sqlite3")
+    RATE_LIMIT_BATCH: float = float(os.getenv("RATE_LIMIT_BATCH", "0.05"))
+    WARM_UP_ON_START: bool = os.getenv("WARM_UP_ON_START", "true").lower() in ("1", "true", "yes")
+
+settings = Settings()
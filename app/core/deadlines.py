@@ -0,0 +1,107 @@
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Optional
+from starlette.requests import ClientDisconnect
+from app.core.config import settings
+from app.core.telemetry import REQUEST_CANCELLATIONS
+
+# (time.monotonic() deadline, seconds it was set for). Tasks copy the context they are
+# created in, so every stage of a request (audit chunks, research, hooks...) sees the same one.
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+DEADLINE_HEADER = "x-request-timeout"
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline passed before the pipeline finished; its remaining work was cancelled."""
+
+    def __init__(self, seconds: float):
+        super().__init__(f"Request deadline of {seconds:g}s exceeded.")
+        self.seconds = seconds
+
+
+def request_timeout(headers) -> float:
+    """Seconds the caller allows (X-Request-Timeout), capped at REQUEST_MAX_TIMEOUT_SECONDS; the default otherwise."""
+    try:
+        seconds = float(headers.get(DEADLINE_HEADER, ""))
+    except ValueError:
+        return settings.REQUEST_TIMEOUT_SECONDS
+    if not seconds > 0:
+        return settings.REQUEST_TIMEOUT_SECONDS
+    return min(seconds, settings.REQUEST_MAX_TIMEOUT_SECONDS)
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """Sets the deadline for the current context, `seconds` from now (never later than an enclosing one)."""
+    current = _deadline.get()
+    deadline = (time.monotonic() + seconds, seconds)
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline (0 once passed), or None outside a request."""
+    deadline = _deadline.get()
+    return None if deadline is None else max(0.0, deadline[0] - time.monotonic())
+
+
+def capped(seconds: float) -> float:
+    """`seconds`, or what is left of the request's deadline if that is less."""
+    left = remaining()
+    return seconds if left is None else min(seconds, left)
+
+
+def expired() -> bool:
+    return remaining() == 0.0
+
+
+async def run_within(coro, receive=None, after: Optional[asyncio.Future] = None):
+    """
+    Runs coro until the deadline of the enclosing deadline_scope and returns its result.
+
+    Raises DeadlineExceeded when the deadline passes first (or the pipeline fails once it
+    has passed: Gemini calls give up at the deadline too), and ClientDisconnect when
+    `receive` (the request's ASGI receive) reports that the client went away; either
+    way the pipeline task is cancelled, so no more Gemini / PDF work is done for it.
+    Disconnects are only watched for after `after` is done (e.g. an upload whose body
+    the pipeline itself is still reading).
+    """
+    seconds = _deadline.get()[1]
+    task = asyncio.create_task(coro)
+    watcher = asyncio.create_task(_disconnected(receive, after)) if receive is not None else None
+    try:
+        done, _ = await asyncio.wait({task, watcher} - {None}, timeout=remaining(),
+                                     return_when=asyncio.FIRST_COMPLETED)
+        if task in done:
+            if task.exception() is not None and expired():
+                raise DeadlineExceeded(seconds) from task.exception()
+            return task.result()
+        reason = "disconnect" if watcher in done else "deadline"
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    REQUEST_CANCELLATIONS.inc(reason=reason)
+    if reason == "disconnect":
+        print("🔌 [Validator] Client went away, cancelled the rest of its pipeline")
+        raise ClientDisconnect()
+    print(f"⏱️ [Validator] Deadline of {seconds:g}s passed, cancelled the rest of the pipeline")
+    raise DeadlineExceeded(seconds)
+
+
+async def _disconnected(receive, after: Optional[asyncio.Future]):
+    if after is not None:
+        # wait(), not gather(): cancelling the watcher must not cancel `after`
+        await asyncio.wait({after})
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
@@ -0,0 +1,17 @@
+import sqlite3
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Short-lived connection; the busy timeout covers writers in other worker processes."""
+    return sqlite3.connect(path, timeout=10)
+
+
+def init_db(path: str, *statements: str):
+    """
+    Creates a store's schema. Also switches the file to WAL, so readers in one
+    worker process never block a writer in another (the mode sticks to the file).
+    """
+    with connect(path) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in statements:
+            conn.execute(statement)
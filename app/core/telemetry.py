@@ -0,0 +1,290 @@
+import contextvars
+import functools
+import inspect
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+
+# Everything below is a no-op while this is False: span() hands out a shared
+# do-nothing object and observe()/inc() return before touching any state.
+enabled = settings.METRICS_ENABLED
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+BYTES_BUCKETS = (16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2)
+RATIO_BUCKETS = (0, 0.1, 0.25, 0.5, 0.75, 0.9, 1)
+
+# Per-request trace: the ID echoed in X-Trace-ID, and seconds spent per stage
+# (a dict shared by every task the request spawns, so parallel chunks add up)
+trace_id = contextvars.ContextVar("trace_id", default=None)
+_stage_totals = contextvars.ContextVar("stage_totals", default=None)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        if not enabled:
+            return
+        key = tuple([str(labels.get(name, "")) for name in self.labels])
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self.series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        if not enabled:
+            return
+        key = tuple([str(labels.get(name, "")) for name in self.labels])
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = f'le="{_format_number(bound)}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_number(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# --- METRICS ---
+STAGE_SECONDS = registry.register(Histogram(
+    "validator_stage_seconds", "Time spent per pipeline stage / service step.", ("stage", "outcome")))
+HTTP_SECONDS = registry.register(Histogram(
+    "validator_http_request_seconds", "HTTP request latency (until the last body byte).", ("method", "handler", "status")))
+LLM_TOKENS = registry.register(Histogram(
+    "validator_llm_tokens", "Gemini tokens per successful call (direction: in, out, cached).",
+    ("model", "prompt", "direction"), TOKEN_BUCKETS))
+LLM_CALLS = registry.register(Counter(
+    "validator_llm_calls_total", "Gemini call attempts by outcome.", ("outcome",)))
+CACHE_REQUESTS = registry.register(Counter(
+    "validator_cache_requests_total", "Cache lookups by namespace and result.", ("namespace", "result")))
+PATCH_EDITS = registry.register(Counter(
+    "validator_patch_edits_total", "Suggested edits by patch outcome.", ("status",)))
+PATCH_FUZZY_RATIO = registry.register(Histogram(
+    "validator_patch_fuzzy_ratio", "Share of matched edits that needed the fuzzy matcher, per script.", (), RATIO_BUCKETS))
+PDF_BYTES = registry.register(Histogram(
+    "validator_pdf_bytes", "Size of rendered report PDFs.", ("kind",), BYTES_BUCKETS))
+REPORT_REQUESTS = registry.register(Counter(
+    "validator_report_requests_total", "GET /reports by format and whether the artifact was stored or rendered.", ("format", "result")))
+DOWNLOAD_BYTES = registry.register(Histogram(
+    "validator_download_bytes", "Size of downloaded scripts.", ("format",), BYTES_BUCKETS))
+ADMISSIONS = registry.register(Counter(
+    "validator_admissions_total", "Validation requests by admission result (admitted, queued, rejected, timed_out).", ("result",)))
+REQUEST_CANCELLATIONS = registry.register(Counter(
+    "validator_request_cancellations_total", "Validation pipelines cancelled before they finished, by reason (deadline, disconnect).", ("reason",)))
+TRANSCRIPT_LOOKUPS = registry.register(Counter(
+    "validator_transcript_lookups_total", "Competitor transcript lookups by result (cached, fetched, unavailable, timeout, error).", ("result",)))
+
+
+class _Span:
+    """Times a block (sync `with` or `async with`) into STAGE_SECONDS and the request's stage totals."""
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, stage=self.name, outcome="error" if exc_type else "ok")
+        totals = _stage_totals.get()
+        if totals is not None:
+            totals[self.name] = totals.get(self.name, 0.0) + elapsed
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str):
+    """with span("parse"): ... / async with span("audit"): ..."""
+    return _Span(name) if enabled else _NOOP
+
+
+def traced(name: str):
+    """Decorator form of span() for service methods (sync or async)."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not enabled:
+                    return await func(*args, **kwargs)
+                with _Span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with _Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_trace(incoming: Optional[str] = None) -> Tuple[str, dict]:
+    """Starts a trace in the current context (one per request or background job)."""
+    current = incoming or uuid.uuid4().hex[:16]
+    totals = {}
+    trace_id.set(current)
+    _stage_totals.set(totals)
+    return current, totals
+
+
+def detach():
+    """For long-lived workers started from inside a request: stop adding to that request's trace."""
+    trace_id.set(None)
+    _stage_totals.set(None)
+
+
+def format_stage_totals(totals: dict) -> str:
+    return " · ".join(f"{name} {seconds:.2f}s" for name, seconds in totals.items())
+
+
+class TelemetryMiddleware:
+    """
+    Plain ASGI middleware (safe for streaming responses):
+    - reuses the caller's X-Trace-ID or makes one, and echoes it in the response headers
+    - adds a Server-Timing header with the stage totals known when headers go out
+      (all of them for /validate; streaming responses send headers first)
+    - records HTTP_SECONDS and prints one timing line per request
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled:
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-trace-id":
+                # Keep caller IDs short and header-safe
+                incoming = value.decode("latin-1")[:64].strip() or None
+                break
+        current, totals = start_trace(incoming)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_trace(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-trace-id", current.encode("latin-1")))
+                if totals:
+                    timing = ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+                    headers.append((b"server-timing", timing.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            elapsed = time.perf_counter() - start
+            # Endpoint names, not raw paths, to keep label cardinality bounded
+            handler = getattr(scope.get("route"), "name", None) or "unmatched"
+            HTTP_SECONDS.observe(elapsed, method=scope["method"], handler=handler, status=status)
+            if handler != "metrics":
+                print(f"⏱️  [Trace {current}] {scope['method']} {scope['path']} {status} in {elapsed:.2f}s"
+                      + (f" — {format_stage_totals(totals)}" if totals else ""))
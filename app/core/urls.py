@@ -0,0 +1,40 @@
+import contextvars
+from contextlib import contextmanager
+from starlette.requests import Request
+from app.core.config import settings
+
+# Origin (scheme://host[/root_path]) the current request came in on. Tasks copy the context
+# they are created in, so every stage of the request sees it.
+_request_base_url = contextvars.ContextVar("request_base_url", default="")
+
+
+def public_base_url() -> str:
+    """PUBLIC_BASE_URL if set, else the origin of the current request ("" outside one)."""
+    return (settings.PUBLIC_BASE_URL or _request_base_url.get()).rstrip("/")
+
+
+@contextmanager
+def base_url_scope(base_url: str):
+    """Makes public_base_url() fall back to `base_url` in this context (e.g. a job, run outside its request)."""
+    token = _request_base_url.set(base_url or "")
+    try:
+        yield
+    finally:
+        _request_base_url.reset(token)
+
+
+class BaseURLMiddleware:
+    """
+    Plain ASGI middleware: records each request's origin, so links handed out (report URLs)
+    are absolute even when PUBLIC_BASE_URL is not configured.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with base_url_scope(str(Request(scope).base_url)):
+            await self.app(scope, receive, send)
@@ -1,15 +1,58 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from app.api.v1.endpoints import validator
+import asyncio
+from app.api.deps import container
+from app.api.v1.endpoints import validator, cache, jobs, reports
+from app.core import concurrency, telemetry
+from app.core.urls import BaseURLMiddleware
+from app.core.config import settings
 
 app = FastAPI(title="YouTube Script Validator")
 
+# Trace ID + per-stage timings for every request (no-op when METRICS_ENABLED is off)
+app.add_middleware(telemetry.TelemetryMiddleware)
+# Absolute report links when PUBLIC_BASE_URL is not set
+app.add_middleware(BaseURLMiddleware)
+
 # Mount the static folder so users can download PDFs
 # This means files in /static will be accessible at http://localhost:8000/static/filename.pdf
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", StaticFiles(directory=settings.STATIC_DIR), name="static")
 
 # Connect the router
 app.include_router(validator.router, prefix="/api/v1", tags=["validator"])
+app.include_router(cache.router, prefix="/api/v1", tags=["cache"])
+app.include_router(jobs.router, prefix="/api/v1", tags=["jobs"])
+app.include_router(reports.router, prefix="/api/v1", tags=["reports"])
+
+@app.on_event("startup")
+async def start_job_workers():
+    # Runs in each worker process after the fork, so every client below is per-process
+    container.report_uploader.start()
+    await container.job_queue.start()
+    if settings.WARM_UP_ON_START:
+        # Heavy SDK imports load in the background: the worker takes traffic right away
+        asyncio.get_running_loop().run_in_executor(concurrency.get_executor(), container.warm_up)
+
+@app.on_event("shutdown")
+async def shutdown_worker_pool():
+    if container.built("job_queue") is not None:
+        await container.job_queue.stop()
+    # Reports still queued stay available from /static
+    if container.built("report_uploader") is not None:
+        await container.report_uploader.stop()
+    for name in ("research_service", "reader_service"):
+        service = container.built(name)
+        if service is not None:
+            await service.aclose()
+    concurrency.shutdown()
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint."""
+    if not telemetry.enabled:
+        return PlainTextResponse("Metrics are disabled (METRICS_ENABLED=false).\n", status_code=404)
+    return PlainTextResponse(telemetry.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/")
 def root():
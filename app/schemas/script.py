@@ -10,6 +10,8 @@ class ScriptRequest(BaseModel):
     tone: str = "engaging" 
     topic: str = "General"
     fetch_competitors: bool = True
+    # validation_id of an earlier version of this script: only the changed scenes are re-audited
+    previous_validation_id: Optional[str] = None
 
 # OUTPUT: What we send back
 class Edit(BaseModel):
@@ -17,13 +19,94 @@ class Edit(BaseModel):
     improved_snippet: str
     reason: str
 
+# LLM OUTPUT: Response schemas the Gemini calls are held to (see llm.response_schema)
+class ScriptAudit(BaseModel):
+    final_score: int
+    critique: List[str]
+    edits: List[Edit]
+
+class SceneRow(BaseModel):
+    scene_number: int
+    visual_cue: str
+    audio_dialogue: str
+
+class PatchOutcome(BaseModel):
+    edit_index: int
+    status: str  # applied | fuzzy | rejected
+    # Character span of the replaced text in the submitted script
+    start: Optional[int] = None
+    end: Optional[int] = None
+    reason: Optional[str] = None  # rejected only: not_found | conflict | empty
+
 class AnalysisResult(BaseModel):
     score: int
     critique: List[str]
 
+class RevisionSummary(BaseModel):
+    previous_validation_id: str
+    # False if the previous validation expired or used another tone (everything was redone)
+    reused: bool = False
+    scenes_total: int = 0
+    scenes_changed: int = 0
+    scenes_audited: int = 0
+    # Characters sent to the audit, context included
+    audited_chars: int = 0
+    table_blocks_reused: int = 0
+    table_blocks_rebuilt: int = 0
+
 class ScriptResponse(BaseModel):
     analysis: AnalysisResult
     applied_edits: List[Edit]
+    patch_report: List[PatchOutcome] = []
     competitors: List[dict] = []
     final_script: str
-    pdf_download_url: Optional[str] = None
\ No newline at end of file
+    pdf_download_url: Optional[str] = None
+    # Content hash of the submitted script, used to invalidate cached results
+    script_hash: Optional[str] = None
+    # Pass as previous_validation_id when resubmitting a revised version of this script
+    validation_id: Optional[str] = None
+    revision: Optional[RevisionSummary] = None
+    # Content address of the report: GET /api/v1/reports/{report_id}.pdf, .html or .json
+    report_id: Optional[str] = None
+
+# BATCH: Many scripts in one request, results streamed back as NDJSON lines
+class BatchRequest(BaseModel):
+    items: List[ScriptRequest]
+    # Also render every successful item into one combined PDF (reported in the summary line)
+    combined_pdf: bool = False
+
+class BatchItemResult(BaseModel):
+    event: str = "item"
+    index: int
+    status: str  # ok | error
+    result: Optional[ScriptResponse] = None
+    status_code: Optional[int] = None
+    detail: Optional[str] = None
+
+class BatchSummary(BaseModel):
+    event: str = "summary"
+    total: int
+    unique: int
+    succeeded: int
+    failed: int
+    combined_pdf_url: Optional[str] = None
+
+# JOBS: Background validation with polling / webhook completion
+class JobRequest(ScriptRequest):
+    # Optional URL that receives a POST with the final JobStatus
+    webhook_url: Optional[str] = None
+
+class JobProgress(BaseModel):
+    stage: str
+    at: float
+    data: dict = {}
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str  # queued | running | succeeded | failed
+    stage: Optional[str] = None
+    progress: List[JobProgress] = []
+    result: Optional[ScriptResponse] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
@@ -1,57 +1,141 @@
-import google.generativeai as genai
-import json
-import os
+import asyncio
 import re
+from contextlib import aclosing
+from typing import List, Optional
+from app.core.config import settings
+from app.core.concurrency import stage
+from app.services.cache import script_hash
+from app.schemas.script import SceneRow
+from app.services.chunker import plan_chunks, split_scenes, stitch_scenes
+from app.services.json_stream import JSONArrayStream
+from app.services.llm import default_client, GeminiModel, json_config, describe_invalid, LLMUnavailableError
+from app.services.prompts import TABLE, input_budget, chars_for_tokens, model_limits
+from app.services.script_parser import ScriptParser
+
+MODEL_NAME = 'gemini-2.0-flash'
+# Versioned in app/services/prompts.py
+PROMPT_VERSION = TABLE.key
+TABLE_CONFIG = json_config(List[SceneRow])
+# The answer repeats the input as JSON rows: its tokens per input token (keys, quoting, scene numbers)
+TABLE_OUTPUT_RATIO = 1.3
 
 class AIParserService:
-    def __init__(self):
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+    def __init__(self, cache=None, llm=None):
+        self.model = GeminiModel(MODEL_NAME)
+        self.llm = llm or default_client()
+        self.cache = cache
+        self.local_parser = ScriptParser()
 
-    def parse_messy_text_to_json(self, messy_text: str) -> list:
+    async def parse_messy_text_to_json(self, messy_text: str, source: Optional[str] = None) -> list:
         """
         Takes raw script text and reconstructs the exact Table JSON 
         required by the PDF Builder.
+        Well-formed tables are parsed locally; Gemini only runs when the local parse is not confident.
+        source is the script the user submitted (messy_text is its patched text, or part of it):
+        the cached table is filed under its hash, so DELETE /cache?script_hash= drops it too.
         """
-        prompt = f"""
-        I have a YouTube script that lost its table formatting. 
-        Please reconstruct it into a list of scenes so I can print it as a table again.
-
-        RULES:
-        1. "Visual Cue" column usually contains "VEO PROMPT".
-        2. "Audio/Dialogue" column contains the spoken words.
-        3. Keep the exact text content, just structure it.
-
-        OUTPUT JSON FORMAT:
-        [
-            {{
-                "scene_number": 1,
-                "visual_cue": "Full visual description...",
-                "audio_dialogue": "Spoken text..."
-            }}
-        ]
+        parsed = self.local_parser.parse(messy_text)
+        if parsed.confidence >= settings.LOCAL_PARSER_MIN_CONFIDENCE:
+            print(f"⚡ Local parser: {len(parsed.scenes)} scenes ({parsed.layout}, confidence {parsed.confidence})")
+            return parsed.scenes
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key("scenes", source or messy_text, script_hash(messy_text), PROMPT_VERSION, MODEL_NAME)
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                print(f"⚡ Table cache hit: {len(cached)} scenes")
+                return cached
+
+        # Long inputs are rebuilt chunk by chunk (whole scenes per chunk) in parallel and stitched back
+        budget = self._chunk_budget()
+        chunks = plan_chunks(messy_text, chars_for_tokens(messy_text, budget))
+        if len(chunks) > 1:
+            print(f"✂️ Rebuilding table in {len(chunks)} chunks")
+        results = await asyncio.gather(*[self._reconstruct_chunk(chunk.text) for chunk in chunks])
+        scenes = stitch_scenes([chunk_scenes for chunk_scenes, _ in results])
 
-        RAW INPUT TEXT:
-        {messy_text[:20000]} 
+        if cache_key is not None and all(ok for _, ok in results):
+            await self.cache.aset(cache_key, scenes)
+        return scenes
+
+    async def _reconstruct_chunk(self, messy_text: str) -> tuple:
+        """
+        Returns (scenes, ok). Rows are validated against SceneRow as they stream in; if the
+        answer breaks off or goes bad, the complete rows are kept and only the text after
+        them is sent again. ok is False when the lossless fallback had to be used.
         """
-        
+        rows, error = await self._stream_rows(self._table_prompt(messy_text))
+
+        # --- TARGETED REPAIR ---
+        for _ in range(settings.GEMINI_REPAIR_ATTEMPTS):
+            # Asking again is pointless while Gemini itself is unavailable
+            if error is None or isinstance(error, LLMUnavailableError):
+                break
+            remainder = self._remainder(messy_text, rows) if rows else messy_text
+            if remainder is None:
+                # The rows don't match the input closely enough to tell where they stopped
+                rows, remainder = [], messy_text
+            if not remainder.strip():
+                error = None
+                break
+            print(f"🩹 Table answer unusable ({describe_invalid(error)}); keeping {len(rows)} rows, repairing the rest")
+            more, error = await self._stream_rows(self._table_prompt(remainder, error))
+            rows = stitch_scenes([rows, more])
+
+        if error is None:
+            return rows, True
+        print(f"❌ Table Reconstruction Failed: {describe_invalid(error)}")
+        remainder = self._remainder(messy_text, rows) if rows else None
+        if remainder is not None:
+            # Keep the rows that did arrive; only the rest gets the rough fallback
+            return stitch_scenes([rows, self._fallback(remainder)]), False
+        return self._fallback(messy_text), False
+
+    def _chunk_budget(self) -> int:
+        """Input tokens per table chunk: its JSON answer has to fit the model's output limit."""
+        _, max_output = model_limits(MODEL_NAME)
+        cap = min(settings.RECONSTRUCT_CHUNK_TOKENS, int(max_output / TABLE_OUTPUT_RATIO))
+        return input_budget(MODEL_NAME, TABLE, cap, max_output)
+
+    def _table_prompt(self, messy_text: str, error: Optional[Exception] = None):
+        note = ""
+        if error is not None:
+            note = f"\nNOTE: A previous answer for this text could not be used ({describe_invalid(error)}). Return the complete JSON array.\n"
+        return TABLE.render(note=note, text=messy_text)
+
+    async def _stream_rows(self, prompt) -> tuple:
+        """(rows, error): every row that arrived complete and valid, and why the rest didn't (None if nothing failed)."""
+        stream = JSONArrayStream()
+        rows = []
         try:
-            response = self.model.generate_content(prompt)
-            clean_json = response.text.strip()
-            
-            # Clean up markdown if Gemini adds it
-            if "```json" in clean_json:
-                clean_json = clean_json.split("```json")[1].split("```")[0]
-            elif "```" in clean_json:
-                clean_json = clean_json.split("```")[1].split("```")[0]
-                
-            return json.loads(clean_json)
-            
+            async with stage("reconstruct"):
+                if settings.GEMINI_STREAM_TABLES:
+                    async with aclosing(self.llm.stream(self.model, prompt, generation_config=TABLE_CONFIG)) as pieces:
+                        async for piece in pieces:
+                            for item in stream.feed(piece):
+                                rows.append(SceneRow.model_validate(item).model_dump())
+                else:
+                    response = await self.llm.generate(self.model, prompt, generation_config=TABLE_CONFIG)
+                    for item in stream.feed(response.text):
+                        rows.append(SceneRow.model_validate(item).model_dump())
+            stream.close()
         except Exception as e:
-            print(f"❌ Table Reconstruction Failed: {e}")
-            # Fallback: Return text as one big row so data isn't lost
-            return [{
-                "scene_number": 1, 
-                "visual_cue": "Error parsing table format.", 
-                "audio_dialogue": messy_text[:1000]
-            }]
\ No newline at end of file
+            return rows, e
+        return rows, None
+
+    def _remainder(self, messy_text: str, rows: list) -> Optional[str]:
+        """The input after the last row's text, or None if that text can't be found in it."""
+        last = rows[-1]
+        words = re.findall(r"\S+", last["audio_dialogue"] or last["visual_cue"])[-8:]
+        if not words:
+            return None
+        matches = list(re.finditer(r"\s+".join(re.escape(word) for word in words), messy_text))
+        return messy_text[matches[-1].end():] if matches else None
+
+    def _fallback(self, messy_text: str) -> list:
+        # Every scene as its own row, with all of its text: the table is rough but nothing is lost
+        return [
+            {"scene_number": i + 1, "visual_cue": "Error parsing table format.", "audio_dialogue": scene.strip()}
+            for i, scene in enumerate(scene for scene in split_scenes(messy_text) if scene.strip())
+        ]
@@ -0,0 +1,104 @@
+import asyncio
+import traceback
+from typing import AsyncIterator, List
+from app.core.config import settings
+from app.schemas.script import BatchRequest, BatchItemResult, BatchSummary, ScriptRequest
+from app.services.cache import script_hash
+from app.services.llm import LLMUnavailableError
+from app.services.pdf_reader import DownloadTooLargeError
+from app.services.pipeline import EmptyScriptError
+
+
+class BatchValidator:
+    """
+    Runs many ScriptRequests through the ValidationPipeline and yields results as they finish.
+
+    - Identical items (same script, tone, topic) run once; every duplicate gets the result.
+    - Competitor research runs once per topic and is shared by the items that want it.
+    - Items run BATCH_CONCURRENCY at a time; their Gemini calls share the global
+      "gemini" limit with every other request.
+    - A failing item yields an error line; the rest of the batch carries on.
+    """
+
+    def __init__(self, pipeline, research, pdf):
+        self.pipeline = pipeline
+        self.research = research
+        self.pdf = pdf
+
+    def dedupe_key(self, item: ScriptRequest) -> tuple:
+        source = script_hash(item.content) if item.content else item.script_url
+        return (source, item.tone, item.topic, item.fetch_competitors, item.previous_validation_id)
+
+    async def run(self, batch: BatchRequest) -> AsyncIterator[BatchItemResult]:
+        """Yields one BatchItemResult per input item (in completion order), then a BatchSummary."""
+        groups = {}
+        for index, item in enumerate(batch.items):
+            groups.setdefault(self.dedupe_key(item), []).append(index)
+
+        # --- ONE SEARCH PER TOPIC ---
+        research = {}
+        for item in batch.items:
+            topic = item.topic.strip().lower()
+            if item.fetch_competitors and topic not in research:
+                research[topic] = asyncio.create_task(self.research.search_videos(item.topic))
+
+        limit = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+        sections = {}
+
+        async def run_group(indexes: List[int]) -> tuple:
+            item = batch.items[indexes[0]]
+            section = {"project_name": item.topic or "Validated_Script", "scenes": [], "score": 0, "critique": []}
+
+            async def progress(stage: str, data: dict):
+                # Keep what the combined PDF needs
+                if stage == "audit":
+                    section["score"], section["critique"] = data["score"], data["critique"]
+                elif stage == "scene":
+                    section["scenes"].append(data["scene"])
+
+            competitors = research.get(item.topic.strip().lower()) if item.fetch_competitors else None
+            async with limit:
+                try:
+                    response = await self.pipeline.run(item, progress=progress, competitors=competitors)
+                except EmptyScriptError as e:
+                    return indexes, BatchItemResult(index=indexes[0], status="error", status_code=400, detail=str(e))
+                except DownloadTooLargeError as e:
+                    return indexes, BatchItemResult(index=indexes[0], status="error", status_code=413, detail=str(e))
+                except LLMUnavailableError as e:
+                    return indexes, BatchItemResult(index=indexes[0], status="error", status_code=503, detail=str(e))
+                except Exception as e:
+                    print(f"❌ [Batch] Item {indexes[0]} failed: {e}")
+                    traceback.print_exc()
+                    return indexes, BatchItemResult(index=indexes[0], status="error", status_code=500, detail=str(e))
+            sections[indexes[0]] = section
+            return indexes, BatchItemResult(index=indexes[0], status="ok", result=response)
+
+        tasks = [asyncio.create_task(run_group(indexes)) for indexes in groups.values()]
+        succeeded = failed = 0
+        try:
+            for finished in asyncio.as_completed(tasks):
+                indexes, outcome = await finished
+                for index in indexes:
+                    if outcome.status == "ok":
+                        succeeded += 1
+                    else:
+                        failed += 1
+                    yield outcome.model_copy(update={"index": index})
+
+            combined_pdf_url = None
+            if batch.combined_pdf and sections:
+                print(f"📄 [Batch] Printing combined PDF for {len(sections)} scripts...")
+                combined_pdf_url = await self.pdf.create_combined_report([sections[i] for i in sorted(sections)])
+
+            yield BatchSummary(
+                total=len(batch.items),
+                unique=len(groups),
+                succeeded=succeeded,
+                failed=failed,
+                combined_pdf_url=combined_pdf_url,
+            )
+        finally:
+            # Client went away (or we are done): stop whatever is still running
+            for task in tasks + list(research.values()):
+                if not task.done():
+                    task.cancel()
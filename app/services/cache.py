@@ -0,0 +1,178 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from app.core.config import settings
+from app.core.concurrency import run_blocking
+from app.core.sqlite import connect, init_db
+from app.core.telemetry import CACHE_REQUESTS
+
+
+def normalize_script(text: str) -> str:
+    """Collapses whitespace so re-pasted scripts hash to the same key."""
+    return re.sub(r'\s+', ' ', text or "").strip()
+
+
+def script_hash(text: str) -> str:
+    return hashlib.sha256(normalize_script(text).encode("utf-8")).hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-process LRU with per-entry TTL. Values are stored as JSON text so callers can't mutate cached data."""
+
+    blocking = False
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete_matching(self, fragment: str = "") -> int:
+        with self._lock:
+            keys = [k for k in self._data if fragment in k]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    """On-disk backend, survives restarts. One short-lived connection per call keeps it thread-safe."""
+
+    # Hits the disk: ResultCache runs it in the thread pool from async code
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        init_db(path, "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    def _connect(self):
+        return connect(self.path)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            return row[0]
+
+    def set(self, key: str, value: str, ttl: float):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, time.time() + ttl))
+
+    def delete_matching(self, fragment: str = "") -> int:
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM cache WHERE instr(key, ?) > 0", (fragment,))
+            return cursor.rowcount
+
+    def size(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM cache WHERE expires_at >= ?", (time.time(),)).fetchone()[0]
+
+
+class ResultCache:
+    """
+    Content-addressed cache for pipeline results.
+    Keys look like "<namespace>:<script_hash>:<variant>", where script_hash is the hash of
+    the script the user submitted and variant hashes everything else that changes the
+    result (tone, prompt version, model, the patched text or excerpt it was made from...).
+    So every entry derived from one script can be dropped by its hash.
+    Async code uses aget/aset, which keep a disk backend off the event loop.
+    """
+
+    def __init__(self, backend, ttl: float = 86400):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = {}
+        self.misses = {}
+
+    @classmethod
+    def from_settings(cls) -> "ResultCache":
+        if settings.CACHE_BACKEND == "sqlite":
+            backend = SQLiteCacheBackend(settings.CACHE_PATH)
+        else:
+            backend = MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+        return cls(backend, ttl=settings.CACHE_TTL_SECONDS)
+
+    def make_key(self, namespace: str, text: str, *variant) -> str:
+        variant_hash = hashlib.sha256(json.dumps(variant, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+        return f"{namespace}:{script_hash(text)}:{variant_hash}"
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._loaded(key, self.backend.get(key))
+
+    async def aget(self, key: str) -> Optional[Any]:
+        if self.backend.blocking:
+            return self._loaded(key, await run_blocking("store", self.backend.get, key))
+        return self.get(key)
+
+    def _loaded(self, key: str, value: Optional[str]) -> Optional[Any]:
+        namespace = key.split(":", 1)[0]
+        if value is None:
+            self.misses[namespace] = self.misses.get(namespace, 0) + 1
+            CACHE_REQUESTS.inc(namespace=namespace, result="miss")
+            return None
+        self.hits[namespace] = self.hits.get(namespace, 0) + 1
+        CACHE_REQUESTS.inc(namespace=namespace, result="hit")
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.backend.set(key, json.dumps(value), ttl if ttl is not None else self.ttl)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None):
+        if self.backend.blocking:
+            await run_blocking("store", self.set, key, value, ttl)
+        else:
+            self.set(key, value, ttl)
+
+    def invalidate(self, script_hash: Optional[str] = None, namespace: Optional[str] = None) -> int:
+        """Drops entries for one script and/or namespace. No arguments clears everything."""
+        if namespace and script_hash:
+            fragment = f"{namespace}:{script_hash}:"
+        elif namespace:
+            fragment = f"{namespace}:"
+        elif script_hash:
+            fragment = f":{script_hash}:"
+        else:
+            fragment = ""
+        return self.backend.delete_matching(fragment)
+
+    def stats(self) -> dict:
+        namespaces = sorted(set(self.hits) | set(self.misses))
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "hits": sum(self.hits.values()),
+            "misses": sum(self.misses.values()),
+            "by_namespace": {
+                ns: {"hits": self.hits.get(ns, 0), "misses": self.misses.get(ns, 0)} for ns in namespaces
+            },
+        }
+
@@ -0,0 +1,130 @@
+import re
+from typing import List
+from app.services.highlighter import snippet_tokens
+
+# Lines where a new scene starts: "Scene 3", "| 3 |", or a table row number ("3 Wide shot...")
+SCENE_BOUNDARY_RE = re.compile(
+    r'^(?=[ \t]*(?:(?:scene|sc\.?)[ \t]*#?[ \t]*\d+|\|[ \t]*\d+[ \t]*\||\d{1,4}(?:[ \t]|$)))',
+    re.IGNORECASE | re.MULTILINE,
+)
+PARAGRAPH_RE = re.compile(r'\n[ \t]*\n')
+
+
+class Chunk:
+    """
+    One slice of a long script.
+    text = script[start:end]; [core_start, end) is the part this chunk is responsible for,
+    [start, core_start) is overlap carried over from the previous chunk for context.
+    """
+
+    def __init__(self, script: str, start: int, core_start: int, end: int):
+        self.start = start
+        self.core_start = core_start
+        self.end = end
+        self.text = script[start:end]
+
+    @property
+    def core_length(self) -> int:
+        return self.end - self.core_start
+
+
+def _split_points(text: str) -> List[int]:
+    points = [m.start() for m in SCENE_BOUNDARY_RE.finditer(text)]
+    if len(points) < 2:
+        # No recognizable scene markers: fall back to paragraphs
+        points = [m.end() for m in PARAGRAPH_RE.finditer(text)]
+    return sorted(set([0] + [p for p in points if 0 < p < len(text)] + [len(text)]))
+
+
+def split_scenes(text: str) -> List[str]:
+    """The script cut on scene boundaries (paragraphs if it has no scene markers); "".join() gives it back."""
+    points = _split_points(text)
+    return [text[start:end] for start, end in zip(points, points[1:])]
+
+
+def _segments(text: str, max_chars: int) -> List[tuple]:
+    """(start, end) segments on scene boundaries; oversized scenes are cut at the last newline/space."""
+    points = _split_points(text)
+    segments = []
+    for start, end in zip(points, points[1:]):
+        while end - start > max_chars:
+            window = text[start:start + max_chars]
+            cut = max(window.rfind("\n"), window.rfind(" "))
+            cut = start + (cut + 1 if cut > 0 else max_chars)
+            segments.append((start, cut))
+            start = cut
+        if end > start:
+            segments.append((start, end))
+    return segments
+
+
+def plan_chunks(text: str, max_chars: int, overlap_chars: int = 0) -> List[Chunk]:
+    """
+    Packs whole scenes into chunks of at most max_chars (plus overlap). Each chunk
+    is prefixed with up to overlap_chars of the preceding scenes for context.
+    """
+    if len(text) <= max_chars:
+        return [Chunk(text, 0, 0, len(text))]
+
+    segments = _segments(text, max_chars)
+    groups = []
+    for seg in segments:
+        if groups and seg[1] - groups[-1][0][0] <= max_chars:
+            groups[-1].append(seg)
+        else:
+            groups.append([seg])
+
+    chunks = []
+    seg_index = 0
+    for group in groups:
+        core_start, end = group[0][0], group[-1][1]
+        # Walk back over whole preceding scenes while they fit in the overlap budget
+        start = core_start
+        back = seg_index - 1
+        while back >= 0 and core_start - segments[back][0] <= overlap_chars:
+            start = segments[back][0]
+            back -= 1
+        chunks.append(Chunk(text, start, core_start, end))
+        seg_index += len(group)
+    return chunks
+
+
+def merge_audits(results: list) -> tuple:
+    """
+    results: [(chunk, (edits, score, critique)), ...] in script order.
+    Edits are deduplicated on their original snippet (chunks overlap), critiques on
+    their text, and the score is weighted by how much of the script each chunk owns.
+    """
+    edits = []
+    seen_snippets = set()
+    critique = []
+    seen_points = set()
+    weighted = 0.0
+    total = 0
+    for chunk, (chunk_edits, chunk_score, chunk_critique) in results:
+        for edit in chunk_edits:
+            key = snippet_tokens(edit.original_snippet)
+            if key in seen_snippets:
+                continue
+            seen_snippets.add(key)
+            edits.append(edit)
+        for point in chunk_critique:
+            key = " ".join(str(point).lower().split())
+            if key not in seen_points:
+                seen_points.add(key)
+                critique.append(point)
+        weighted += chunk_score * chunk.core_length
+        total += chunk.core_length
+    score = round(weighted / total) if total else 0
+    return edits, score, critique
+
+
+def stitch_scenes(scene_lists: List[list]) -> list:
+    """Concatenates per-chunk scene lists and renumbers them 1..N."""
+    scenes = []
+    for chunk_scenes in scene_lists:
+        for scene in chunk_scenes:
+            scene = dict(scene)
+            scene["scene_number"] = len(scenes) + 1
+            scenes.append(scene)
+    return scenes
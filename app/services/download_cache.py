@@ -0,0 +1,44 @@
+import json
+import time
+from typing import Optional
+from app.core.sqlite import connect, init_db
+from app.services.script_document import ScriptDocument
+
+
+class DownloadCache:
+    """
+    On-disk cache of extracted script documents, keyed by URL.
+    Each entry keeps the ETag / Last-Modified it was downloaded with, so the
+    reader can revalidate with a conditional GET and skip both the download
+    and the PDF parsing when the server answers 304 Not Modified.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        init_db(
+            path,
+            "CREATE TABLE IF NOT EXISTS downloads ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, document TEXT NOT NULL, fetched_at REAL NOT NULL)",
+        )
+
+    def _connect(self):
+        return connect(self.path)
+
+    def get(self, url: str) -> Optional[dict]:
+        """{"etag", "last_modified", "document": ScriptDocument} or None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT etag, last_modified, document FROM downloads WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "document": ScriptDocument.from_dict(json.loads(row[2]))}
+
+    def set(self, url: str, etag: Optional[str], last_modified: Optional[str], document: ScriptDocument):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO downloads (url, etag, last_modified, document, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, json.dumps(document.to_dict()), time.time()),
+            )
+
+    def delete(self, url: str) -> int:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM downloads WHERE url = ?", (url,)).rowcount
@@ -1,61 +1,149 @@
-import json
+import asyncio
 import re
-import google.generativeai as genai
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from app.core.config import settings
-from app.schemas.script import Edit
+from app.core.concurrency import stage
+from app.core.telemetry import PATCH_EDITS, PATCH_FUZZY_RATIO
+from pydantic import ValidationError
+from app.schemas.script import Edit, ScriptAudit
+from app.services.cache import script_hash
+from app.services.chunker import plan_chunks, merge_audits
+from app.services.llm import default_client, GeminiModel, json_config, describe_invalid, LLMUnavailableError
+from app.services.patcher import PatchEngine, PatchReport, APPLIED, FUZZY, REJECTED
+from app.services.prompts import AUDIT, AUDIT_HOOKS, AUDIT_REPAIR, estimate_tokens, input_budget, chars_for_tokens
+
+MODEL_NAME = 'gemini-2.0-flash'
+# Versioned in app/services/prompts.py, so cached audits from an older prompt are not reused
+PROMPT_VERSION = AUDIT.key
+AUDIT_CONFIG = json_config(ScriptAudit)
+# Room left for the answer (score, critique, edits) when budgeting a chunk
+AUDIT_OUTPUT_TOKENS = 2048
+# Markers around the revised scenes of an excerpt audit
+REVISED_START = "[[REVISED]]"
+REVISED_END = "[[/REVISED]]"
 
 class ScriptEditorService:
-    def __init__(self):
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
-        genai.configure(api_key=settings.GEMINI_API_KEY)
+    def __init__(self, cache=None, llm=None):
+        self.model = GeminiModel(MODEL_NAME)
+        # Shared rate limits / retries / circuit breaker; the SDK model itself is built on first call
+        self.llm = llm or default_client()
+        self.cache = cache
+        self.patcher = PatchEngine()
+
+    async def analyze_script(self, script: str, tone: str, hooks: str = "") -> Tuple[List[Edit], int, List[str]]:
+        """
+        Audits the whole script. hooks, if given, summarizes how competitor videos open
+        (transcripts.HookMiner.summary) and goes into every chunk's prompt.
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key("audit", script, tone.strip().lower(), PROMPT_VERSION, MODEL_NAME, hooks)
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                print(f"--- ⚡ AUDIT CACHE HIT: {cached['score']}/100 ---")
+                return [Edit(**item) for item in cached["edits"]], cached["score"], cached["critique"]
 
-    async def analyze_script(self, script: str, tone: str) -> Tuple[List[Edit], int, List[str]]:
         print(f"\n--- 🧠 STARTING RUTHLESS AUDIT FOR TONE: {tone.upper()} ---")
-        
-        # PROMPT: We explicitly tell it to capture UNIQUE short phrases to make matching easier
-        prompt = f"""
-        Act as a Ruthless YouTube Script Editor. 
-        Target Tone: {tone}
-
-        INSTRUCTIONS:
-        1. Score the script (0-100) on Hooks, Retention, and Payoff.
-        2. If score < 100, you MUST provide at least 3 edits.
-        3. CRITICAL: When choosing "original_snippet", pick a unique 5-10 word phrase that exists EXACTLY in the text. Do not quote huge paragraphs.
-
-        RETURN JSON ONLY:
-        {{
-            "final_score": 75,
-            "critique": ["Hook is weak", "Pacing is slow"],
-            "edits": [
-                {{
-                    "original_snippet": "existing text here",
-                    "improved_snippet": "better text here",
-                    "reason": "Fixing weak hook"
-                }}
-            ]
-        }}
-
-        SCRIPT:
-        "{script[:25000]}"
+
+        # Long scripts are split on scene boundaries and audited concurrently
+        # (bounded by the "audit" stage limit) instead of being truncated
+        budget = input_budget(MODEL_NAME, AUDIT, settings.AUDIT_CHUNK_TOKENS, AUDIT_OUTPUT_TOKENS)
+        if hooks:
+            budget = max(1, budget - estimate_tokens(hooks))
+        chunks = plan_chunks(script, chars_for_tokens(script, budget), chars_for_tokens(script, settings.AUDIT_CHUNK_OVERLAP_TOKENS))
+        if len(chunks) > 1:
+            print(f"--- ✂️ Script is {len(script)} chars: auditing {len(chunks)} chunks in parallel ---")
+        results = await asyncio.gather(
+            *[self._audit_chunk(chunk.text, tone, self._part_note(i + 1, len(chunks)), hooks) for i, chunk in enumerate(chunks)],
+            return_exceptions=True,
+        )
+
+        succeeded = []
+        errors = []
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                print(f"❌ Analysis Error (chars {chunk.core_start}-{chunk.end}): {result}")
+                errors.append(result)
+            else:
+                succeeded.append((chunk, result))
+        if not succeeded:
+            # No made-up score 0: the caller reports the failure and nothing gets cached
+            if isinstance(errors[0], LLMUnavailableError):
+                raise errors[0]
+            raise LLMUnavailableError(f"AI analysis failed: {errors[0]}") from errors[0]
+
+        edits, final_score, critique = merge_audits(succeeded)
+        print(f"--- 🧠 AUDIT COMPLETE: {final_score}/100 ---")
+        print(f"--- Found {len(edits)} edits to apply ---")
+
+        # Only complete audits are cached; a partial one is retried next time
+        if cache_key is not None and len(succeeded) == len(chunks):
+            await self.cache.aset(cache_key, {
+                "edits": [edit.model_dump() for edit in edits],
+                "score": final_score,
+                "critique": critique,
+            })
+
+        return edits, final_score, critique
+
+    async def analyze_excerpt(self, before: str, revised: str, after: str, tone: str, hooks: str = "",
+                              source: Optional[str] = None) -> Tuple[List[Edit], int, List[str]]:
+        """
+        Audits only `revised`, with the scenes around it as read-only context
+        (incremental re-validation). The score and edits cover the revised part only.
+        Raises on failure, like a single audit chunk. source (the whole submitted script)
+        files the cached result under that script's hash, as parse_messy_text_to_json does.
         """
-        
-        try:
-            response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-            data = json.loads(response.text)
-            
-            final_score = data.get("final_score", 0)
-            critique = data.get("critique", [])
-            edits = [Edit(**item) for item in data.get("edits", []) if item.get("original_snippet")]
-            
-            print(f"--- 🧠 AUDIT COMPLETE: {final_score}/100 ---")
-            print(f"--- Found {len(edits)} edits to apply ---")
-            
-            return edits, final_score, critique
-            
-        except Exception as e:
-            print(f"❌ Analysis Error: {e}")
-            return [], 0, ["Error: AI Analysis Failed"]
+        script = f"{before}{REVISED_START}\n{revised}\n{REVISED_END}{after}"
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key("audit", source or script, script_hash(script), tone.strip().lower(), PROMPT_VERSION,
+                                            MODEL_NAME, "excerpt", hooks)
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                return [Edit(**item) for item in cached["edits"]], cached["score"], cached["critique"]
+
+        scope = (
+            f"NOTE: This is an excerpt of a longer script the writer has revised. Only the text between "
+            f"{REVISED_START} and {REVISED_END} changed: score and edit that part only, the rest is context.\n"
+        )
+        edits, score, critique = await self._audit_chunk(script, tone, scope, hooks)
+        edits = [edit for edit in edits if REVISED_START not in edit.original_snippet and REVISED_END not in edit.original_snippet]
+
+        if cache_key is not None:
+            await self.cache.aset(cache_key, {"edits": [edit.model_dump() for edit in edits], "score": score, "critique": critique})
+        return edits, score, critique
+
+    def _part_note(self, part: int, parts: int) -> str:
+        return f"NOTE: This is part {part} of {parts} of a longer script. Audit only this part.\n" if parts > 1 else ""
+
+    async def _audit_chunk(self, script: str, tone: str, scope: str = "", hooks: str = "") -> Tuple[List[Edit], int, List[str]]:
+        """One Gemini audit call. Raises on any failure so the caller can merge what succeeded."""
+        prompt = AUDIT.render(tone=tone, scope=scope, hooks=AUDIT_HOOKS.format(hooks=hooks) if hooks else "", script=script)
+
+        async with stage("audit"):
+            response = await self.llm.generate(self.model, prompt, generation_config=AUDIT_CONFIG)
+            audit = await self._validated_audit(response.text)
+
+        edits = [edit for edit in audit.edits if edit.original_snippet]
+        return edits, audit.final_score, audit.critique
+
+    async def _validated_audit(self, text: str) -> ScriptAudit:
+        """
+        Parses the answer against ScriptAudit. A malformed answer gets a repair call that
+        only sends the broken JSON back (much cheaper than auditing the script again).
+        """
+        for attempt in range(settings.GEMINI_REPAIR_ATTEMPTS + 1):
+            try:
+                return ScriptAudit.model_validate_json(text)
+            except ValidationError as e:
+                if attempt == settings.GEMINI_REPAIR_ATTEMPTS:
+                    raise
+                reason = describe_invalid(e)
+            print(f"🩹 Audit answer unusable ({reason}), asking for a repair")
+            prompt = AUDIT_REPAIR.render(reason=reason, answer=text)
+            response = await self.llm.generate(self.model, prompt, generation_config=AUDIT_CONFIG)
+            text = response.text
 
     def normalize_text(self, text: str) -> str:
         """Removes all whitespace/newlines to compare purely characters."""
@@ -65,31 +153,23 @@ class ScriptEditorService:
         """
         Smart Patching: Replaces text even if whitespace/newlines don't match perfectly.
         """
-        final_script = original_script
-        
-        for edit in edits:
-            original_snippet = edit.original_snippet
-            improved_snippet = edit.improved_snippet
-            
-            # 1. Try Exact Match (Fastest)
-            if original_snippet in final_script:
-                final_script = final_script.replace(original_snippet, improved_snippet, 1)
-                continue
-            
-            # 2. Try "Flexible Whitespace" Match (Regex)
-            # This turns "hello world" into "hello\s+world" to match newlines
-            escaped_snippet = re.escape(original_snippet)
-            # Replace escaped spaces with \s+ (match any space/newline)
-            flexible_pattern = escaped_snippet.replace(r'\ ', r'\s+')
-            
-            match = re.search(flexible_pattern, final_script, re.IGNORECASE)
-            if match:
-                print(f"✅ Fuzzy Match Found: replaced '{original_snippet[:20]}...'")
-                # We replace exactly what we found in the original text
-                final_script = final_script[:match.start()] + improved_snippet + final_script[match.end():]
-                continue
-
-            # 3. Fallback: If AI Hallucinated slightly, we skip to avoid breaking the script
-            print(f"⚠️ Failed to apply edit: '{original_snippet[:30]}...' (Text not found)")
-            
-        return final_script
\ No newline at end of file
+        return self.patch_script(original_script, edits).text
+
+    def patch_script(self, original_script: str, edits: List[Edit]) -> PatchReport:
+        """
+        Same as apply_patches, but returns the full PatchReport
+        (which edits were applied, fuzzy-applied or rejected, and where).
+        """
+        report = self.patcher.apply(original_script, edits)
+        for status in (APPLIED, FUZZY, REJECTED):
+            PATCH_EDITS.inc(report.count(status), status=status)
+        if edits:
+            PATCH_FUZZY_RATIO.observe(report.fuzzy_rate)
+        for outcome in report.outcomes:
+            snippet = edits[outcome.edit_index].original_snippet
+            if outcome.status == FUZZY:
+                print(f"✅ Fuzzy Match Found: replaced '{snippet[:20]}...'")
+            elif outcome.status == REJECTED:
+                # If AI Hallucinated slightly, we skip to avoid breaking the script
+                print(f"⚠️ Failed to apply edit: '{snippet[:30]}...' ({outcome.reason})")
+        return report
@@ -0,0 +1,142 @@
+import re
+from collections import deque
+from typing import Dict, List, Tuple
+
+# Snippets this short match too much incidental text to be a useful highlight
+MIN_SNIPPET_LENGTH = 6
+
+# Words and individual punctuation marks; whitespace only separates tokens, so
+# "morning\n  routine" and "Morning routine" produce the same token sequence.
+_TOKEN = re.compile(r'\w+|[^\w\s]')
+
+
+def tokenize(text: str) -> Tuple[List[str], List[int], List[int]]:
+    """
+    Splits text into lowercased tokens.
+    Returns (tokens, starts, ends) where starts/ends are each token's char offsets in the raw text.
+    """
+    tokens, starts, ends = [], [], []
+    for match in _TOKEN.finditer(text or ""):
+        tokens.append(match.group().lower())
+        starts.append(match.start())
+        ends.append(match.end())
+    return tokens, starts, ends
+
+
+def snippet_tokens(text: str) -> Tuple[str, ...]:
+    return tuple(match.group().lower() for match in _TOKEN.finditer(text or ""))
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: finds every occurrence of every pattern in one pass over a sequence,
+    in O(len(sequence) + matches) regardless of how many patterns there are.
+    Patterns and the scanned sequence are token tuples (see tokenize), not raw characters.
+    """
+
+    def __init__(self, patterns: List[Tuple[str, ...]]):
+        self.patterns = patterns
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for index, pattern in enumerate(patterns):
+            self._add(pattern, index)
+        self._build_links()
+
+    def _add(self, pattern: Tuple[str, ...], index: int):
+        node = 0
+        for ch in pattern:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = nxt
+        self.output[node].append(index)
+
+    def _build_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and ch not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(ch, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def iter_matches(self, sequence):
+        """Yields (start, end, pattern_index) for every match, as sequence indexes with end exclusive."""
+        node = 0
+        goto, fail, output, patterns = self.goto, self.fail, self.output, self.patterns
+        for i, ch in enumerate(sequence):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for index in output[node]:
+                yield i + 1 - len(patterns[index]), i + 1, index
+
+
+def merge_spans(spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class HighlightService:
+    FIELDS = ("visual_cue", "audio_dialogue")
+
+    def build_matcher(self, edits) -> AhoCorasick:
+        """One automaton per request, over the tokenized improved snippets."""
+        patterns = set()
+        for edit in edits:
+            snippet = edit.improved_snippet.strip()
+            if len(snippet) >= MIN_SNIPPET_LENGTH:
+                tokens = snippet_tokens(snippet)
+                if tokens:
+                    patterns.add(tokens)
+        return AhoCorasick(sorted(patterns))
+
+    def find_spans(self, matcher: AhoCorasick, text: str) -> List[Tuple[int, int]]:
+        """Character spans (start, end) of improved text within the raw cell text."""
+        if not matcher.patterns or not text:
+            return []
+        # Most cells contain no edit, so char offsets are only worked out once something matched
+        lowered_tokens = _TOKEN.findall(text.lower())
+        matches = list(matcher.iter_matches(lowered_tokens))
+        if not matches:
+            return []
+        tokens, starts, ends = tokenize(text)
+        if tokens != lowered_tokens:
+            # Rare case-folding differences (e.g. "İ") shift token boundaries: match again on exact tokens
+            matches = list(matcher.iter_matches(tokens))
+        spans = [(starts[start], ends[end - 1]) for start, end, _ in matches]
+        return merge_spans(spans)
+
+    def highlight_scene(self, matcher: AhoCorasick, scene: dict) -> dict:
+        """
+        Marks one scene in place with:
+          - highlights: {"visual_cue": [[start, end], ...], "audio_dialogue": [...]} (raw-text char spans)
+          - is_edited: True if any span was found
+        """
+        highlights: Dict[str, list] = {}
+        for field in self.FIELDS:
+            spans = self.find_spans(matcher, str(scene.get(field, '') or ''))
+            if spans:
+                highlights[field] = [list(span) for span in spans]
+        scene['highlights'] = highlights
+        scene['is_edited'] = bool(highlights)
+        return scene
+
+    def highlight_scenes(self, scenes: list, edits) -> list:
+        matcher = self.build_matcher(edits)
+        for scene in scenes:
+            self.highlight_scene(matcher, scene)
+        return scenes
@@ -0,0 +1,282 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import traceback
+import uuid
+from typing import Optional
+import httpx
+from app.core.config import settings
+from app.core import telemetry
+from app.core.concurrency import run_blocking
+from app.core.urls import base_url_scope, public_base_url
+from app.core.sqlite import connect, init_db
+from app.schemas.script import JobRequest, JobStatus, ScriptRequest
+from app.services.pipeline import STAGES
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobStore:
+    """
+    SQLite-backed job table, so queued and running jobs survive a restart.
+    It is also the queue shared by every worker process: a job runs in whichever
+    process claims it first, and a running job whose owner stops heartbeating is
+    claimed again once its lease runs out.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        init_db(path, """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                stage TEXT,
+                payload TEXT NOT NULL,
+                webhook_url TEXT,
+                progress TEXT NOT NULL DEFAULT '[]',
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                owner TEXT,
+                heartbeat_at REAL,
+                base_url TEXT
+            )
+        """)
+        with self._connect() as conn:
+            # Tables created before jobs were shared between processes, or remembered their origin
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("heartbeat_at", "REAL"), ("base_url", "TEXT")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+    def _connect(self):
+        return connect(self.path)
+
+    def create(self, request: JobRequest, base_url: str = "") -> str:
+        """base_url: origin of the submitting request, for the links in the result (see app.core.urls)."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        payload = request.model_dump_json(exclude={"webhook_url"})
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, webhook_url, base_url, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, payload, request.webhook_url, base_url, now, now),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, status, stage, progress, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return JobStatus(
+            job_id=row[0],
+            status=row[1],
+            stage=row[2],
+            progress=json.loads(row[3]),
+            result=json.loads(row[4]) if row[4] else None,
+            error=row[5],
+            created_at=row[6],
+            updated_at=row[7],
+        )
+
+    def load_request(self, job_id: str) -> tuple:
+        with self._connect() as conn:
+            row = conn.execute("SELECT payload, webhook_url, base_url FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return ScriptRequest.model_validate_json(row[0]), row[1], row[2]
+
+    def set_status(self, job_id: str, owner: str, status: str, result: Optional[str] = None,
+                   error: Optional[str] = None) -> bool:
+        """Finishes a running job. False if another process has taken it over (its result wins)."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ? AND owner = ? AND status = ?",
+                (status, result, error, time.time(), job_id, owner, RUNNING),
+            )
+            return cursor.rowcount == 1
+
+    def claim(self, owner: str, lease: float) -> Optional[tuple]:
+        """
+        Atomically takes the oldest queued job, or a running one whose owner missed its lease,
+        and (re)starts it with a clean progress log. Returns (job_id, resumed) or None.
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, status FROM jobs WHERE status = ? OR (status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)) "
+                "ORDER BY created_at LIMIT 1",
+                (QUEUED, RUNNING, now - lease),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, stage = NULL, progress = '[]', result = NULL, error = NULL, "
+                    "owner = ?, heartbeat_at = ?, updated_at = ? WHERE id = ?",
+                    (RUNNING, owner, now, now, row[0]),
+                )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return (row[0], row[1] == RUNNING) if row is not None else None
+
+    def heartbeat(self, job_id: str, owner: str) -> bool:
+        """Extends the lease. False if another process has taken the job over."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND owner = ? AND status = ?",
+                (time.time(), job_id, owner, RUNNING),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, owner: str) -> int:
+        """Puts the owner's running jobs back in the queue (clean shutdown), so they restart right away elsewhere."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, heartbeat_at = NULL, updated_at = ? WHERE owner = ? AND status = ?",
+                (QUEUED, time.time(), owner, RUNNING),
+            )
+            return cursor.rowcount
+
+    def add_progress(self, job_id: str, owner: str, stage: str, data: dict):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT progress FROM jobs WHERE id = ? AND owner = ?", (job_id, owner)).fetchone()
+            if row is None:
+                return
+            progress = json.loads(row[0])
+            progress.append({"stage": stage, "at": now, "data": data})
+            conn.execute(
+                "UPDATE jobs SET stage = ?, progress = ?, updated_at = ? WHERE id = ? AND owner = ?",
+                (stage, json.dumps(progress, default=str), now, job_id, owner),
+            )
+
+class JobQueue:
+    """
+    Runs the validation pipeline in the background with a fixed pool of worker tasks.
+    Workers claim jobs from the JobStore, so any worker process can run a job submitted
+    to another one, and jobs of a crashed process restart (from the first stage) once
+    their lease expires. A local submit wakes the workers; otherwise they poll.
+    Every store call runs in the shared thread pool, never on the event loop.
+    """
+
+    def __init__(self, store: JobStore, pipeline, workers: int = 4, lease: float = 60, poll: float = 2):
+        self.store = store
+        self.pipeline = pipeline
+        self.workers = workers
+        self.lease = lease
+        self.poll = poll
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._wakeup = None
+        self._tasks = []
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        released = await run_blocking("store", self.store.release, self.owner)
+        if released:
+            print(f"⏸️ [Jobs] Re-queued {released} interrupted jobs")
+
+    async def submit(self, request: JobRequest) -> str:
+        job_id = await run_blocking("store", self.store.create, request, public_base_url())
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[JobStatus]:
+        return await run_blocking("store", self.store.get, job_id)
+
+    async def _worker(self):
+        while True:
+            # Cleared before claiming, so a submit that lands in between still wakes us
+            self._wakeup.clear()
+            claimed = await run_blocking("store", self.store.claim, self.owner, self.lease)
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            job_id, resumed = claimed
+            if resumed:
+                print(f"🔁 [Jobs] Resuming {job_id} (its worker stopped heartbeating)")
+            await self._run(job_id)
+
+    async def _heartbeat(self, job_id: str, run: asyncio.Task):
+        """Extends the lease until cancelled; once another worker has taken the job over, cancels `run` and returns."""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            if not await run_blocking("store", self.store.heartbeat, job_id, self.owner):
+                print(f"⚠️ [Jobs] Lost the lease on {job_id}, another worker took it over: stopping here")
+                run.cancel()
+                return
+
+    async def _run(self, job_id: str):
+        payload, webhook_url, base_url = await run_blocking("store", self.store.load_request, job_id)
+        # Jobs run outside any request: the job ID is the trace ID
+        _, timings = telemetry.start_trace(job_id[:16])
+
+        async def progress(stage: str, data: dict):
+            # Only stage milestones go into the job log, not the per-scene events
+            if stage in STAGES:
+                await run_blocking("store", self.store.add_progress, job_id, self.owner, stage, data)
+
+        # Runs outside the submitting request: links in the result use that request's origin
+        with base_url_scope(base_url):
+            run = asyncio.create_task(self.pipeline.run(payload, progress=progress))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, run))
+        try:
+            response = await run
+            finished = await run_blocking("store", self.store.set_status, job_id, self.owner, SUCCEEDED,
+                                          result=response.model_dump_json())
+            if finished:
+                print(f"✅ [Jobs] {job_id} finished" + (f" — {telemetry.format_stage_totals(timings)}" if timings else ""))
+        except asyncio.CancelledError:
+            if heartbeat.done() and not heartbeat.cancelled():
+                # The heartbeat stopped the pipeline: the new owner runs the job and sends the webhook
+                return
+            # Shutting down: stop() puts the job back in the queue
+            raise
+        except Exception as e:
+            print(f"❌ [Jobs] {job_id} failed: {e}")
+            traceback.print_exc()
+            finished = await run_blocking("store", self.store.set_status, job_id, self.owner, FAILED, error=str(e))
+        finally:
+            heartbeat.cancel()
+
+        if not finished:
+            print(f"⚠️ [Jobs] {job_id} was taken over by another worker before it finished here: result dropped")
+            return
+        if webhook_url:
+            await self._notify(webhook_url, await self.get(job_id))
+
+    async def _notify(self, webhook_url: str, job: JobStatus):
+        body = job.model_dump(mode="json")
+        async with httpx.AsyncClient(timeout=settings.WEBHOOK_TIMEOUT_SECONDS) as client:
+            for attempt in range(settings.WEBHOOK_RETRIES):
+                try:
+                    response = await client.post(webhook_url, json=body)
+                    response.raise_for_status()
+                    return
+                except Exception as e:
+                    print(f"⚠️ [Jobs] Webhook attempt {attempt + 1} failed for {job.job_id}: {e}")
+                    if attempt + 1 < settings.WEBHOOK_RETRIES:
+                        await asyncio.sleep(2 ** attempt)
+        print(f"❌ [Jobs] Giving up on webhook for {job.job_id}")
@@ -0,0 +1,108 @@
+import json
+from typing import Any, List
+
+
+class JSONStreamError(ValueError):
+    """The streamed text is not the JSON array it should be."""
+
+
+class JSONArrayStream:
+    """
+    Incremental parser for a JSON array that arrives in pieces (a streamed Gemini answer).
+    feed() returns every element completed by the new text, so callers can use rows
+    before the answer is finished. Text around the array (code fences) is ignored.
+    Parsing stops at the first broken element; close() then raises with the reason.
+
+        stream = JSONArrayStream()
+        for piece in pieces:
+            for item in stream.feed(piece): ...
+        stream.close()  # raises JSONStreamError if the array never closed or broke
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.started = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.item_start = None
+        self.items = 0
+        self.error = None
+
+    def feed(self, text: str) -> List[Any]:
+        if self.finished:
+            return []
+        self.buffer += text
+        completed = []
+        buffer = self.buffer
+        i = self.position
+        while i < len(buffer):
+            char = buffer[i]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif not self.started:
+                if char == "[":
+                    self.started = True
+                    self.depth = 1
+                elif char == "{":
+                    self.error = JSONStreamError("Expected a JSON array, got an object")
+                    self.finished = True
+                    break
+            elif char == '"':
+                self.in_string = True
+                if self.item_start is None:
+                    self.item_start = i
+            elif char in "[{":
+                if self.depth == 1 and self.item_start is None:
+                    self.item_start = i
+                self.depth += 1
+            elif char in "]}":
+                self.depth -= 1
+                if self.depth == 0:
+                    self._complete(buffer, i, completed)
+                    self.finished = True
+                    break
+            elif char == "," and self.depth == 1:
+                self._complete(buffer, i, completed)
+                if self.error is not None:
+                    break
+            elif self.depth == 1 and self.item_start is None and not char.isspace():
+                # Scalar element (number, true, null...)
+                self.item_start = i
+            i += 1
+
+        # Drop what is consumed, keeping the element in progress
+        keep = self.item_start if self.item_start is not None else i
+        self.buffer = buffer[keep:]
+        self.position = i - keep
+        if self.item_start is not None:
+            self.item_start = 0
+        return completed
+
+    def _complete(self, buffer: str, end: int, completed: list):
+        if self.item_start is None:
+            return
+        raw = buffer[self.item_start:end]
+        self.item_start = None
+        try:
+            completed.append(json.loads(raw))
+        except json.JSONDecodeError as e:
+            self.error = JSONStreamError(f"Element {self.items + 1} is not valid JSON: {e}")
+            self.finished = True
+            return
+        self.items += 1
+
+    def close(self):
+        if self.error is not None:
+            raise self.error
+        if not self.started:
+            raise JSONStreamError("No JSON array in the answer")
+        if not self.finished:
+            raise JSONStreamError(f"Answer ended inside the JSON array after {self.items} complete element(s)")
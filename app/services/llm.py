@@ -0,0 +1,692 @@
+import asyncio
+import functools
+import random
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import AsyncIterator, Optional
+from pydantic import TypeAdapter, ValidationError
+from google.api_core import exceptions as google_exceptions
+from app.core.config import settings
+from app.core.concurrency import stage, get_executor, run_blocking
+from app.core.deadlines import capped
+from app.core.sqlite import connect, init_db
+from app.core import telemetry
+from app.core.telemetry import span, LLM_CALLS, LLM_TOKENS
+from app.services.prompts import Prompt, PromptTemplate, estimate_tokens
+
+# Errors worth another attempt: quota bursts, overloaded or flaky backend, timeouts
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+    asyncio.TimeoutError,
+    ConnectionError,
+)
+
+
+class LLMUnavailableError(RuntimeError):
+    """Gemini could not answer: retries exhausted, deadline passed, or the circuit is open."""
+
+    def __init__(self, message: str, retry_after: float = 0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(LLMUnavailableError):
+    pass
+
+
+_configured = False
+
+
+def configure_genai():
+    """
+    One place for the SDK configuration (it is global to the process).
+    GEMINI_API_ENDPOINT points the SDK at another server, e.g. benchmarks/fake_gemini.py.
+    """
+    global _configured
+    import google.generativeai as genai
+    _configured = True
+    if settings.GEMINI_API_ENDPOINT:
+        genai.configure(api_key=settings.GEMINI_API_KEY or "local", transport="rest",
+                        client_options={"api_endpoint": settings.GEMINI_API_ENDPOINT})
+    else:
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+
+
+class GeminiModel:
+    """
+    genai.GenerativeModel(name), built on first use. Importing and configuring the SDK
+    is most of the app's cold start, and its clients must not be created before a
+    worker process forks, so nothing touches it until the first Gemini call.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.model_name = f"models/{name}"
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import google.generativeai as genai
+                    if not _configured:
+                        configure_genai()
+                    self._model = genai.GenerativeModel(self.name)
+        return self._model
+
+    def warm_up(self):
+        self._get()
+
+    def generate_content(self, *args, **kwargs):
+        return self._get().generate_content(*args, **kwargs)
+
+    async def generate_content_async(self, *args, **kwargs):
+        return await self._get().generate_content_async(*args, **kwargs)
+
+
+# JSON Schema keywords Gemini's response_schema understands (an OpenAPI subset)
+SCHEMA_KEYWORDS = ("type", "format", "description", "enum", "required")
+
+
+def response_schema(annotation) -> dict:
+    """
+    Gemini response_schema for a pydantic model (or List[model]): $refs inlined,
+    Optional[...] as nullable, and keywords Gemini rejects (title, default...) dropped.
+    A plain dict, so it also works as part of a cache or fixture key.
+    """
+    schema = TypeAdapter(annotation).json_schema()
+    definitions = schema.pop("$defs", {})
+
+    def convert(node: dict) -> dict:
+        if "$ref" in node:
+            node = definitions[node["$ref"].rsplit("/", 1)[-1]]
+        if "anyOf" in node:
+            options = [option for option in node["anyOf"] if option.get("type") != "null"]
+            converted = convert(options[0])
+            if len(options) < len(node["anyOf"]):
+                converted["nullable"] = True
+            return converted
+        converted = {key: node[key] for key in SCHEMA_KEYWORDS if key in node}
+        if "items" in node:
+            converted["items"] = convert(node["items"])
+        if "properties" in node:
+            converted["properties"] = {name: convert(value) for name, value in node["properties"].items()}
+        return converted
+
+    return convert(schema)
+
+
+def json_config(annotation) -> dict:
+    """generation_config for a JSON answer that must match `annotation`."""
+    return {"response_mime_type": "application/json", "response_schema": response_schema(annotation)}
+
+
+def describe_invalid(error: Exception) -> str:
+    """Short reason an answer was rejected, for logs and repair prompts."""
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(str(part) for part in item['loc']) or 'answer'}: {item['msg']}"
+                         for item in error.errors()[:5])
+    return str(error)[:300]
+
+
+class ContextCache:
+    """
+    Gemini context caches holding the static instruction prefix of each prompt template,
+    so calls only send (and pay full price for) their per-call body. One cache per model
+    and template version in each worker process, created on first use and replaced
+    shortly before its TTL runs out.
+
+    Gemini refuses to cache fewer than `min_tokens` tokens: shorter prefixes are sent
+    inline, first in the prompt, where Gemini's implicit prefix caching can still reuse
+    them. If creating a cache fails, that template is sent inline from then on.
+    """
+
+    def __init__(self, ttl: float = 3600, min_tokens: int = 4096):
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        # (model name, template key) -> (GenerativeModel bound to the cache, expires at)
+        self._models = {}
+        self._failed = set()
+        self._lock = threading.Lock()
+
+    def covers(self, model, template: PromptTemplate) -> bool:
+        return (isinstance(model, GeminiModel) and template.prefix_tokens >= self.min_tokens
+                and (model.name, template.key) not in self._failed)
+
+    def model_for(self, model: "GeminiModel", template: PromptTemplate):
+        """The model to send only the body to, or None to send the whole prompt. Blocking on first use."""
+        key = (model.name, template.key)
+        with self._lock:
+            entry = self._models.get(key)
+            # Replaced a minute early, so no call races the expiry
+            if entry is not None and entry[1] - time.time() > 60:
+                return entry[0]
+            if key in self._failed:
+                return None
+            try:
+                import datetime
+                import google.generativeai as genai
+                from google.generativeai import caching
+                model.warm_up()
+                cached = caching.CachedContent.create(model=model.model_name, system_instruction=template.prefix,
+                                                      ttl=datetime.timedelta(seconds=self.ttl))
+                bound = genai.GenerativeModel.from_cached_content(cached)
+            except Exception as e:
+                print(f"⚠️ [LLM] No context cache for {template.key} ({e}), sending its instructions inline")
+                self._failed.add(key)
+                return None
+            self._models[key] = (bound, time.time() + self.ttl)
+            print(f"🗄️ [LLM] Cached the {template.key} instructions ({template.prefix_tokens} tokens) for {self.ttl:.0f}s")
+            return bound
+
+
+class TokenBucket:
+    """
+    Continuously refilled bucket: `per_minute` tokens per minute, holding at most one
+    minute's worth. acquire() waits (without blocking the loop) until enough tokens are in.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, amount: float = 1) -> bool:
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+    def wait_time(self, amount: float = 1) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    async def acquire(self, amount: float = 1):
+        while not self.try_acquire(amount):
+            await asyncio.sleep(self.wait_time(amount))
+
+
+class SQLiteTokenBucket:
+    """
+    TokenBucket whose level lives in a SQLite file, so every worker process on the host
+    draws from one quota instead of each getting the full RPM/TPM. Same interface.
+
+    Quota is reserved from the file in batches (`batch` of a minute's worth, or more for
+    a large request) and handed out from a local reserve, so most calls never touch the
+    file; the reservations that do run in the thread pool, one at a time per bucket.
+    try_acquire() and wait_time() never block: they only see the local reserve and the
+    level of the file at the last reservation.
+    """
+
+    def __init__(self, path: str, name: str, per_minute: float, batch: float = 0.05):
+        self.path = path
+        self.name = name
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.batch = max(1.0, self.capacity * batch)
+        self.reserved = 0.0
+        # (file level, time.time()) as of the last reservation
+        self._level = (self.capacity, time.time())
+        self._pending = None
+        init_db(path, "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+
+    def _take(self, need: float) -> tuple:
+        """
+        Moves max(need, batch) tokens out of the file (as many as it has, but at least
+        `need`, or none). Blocking: one write transaction. Returns (taken, level left).
+        """
+        conn = connect(self.path)
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)).fetchone()
+            now = time.time()
+            tokens = self.capacity if row is None else min(self.capacity, row[0] + max(0.0, now - row[1]) * self.rate)
+            taken = min(tokens, max(need, self.batch)) if tokens >= need else 0.0
+            tokens -= taken
+            conn.execute("INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)", (self.name, tokens, now))
+            conn.execute("COMMIT")
+            return taken, tokens
+        finally:
+            conn.close()
+
+    async def _reserve(self, need: float) -> float:
+        taken, level = await run_blocking("store", self._take, need)
+        self.reserved += taken
+        self._level = (level, time.time())
+        return taken
+
+    def try_acquire(self, amount: float = 1) -> bool:
+        amount = min(amount, self.capacity)
+        if self.reserved >= amount:
+            self.reserved -= amount
+            return True
+        return False
+
+    def wait_time(self, amount: float = 1) -> float:
+        amount = min(amount, self.capacity)
+        level, at = self._level
+        level = min(self.capacity, level + (time.time() - at) * self.rate)
+        return max(0.0, (amount - self.reserved - level) / self.rate)
+
+    async def acquire(self, amount: float = 1):
+        amount = min(amount, self.capacity)
+        while not self.try_acquire(amount):
+            # Concurrent waiters share one reservation; shielded, so a cancelled waiter never drops taken quota
+            if self._pending is None or self._pending.done():
+                self._pending = asyncio.ensure_future(self._reserve(amount - self.reserved))
+            if not await asyncio.shield(self._pending):
+                # Other processes draw from the same file: re-check rather than trust one estimate
+                await asyncio.sleep(max(0.01, self.wait_time(amount)))
+
+
+class CircuitBreaker:
+    """
+    Opens when, within the last `window_seconds`, at least `failure_threshold` calls failed
+    and failures are at least half of all recent outcomes plus the calls still in flight
+    (quota errors come back instantly while good answers take seconds, so in-flight calls
+    count as "not failed yet"). While open it fails fast for `reset_seconds`, then lets a
+    single probe call through (half-open) and closes on success.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30, window_seconds: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.window_seconds = window_seconds
+        self.outcomes = deque()  # (monotonic time, ok)
+        self.in_flight = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "open":
+            retry_after = self.reset_seconds - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError("Gemini circuit is open, failing fast", retry_after=retry_after)
+        if state == "half_open":
+            if self.probing:
+                raise CircuitOpenError("Gemini circuit is half-open, probe in flight", retry_after=1)
+            self.probing = True
+        self.in_flight += 1
+
+    def release(self):
+        """The call ended without telling us anything about Gemini's health (cancelled, bad request)."""
+        self.in_flight = max(0, self.in_flight - 1)
+        self.probing = False
+
+    def record_success(self):
+        self.release()
+        self._record(True)
+        self.opened_at = None
+
+    def record_failure(self):
+        was_probing = self.probing
+        self.release()
+        self._record(False)
+        failures = sum(1 for _, ok in self.outcomes if not ok)
+        tripped = failures >= self.failure_threshold and failures * 2 >= len(self.outcomes) + self.in_flight
+        if was_probing or (tripped and self.opened_at is None):
+            print(f"🔌 [LLM] Circuit opened ({failures} failures in the last {self.window_seconds:.0f}s)")
+            self.opened_at = time.monotonic()
+
+    def _record(self, ok: bool):
+        now = time.monotonic()
+        self.outcomes.append((now, ok))
+        while self.outcomes and self.outcomes[0][0] < now - self.window_seconds:
+            self.outcomes.popleft()
+
+
+class LLMClient:
+    """
+    Shared policy for every Gemini call (audit, table rebuild):
+      - RPM / TPM token buckets sized to the quota, plus the "gemini" concurrency limit
+      - per-attempt timeout inside an overall deadline
+      - jittered exponential backoff on retryable errors
+      - circuit breaker that fails fast while Gemini is down
+      - optional hedging: a second identical request after `hedge_after` seconds, first answer wins
+    Services keep their own model object and pass it in, so tests can swap models per service.
+    """
+
+    def __init__(self, rpm: float, tpm: float, max_retries: int = 4, backoff_base: float = 1.0,
+                 backoff_max: float = 20.0, attempt_timeout: float = 60.0, deadline: float = 90.0,
+                 hedge_after: float = 0.0, breaker: Optional[CircuitBreaker] = None, sync_transport: bool = False,
+                 requests_bucket=None, tokens_bucket=None, context_cache: Optional[ContextCache] = None):
+        self.requests = requests_bucket or TokenBucket(rpm)
+        self.tokens = tokens_bucket or TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+        # The SDK's REST transport has no async path: run its sync call in the worker pool instead
+        self.sync_transport = sync_transport
+        self.stats = {"calls": 0, "retries": 0, "hedges": 0, "failures": 0, "rejected": 0}
+        self.context_cache = context_cache
+        # Per prompt template: {"calls", "in", "out", "cached"} tokens of successful calls
+        self.usage = {}
+
+    @classmethod
+    def from_settings(cls) -> "LLMClient":
+        buckets = {}
+        if settings.RATE_LIMIT_BACKEND == "sqlite":
+            # One quota shared by every worker process
+            buckets = {
+                "requests_bucket": SQLiteTokenBucket(settings.RATE_LIMIT_DB_PATH, "gemini_rpm", settings.GEMINI_RPM,
+                                                     batch=settings.RATE_LIMIT_BATCH),
+                "tokens_bucket": SQLiteTokenBucket(settings.RATE_LIMIT_DB_PATH, "gemini_tpm", settings.GEMINI_TPM,
+                                                   batch=settings.RATE_LIMIT_BATCH),
+            }
+        return cls(
+            rpm=settings.GEMINI_RPM,
+            tpm=settings.GEMINI_TPM,
+            max_retries=settings.GEMINI_MAX_RETRIES,
+            backoff_base=settings.GEMINI_BACKOFF_BASE_SECONDS,
+            backoff_max=settings.GEMINI_BACKOFF_MAX_SECONDS,
+            attempt_timeout=settings.GEMINI_ATTEMPT_TIMEOUT_SECONDS,
+            deadline=settings.GEMINI_DEADLINE_SECONDS,
+            hedge_after=settings.GEMINI_HEDGE_AFTER_SECONDS,
+            breaker=CircuitBreaker(settings.GEMINI_BREAKER_FAILURES, settings.GEMINI_BREAKER_RESET_SECONDS,
+                                   settings.GEMINI_BREAKER_WINDOW_SECONDS),
+            sync_transport=bool(settings.GEMINI_API_ENDPOINT),
+            context_cache=ContextCache(settings.GEMINI_CACHE_TTL_SECONDS, settings.GEMINI_CACHE_MIN_TOKENS)
+            if settings.GEMINI_CONTEXT_CACHE else None,
+            **buckets,
+        )
+
+    async def generate(self, model, prompt, generation_config: Optional[dict] = None, deadline: Optional[float] = None):
+        """
+        model.generate_content(prompt) under the shared policy. prompt is a str or a
+        prompts.Prompt (whose instruction prefix may come from the context cache).
+        Raises LLMUnavailableError when no answer arrives within the deadline / retry budget,
+        and the original exception for non-retryable errors (bad request, auth...).
+        """
+        loop = asyncio.get_running_loop()
+        # The request's own deadline (app/core/deadlines.py) wins when it is sooner
+        deadline_at = loop.time() + capped(deadline or self.deadline)
+        cost = estimate_tokens(str(prompt))
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if not await self._admit(cost, deadline_at - loop.time()):
+                break
+
+            remaining = deadline_at - loop.time()
+            try:
+                self.stats["calls"] += 1
+                timeout = min(self.attempt_timeout, remaining)
+                async with span("gemini"):
+                    response = await asyncio.wait_for(self._hedged(model, prompt, generation_config, cost, timeout), timeout=timeout)
+            except RETRYABLE_ERRORS as e:
+                last_error = e
+                self.breaker.record_failure()
+                LLM_CALLS.inc(outcome="retryable_error")
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                if attempt == self.max_retries or loop.time() + delay >= deadline_at:
+                    break
+                self.stats["retries"] += 1
+                print(f"🔁 [LLM] {type(e).__name__} on attempt {attempt + 1}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            except (Exception, asyncio.CancelledError):
+                # Not Gemini's availability (bad request, auth, caller gave up): don't trip the breaker
+                self.breaker.release()
+                LLM_CALLS.inc(outcome="error")
+                raise
+            self.breaker.record_success()
+            LLM_CALLS.inc(outcome="ok")
+            self._record_tokens(model, prompt, cost, response)
+            return response
+
+        self.stats["failures"] += 1
+        raise LLMUnavailableError(f"Gemini unavailable: {last_error!r}" if last_error else "Gemini deadline exceeded",
+                                  retry_after=self.backoff_max) from last_error
+
+    async def stream(self, model, prompt, generation_config: Optional[dict] = None,
+                     deadline: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        generate() for streamed answers: yields the text as Gemini produces it.
+        Same quota, breaker and retry policy, but retries only happen before the first
+        chunk; an error after that raises LLMUnavailableError and the caller keeps what it
+        already consumed. Each chunk must arrive within the attempt timeout. No hedging.
+        """
+        loop = asyncio.get_running_loop()
+        # The request's own deadline (app/core/deadlines.py) wins when it is sooner
+        deadline_at = loop.time() + capped(deadline or self.deadline)
+        cost = estimate_tokens(str(prompt))
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if not await self._admit(cost, deadline_at - loop.time()):
+                break
+
+            self.stats["calls"] += 1
+            parts = []
+            last_chunk = None
+            try:
+                async with span("gemini"), stage("gemini"):
+                    chunks = self._open_stream(model, prompt, generation_config, min(self.attempt_timeout, deadline_at - loop.time()))
+                    try:
+                        while True:
+                            timeout = min(self.attempt_timeout, deadline_at - loop.time())
+                            try:
+                                last_chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                            except StopAsyncIteration:
+                                break
+                            text = _chunk_text(last_chunk)
+                            if text:
+                                parts.append(text)
+                                yield text
+                    finally:
+                        await chunks.aclose()
+            except RETRYABLE_ERRORS as e:
+                last_error = e
+                self.breaker.record_failure()
+                LLM_CALLS.inc(outcome="retryable_error")
+                if parts:
+                    self.stats["failures"] += 1
+                    raise LLMUnavailableError(f"Gemini stream interrupted: {e!r}", retry_after=self.backoff_max) from e
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                if attempt == self.max_retries or loop.time() + delay >= deadline_at:
+                    break
+                self.stats["retries"] += 1
+                print(f"🔁 [LLM] {type(e).__name__} on attempt {attempt + 1}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            except (Exception, asyncio.CancelledError, GeneratorExit):
+                # GeneratorExit: the consumer stopped reading early
+                self.breaker.release()
+                LLM_CALLS.inc(outcome="error")
+                raise
+            self.breaker.record_success()
+            LLM_CALLS.inc(outcome="ok")
+            # Streamed usage metadata is cumulative, so the last chunk has the totals
+            self._record_tokens(model, prompt, cost, SimpleNamespace(
+                usage_metadata=getattr(last_chunk, "usage_metadata", None), text="".join(parts)))
+            return
+
+        self.stats["failures"] += 1
+        raise LLMUnavailableError(f"Gemini unavailable: {last_error!r}" if last_error else "Gemini deadline exceeded",
+                                  retry_after=self.backoff_max) from last_error
+
+    async def _admit(self, cost: int, remaining: float) -> bool:
+        """Waits for RPM/TPM quota and a breaker slot. False if the quota can't be had in time."""
+        wait = max(self.requests.wait_time(1), self.tokens.wait_time(cost))
+        if wait >= remaining:
+            return False
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.stats["rejected"] += 1
+            LLM_CALLS.inc(outcome="rejected")
+            raise
+        try:
+            await self.requests.acquire(1)
+            await self.tokens.acquire(cost)
+        except BaseException:
+            # Cancelled while waiting for quota (deadline, disconnect): give the breaker slot back,
+            # or a half-open breaker would wait forever on a probe that never ran
+            self.breaker.release()
+            raise
+        return True
+
+    def _record_tokens(self, model, prompt, prompt_estimate: int, response):
+        """
+        Per-call token counts, from Gemini's usage metadata (estimated if it has none).
+        "cached" is the part of "in" served from a context cache (explicit or implicit),
+        billed at the reduced cached rate.
+        """
+        usage = getattr(response, "usage_metadata", None)
+        tokens_in = getattr(usage, "prompt_token_count", 0) or prompt_estimate
+        tokens_cached = getattr(usage, "cached_content_token_count", 0) or 0
+        tokens_out = getattr(usage, "candidates_token_count", 0)
+        if not tokens_out:
+            try:
+                tokens_out = estimate_tokens(response.text)
+            except Exception:
+                tokens_out = 0
+        name = getattr(model, "model_name", "unknown")
+        template = prompt.template.name if isinstance(prompt, Prompt) else "other"
+        totals = self.usage.setdefault(template, {"calls": 0, "in": 0, "out": 0, "cached": 0})
+        totals["calls"] += 1
+        totals["in"] += tokens_in
+        totals["out"] += tokens_out
+        totals["cached"] += tokens_cached
+        if telemetry.enabled:
+            LLM_TOKENS.observe(tokens_in, model=name, prompt=template, direction="in")
+            LLM_TOKENS.observe(tokens_out, model=name, prompt=template, direction="out")
+            LLM_TOKENS.observe(tokens_cached, model=name, prompt=template, direction="cached")
+
+    async def _resolve(self, model, prompt) -> tuple:
+        """(model to call, text to send): just the body when the prompt's instructions sit in a context cache."""
+        if not isinstance(prompt, Prompt):
+            return model, prompt
+        if self.context_cache is not None and self.context_cache.covers(model, prompt.template):
+            loop = asyncio.get_running_loop()
+            cached = await loop.run_in_executor(get_executor(), self.context_cache.model_for, model, prompt.template)
+            if cached is not None:
+                return cached, prompt.body
+        return model, prompt.text
+
+    async def _hedged(self, model, prompt, generation_config: Optional[dict], cost: int, timeout: float):
+        if self.hedge_after <= 0:
+            return await self._call(model, prompt, generation_config, timeout)
+
+        primary = asyncio.create_task(self._call(model, prompt, generation_config, timeout))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            # Only hedge if the quota has room right now: a hedge must never queue behind real traffic
+            if not done and self.requests.try_acquire(1) and self.tokens.try_acquire(cost):
+                self.stats["hedges"] += 1
+                tasks.add(asyncio.create_task(self._call(model, prompt, generation_config, timeout)))
+
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _call(self, model, prompt, generation_config: Optional[dict], timeout: float):
+        # The SDK has its own retry loop (up to 10 minutes on 429/503): retries belong to us only
+        kwargs = {"request_options": {"retry": None, "timeout": timeout}}
+        if generation_config:
+            kwargs["generation_config"] = generation_config
+        model, text = await self._resolve(model, prompt)
+        async with stage("gemini"):
+            if self.sync_transport:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(get_executor(), functools.partial(model.generate_content, text, **kwargs))
+            return await model.generate_content_async(text, **kwargs)
+
+    async def _open_stream(self, model, prompt, generation_config: Optional[dict], timeout: float):
+        kwargs = {"stream": True, "request_options": {"retry": None, "timeout": timeout}}
+        if generation_config:
+            kwargs["generation_config"] = generation_config
+        model, text = await self._resolve(model, prompt)
+        if not self.sync_transport:
+            response = await model.generate_content_async(text, **kwargs)
+            async for chunk in response:
+                yield chunk
+            return
+
+        # REST transport: a worker thread iterates the blocking stream and hands chunks to the loop
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def pump():
+            try:
+                for chunk in model.generate_content(text, **kwargs):
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, (chunk, None))
+                loop.call_soon_threadsafe(queue.put_nowait, (None, None))
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, (None, e))
+
+        worker = loop.run_in_executor(get_executor(), pump)
+        try:
+            while True:
+                chunk, error = await queue.get()
+                if error is not None:
+                    raise error
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            stop.set()
+            # Let the worker notice on its next chunk; never block the caller on it
+            worker.add_done_callback(lambda future: future.exception())
+
+
+def _chunk_text(chunk) -> str:
+    try:
+        return chunk.text
+    except ValueError:
+        # A chunk without text parts (e.g. only the finish reason)
+        return ""
+
+
+_default_client = None
+
+
+def default_client() -> LLMClient:
+    """The process-wide client (one quota and breaker for every service), created on first use."""
+    global _default_client
+    if _default_client is None:
+        _default_client = LLMClient.from_settings()
+    return _default_client
@@ -0,0 +1,149 @@
+from typing import List, Optional, Tuple
+from app.schemas.script import Edit, PatchOutcome
+from app.services.highlighter import AhoCorasick, tokenize, snippet_tokens
+
+APPLIED = "applied"
+FUZZY = "fuzzy"
+REJECTED = "rejected"
+
+
+class PatchReport:
+    def __init__(self, text: str, outcomes: List[PatchOutcome]):
+        self.text = text
+        self.outcomes = outcomes
+
+    def count(self, status: str) -> int:
+        return sum(1 for outcome in self.outcomes if outcome.status == status)
+
+    @property
+    def fuzzy_rate(self) -> float:
+        matched = self.count(APPLIED) + self.count(FUZZY)
+        return self.count(FUZZY) / matched if matched else 0.0
+
+
+class _Spans:
+    """
+    Accepted, non-overlapping spans as a per-character coverage map of the original.
+    add() and overlaps() cost O(span length) (a C-level fill / scan), whatever the number of spans.
+    """
+
+    def __init__(self, length: int):
+        self.covered = bytearray(length)
+
+    def first_covered(self, start: int, end: int) -> int:
+        """First covered position in [start, end), or -1."""
+        return self.covered.find(1, start, end)
+
+    def overlaps(self, start: int, end: int) -> bool:
+        return self.first_covered(start, end) >= 0
+
+    def next_free(self, position: int) -> int:
+        """First uncovered position at or after `position` (len(original) if none)."""
+        free = self.covered.find(0, position)
+        return free if free >= 0 else len(self.covered)
+
+    def add(self, start: int, end: int):
+        self.covered[start:end] = b"\x01" * (end - start)
+
+
+class PatchEngine:
+    """
+    Applies a batch of edits against the ORIGINAL text in one pass.
+
+    1. Locate: every original_snippet is searched in a token index of the original
+       (case- and whitespace-insensitive, one Aho-Corasick scan for all edits), with a
+       token -> char offset map back to the raw text. Snippets the token index can't place
+       at all (they start or end mid-word) fall back to an exact substring search; snippets
+       with no tokens (blank) are rejected rather than matched anywhere.
+    2. Resolve: edits are taken in order; an edit whose span overlaps an already accepted
+       edit moves to its next occurrence, or is rejected as a conflict.
+    3. Build: the final script is assembled once from the untouched slices and the replacements,
+       so later edits can never match text inserted by earlier ones.
+    """
+
+    def apply(self, original: str, edits: List[Edit]) -> PatchReport:
+        tokens, starts, ends = tokenize(original)
+
+        # --- 1. LOCATE ---
+        patterns = {}
+        edit_patterns = []
+        for edit in edits:
+            key = snippet_tokens(edit.original_snippet)
+            edit_patterns.append(key)
+            if key and key not in patterns:
+                patterns[key] = len(patterns)
+
+        occurrences = [[] for _ in patterns]
+        if patterns:
+            matcher = AhoCorasick(list(patterns))
+            for first, last, index in matcher.iter_matches(tokens):
+                occurrences[index].append((starts[first], ends[last - 1]))
+
+        # --- 2. RESOLVE ---
+        accepted = _Spans(len(original))
+        outcomes = []
+        replacements = []
+        next_occurrence = [0] * len(patterns)
+        for edit_index, edit in enumerate(edits):
+            outcome = self._resolve(edit_index, edit, edit_patterns[edit_index], patterns, occurrences,
+                                    next_occurrence, accepted, original)
+            outcomes.append(outcome)
+            if outcome.status != REJECTED:
+                accepted.add(outcome.start, outcome.end)
+                replacements.append((outcome.start, outcome.end, edit.improved_snippet))
+
+        # --- 3. BUILD ---
+        pieces = []
+        cursor = 0
+        for start, end, improved in sorted(replacements):
+            pieces.append(original[cursor:start])
+            pieces.append(improved)
+            cursor = end
+        pieces.append(original[cursor:])
+        return PatchReport("".join(pieces), outcomes)
+
+    def _resolve(self, edit_index, edit, key, patterns, occurrences, next_occurrence, accepted, original) -> PatchOutcome:
+        snippet = edit.original_snippet
+        found_any = False
+        if not key:
+            return PatchOutcome(edit_index=edit_index, status=REJECTED, reason="empty")
+
+        if key in patterns:
+            index = patterns[key]
+            spans = occurrences[index]
+            while next_occurrence[index] < len(spans):
+                start, end = spans[next_occurrence[index]]
+                next_occurrence[index] += 1
+                found_any = True
+                if accepted.overlaps(start, end):
+                    continue
+                status = APPLIED if original[start:end] == snippet.strip() else FUZZY
+                return PatchOutcome(edit_index=edit_index, status=status, start=start, end=end)
+
+        if not found_any:
+            # Mid-word snippets don't line up with token boundaries: exact substring search
+            exact, found_any = self._find_exact(original, snippet, accepted)
+            if exact is not None:
+                return PatchOutcome(edit_index=edit_index, status=APPLIED, start=exact, end=exact + len(snippet))
+
+        return PatchOutcome(
+            edit_index=edit_index,
+            status=REJECTED,
+            reason="conflict" if found_any else "not_found",
+        )
+
+    def _find_exact(self, original: str, snippet: str, accepted: _Spans) -> Tuple[Optional[int], bool]:
+        """
+        (first occurrence clear of the accepted spans or None, whether it occurs at all).
+        A blocked candidate resumes the search after the accepted span blocking it, so the
+        scan only moves forward: O(len(original)) plus O(len(snippet)) per accepted span skipped.
+        """
+        position = original.find(snippet)
+        found = position >= 0
+        while position >= 0:
+            blocked = accepted.first_covered(position, position + len(snippet))
+            if blocked < 0:
+                return position, True
+            # Every start up to the end of that span would overlap it too
+            position = original.find(snippet, accepted.next_free(blocked))
+        return None, found
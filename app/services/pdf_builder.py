@@ -1,19 +1,22 @@
 from fpdf import FPDF
-import os
+import asyncio
+import re
 import uuid
-import cloudinary
-import cloudinary.uploader
-import cloudinary.utils
+from typing import Awaitable, Callable, Optional
 from app.core.config import settings
+from app.core.concurrency import run_blocking
+from app.core.telemetry import span, PDF_BYTES
+from app.services.pdf_layout import LineBreaker, TableLayout
+from app.services.storage import LocalStorage
+from app.services.uploader import ReportUploader
 
 class PDFService:
-    def __init__(self):
-        cloudinary.config( 
-            cloud_name = settings.CLOUDINARY_CLOUD_NAME, 
-            api_key = settings.CLOUDINARY_API_KEY, 
-            api_secret = settings.CLOUDINARY_API_SECRET,
-            secure = True
-        )
+    def __init__(self, uploader: Optional[ReportUploader] = None):
+        # Reports are published under the /static mount first, so the URL works before any CDN upload
+        self.local = LocalStorage(settings.STATIC_DIR, f"{settings.PUBLIC_BASE_URL}/static")
+        self.uploader = uploader
+        # Line breaks are cached across reports (same font and column widths every time)
+        self.breaker = LineBreaker()
 
     def sanitize_text(self, text: str) -> str:
         if not text: return ""
@@ -22,12 +25,61 @@ class PDFService:
             text = text.replace(char, r)
         return text.encode('latin-1', 'replace').decode('latin-1')
 
-    def create_table_report(self, scenes: list, score: int, critique: list, project_name="Validated_Script") -> str:
+    async def create_table_report(self, scenes: list, score: int, critique: list, project_name="Validated_Script",
+                                  on_uploaded: Optional[Callable[[str], Awaitable]] = None) -> str:
+        """
+        Renders the audit table in memory and returns its /static URL.
+        The CDN upload runs in the background (ReportUploader); on_uploaded is
+        awaited with the CDN URL once it lands.
+        """
+        # FPDF rendering is blocking, so it runs in the worker pool under the render limit
+        with span("pdf_draw"):
+            data = await run_blocking("render", self.render_table_report, scenes, score, critique, project_name)
+        PDF_BYTES.observe(len(data), kind="table")
+        return await self._publish(data, project_name, on_uploaded)
+
+    async def create_combined_report(self, sections: list, project_name="Batch") -> str:
+        """
+        One PDF with a scorecard + table section per script.
+        sections: [{"project_name", "scenes", "score", "critique"}, ...]
+        """
+        with span("pdf_draw"):
+            data = await run_blocking("render", self.render_combined_report, sections)
+        PDF_BYTES.observe(len(data), kind="combined")
+        return await self._publish(data, project_name)
+
+    async def _publish(self, data: bytes, project_name: str, on_uploaded: Optional[Callable[[str], Awaitable]] = None) -> str:
         unique_id = uuid.uuid4().hex[:8]
-        filename = f"audit_{project_name}_{unique_id}.pdf"
-        
+        safe_name = re.sub(r'[^A-Za-z0-9_-]+', '_', project_name)[:40]
+        filename = f"audit_{safe_name}_{unique_id}.pdf"
+        with span("pdf_save"):
+            local_url = await run_blocking("render", self.local.upload, data, filename)
+
+        if self.uploader is not None:
+            async def uploaded(cdn_url: str):
+                # Keep the local copy around for clients that already got its URL
+                asyncio.get_running_loop().call_later(settings.LOCAL_REPORT_RETENTION_SECONDS, self.local.delete, filename)
+                if on_uploaded is not None:
+                    await on_uploaded(cdn_url)
+
+            self.uploader.submit(data, filename, local_url, on_uploaded=uploaded)
+        return local_url
+
+    def render_table_report(self, scenes: list, score: int, critique: list, project_name="Validated_Script") -> bytes:
+        pdf = FPDF()
+        pdf.set_auto_page_break(auto=True, margin=15)
+        self.draw_report(pdf, scenes, score, critique, project_name)
+        return bytes(pdf.output())
+
+    def render_combined_report(self, sections: list) -> bytes:
         pdf = FPDF()
         pdf.set_auto_page_break(auto=True, margin=15)
+        for section in sections:
+            self.draw_report(pdf, section["scenes"], section["score"], section["critique"], section["project_name"])
+        return bytes(pdf.output())
+
+    def draw_report(self, pdf: FPDF, scenes: list, score: int, critique: list, project_name="Validated_Script"):
+        """Draws one report (header, scorecard, table) starting on a new page."""
         pdf.add_page()
         
         # --- 1. HEADER & SCORECARD (RESTORED) ---
@@ -64,78 +116,19 @@ class PDFService:
         pdf.set_y(start_y + 70)
 
         # --- 2. TABLE HEADERS ---
-        pdf.set_font("Arial", 'B', 10)
-        pdf.set_text_color(0, 0, 0)
-        pdf.set_fill_color(220, 220, 220)
-        
-        # Draw Headers
-        pdf.cell(15, 10, "Sc#", 1, 0, 'C', True)
-        pdf.cell(85, 10, "Visual Cue & AI Prompt", 1, 0, 'C', True)
-        pdf.cell(90, 10, "Audio / Dialogue", 1, 1, 'C', True)
-        
+        table = TableLayout(
+            pdf,
+            widths=(15, 85, 90),
+            headers=("Sc#", "Visual Cue & AI Prompt", "Audio / Dialogue"),
+            breaker=self.breaker,
+        )
+        table.draw_header()
+
         # --- 3. TABLE BODY (GREEN EDITS LOGIC) ---
-        pdf.set_font("Arial", '', 9)
-        
+        # Each cell is measured once; rows taller than a page continue on the next one
         for scene in scenes:
-            s_id = str(scene.get('scene_number', '?'))
-            visual = self.sanitize_text(scene.get('visual_cue', ''))
-            audio = self.sanitize_text(scene.get('audio_dialogue', ''))
-            is_edited = scene.get('is_edited', False)
-
-            # Calculate Row Height
-            lines_visual = pdf.multi_cell(85, 5, visual, split_only=True)
-            lines_audio = pdf.multi_cell(90, 5, audio, split_only=True)
-            max_lines = max(len(lines_visual), len(lines_audio))
-            row_height = max_lines * 5 
-            
-            # Page Break Check
-            if pdf.get_y() + row_height > 270:
-                pdf.add_page()
-                # Re-draw headers on new page
-                pdf.set_font("Arial", 'B', 10)
-                pdf.set_fill_color(220, 220, 220)
-                pdf.cell(15, 10, "Sc#", 1, 0, 'C', True)
-                pdf.cell(85, 10, "Visual Cue & AI Prompt", 1, 0, 'C', True)
-                pdf.cell(90, 10, "Audio / Dialogue", 1, 1, 'C', True)
-                pdf.set_font("Arial", '', 9)
-
-            x_start = pdf.get_x()
-            y_start = pdf.get_y()
-            
-            # Col 1: ID
-            pdf.set_text_color(0, 0, 0)
-            pdf.rect(x_start, y_start, 15, row_height)
-            pdf.multi_cell(15, row_height, s_id, border=0, align='C')
-            
-            # Col 2: Visuals (Check Green)
-            pdf.set_xy(x_start + 15, y_start)
-            if is_edited: pdf.set_text_color(0, 128, 0) # Green
-            else: pdf.set_text_color(0, 0, 0)
-            
-            pdf.rect(pdf.get_x(), y_start, 85, row_height)
-            pdf.multi_cell(85, 5, visual, border=0)
-            
-            # Col 3: Audio (Check Green)
-            pdf.set_xy(x_start + 100, y_start)
-            if is_edited: pdf.set_text_color(0, 128, 0)
-            else: pdf.set_text_color(0, 0, 0)
-            
-            pdf.rect(pdf.get_x(), y_start, 90, row_height)
-            pdf.multi_cell(90, 5, audio, border=0)
-            
-            # Reset for next row
-            pdf.set_xy(x_start, y_start + row_height)
-            pdf.set_text_color(0, 0, 0)
-
-        # --- 4. UPLOAD ---
-        temp_path = f"temp_{filename}"
-        pdf.output(temp_path)
-        
-        try:
-            unique_id_cloudinary = filename.split('.')[0]
-            cloudinary.uploader.upload(temp_path, public_id=f"scripts/{unique_id_cloudinary}", resource_type="image", format="pdf", overwrite=True)
-            pdf_url, _ = cloudinary.utils.cloudinary_url(f"scripts/{unique_id_cloudinary}", resource_type="image", format="pdf")
-            if os.path.exists(temp_path): os.remove(temp_path)
-            return pdf_url
-        except Exception:
-            return "error_generating_pdf"
\ No newline at end of file
+            table.draw_row(
+                str(scene.get('scene_number', '?')),
+                (self.sanitize_text(scene.get('visual_cue', '')), self.sanitize_text(scene.get('audio_dialogue', ''))),
+                color=(0, 128, 0) if scene.get('is_edited', False) else (0, 0, 0),
+            )
@@ -0,0 +1,152 @@
+import threading
+from collections import OrderedDict
+from typing import List, Sequence, Tuple
+
+
+class LineBreaker:
+    """
+    Greedy word wrap measured with the font's glyph width table, the same way
+    multi_cell() breaks lines, but without building fpdf's styled text fragments.
+    Results are cached per (font, size, width, text): headers, repeated cues and
+    re-renders of the same script are measured once. Shared by concurrent renders, hence the lock.
+    """
+
+    def __init__(self, max_entries: int = 8192):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def split(self, pdf, width: float, text: str) -> Tuple[str, ...]:
+        """Lines of text as multi_cell(width, ...) would print them with the current font."""
+        font = pdf.current_font
+        key = (font.fontkey, pdf.font_size_pt, width, text)
+        with self._lock:
+            lines = self._cache.get(key)
+            if lines is not None:
+                self._cache.move_to_end(key)
+                return lines
+
+        # Compare in glyph units (1/1000 of the font size) to avoid a float per character
+        limit = (width - 2 * pdf.c_margin) * pdf.k * 1000 / pdf.font_size_pt
+        lines = tuple(self._wrap(font.cw, limit, text))
+        with self._lock:
+            self._cache[key] = lines
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return lines
+
+    def _wrap(self, widths: dict, limit: float, text: str) -> List[str]:
+        lines = []
+        space = widths.get(" ", 0)
+        for paragraph in text.split("\n"):
+            line = []
+            line_width = 0
+            for word in paragraph.split(" "):
+                word_width = sum(widths.get(ch, 500) for ch in word)
+                if word_width > limit:
+                    # A single word wider than the cell is cut by character
+                    if line:
+                        lines.append(" ".join(line))
+                    pieces = self._cut_word(widths, limit, word)
+                    lines.extend(piece for piece, _ in pieces[:-1])
+                    line, line_width = [pieces[-1][0]], pieces[-1][1]
+                elif line and line_width + space + word_width > limit:
+                    lines.append(" ".join(line))
+                    line, line_width = [word], word_width
+                else:
+                    line_width += (space if line else 0) + word_width
+                    line.append(word)
+            lines.append(" ".join(line))
+        return lines
+
+    def _cut_word(self, widths: dict, limit: float, word: str) -> List[tuple]:
+        pieces = []
+        piece = []
+        piece_width = 0
+        for ch in word:
+            w = widths.get(ch, 500)
+            if piece and piece_width + w > limit:
+                pieces.append(("".join(piece), piece_width))
+                piece, piece_width = [], 0
+            piece.append(ch)
+            piece_width += w
+        pieces.append(("".join(piece), piece_width))
+        return pieces
+
+
+class TableLayout:
+    """
+    Draws a bordered table row by row with fpdf's low-level text() and rect():
+    every cell is measured once (through LineBreaker) and its lines are placed
+    directly, instead of multi_cell() measuring and then laying the text out again.
+    Rows taller than the space left on a page are split and continue on the next
+    page, under a repeated header; the first column is only printed on the row's
+    first fragment.
+    """
+
+    def __init__(self, pdf, widths: Sequence[float], headers: Sequence[str], line_height: float = 5,
+                 header_height: float = 10, bottom: float = 270, breaker: LineBreaker = None):
+        self.pdf = pdf
+        self.widths = list(widths)
+        self.headers = list(headers)
+        self.line_height = line_height
+        self.header_height = header_height
+        self.bottom = bottom
+        self.breaker = breaker or LineBreaker()
+
+    def draw_header(self):
+        pdf = self.pdf
+        pdf.set_font("Arial", 'B', 10)
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_fill_color(220, 220, 220)
+        for i, (width, title) in enumerate(zip(self.widths, self.headers)):
+            pdf.cell(width, self.header_height, title, 1, 1 if i == len(self.widths) - 1 else 0, 'C', True)
+        pdf.set_font("Arial", '', 9)
+
+    def draw_row(self, label: str, cells: Sequence[str], color: Tuple[int, int, int] = (0, 0, 0)):
+        """label goes in the first (centred) column, cells fill the remaining columns."""
+        pdf = self.pdf
+        columns = [self.breaker.split(pdf, width, text) for width, text in zip(self.widths[1:], cells)]
+        total = max(1, max(len(lines) for lines in columns))
+        page_lines = int((self.bottom - pdf.t_margin - self.header_height) // self.line_height)
+
+        first = 0
+        while first < total:
+            available = int((self.bottom - pdf.get_y()) // self.line_height)
+            remaining = total - first
+            # Start on a new page if the row would fit there whole, or if only a sliver is left here
+            if remaining > available and (remaining <= page_lines or available < 3):
+                pdf.add_page()
+                self.draw_header()
+                available = page_lines
+            count = min(remaining, available)
+            self._draw_fragment(label if first == 0 else "", columns, first, first + count, color)
+            first += count
+
+    def _draw_fragment(self, label: str, columns: list, first: int, last: int, color):
+        pdf = self.pdf
+        x_start = pdf.l_margin
+        y_start = pdf.get_y()
+        height = (last - first) * self.line_height
+        # Baseline of a line of text vertically centred in a cell of the given height
+        baseline = 0.5 * self.line_height + 0.3 * pdf.font_size
+
+        pdf.set_text_color(0, 0, 0)
+        pdf.rect(x_start, y_start, self.widths[0], height)
+        if label:
+            label_width = pdf.get_string_width(label)
+            pdf.text(x_start + (self.widths[0] - label_width) / 2, y_start + 0.5 * height + 0.3 * pdf.font_size, label)
+
+        pdf.set_text_color(*color)
+        x = x_start + self.widths[0]
+        for width, lines in zip(self.widths[1:], columns):
+            pdf.rect(x, y_start, width, height)
+            y = y_start + baseline
+            for line in lines[first:last]:
+                if line:
+                    pdf.text(x + pdf.c_margin, y, line)
+                y += self.line_height
+            x += width
+
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_xy(x_start, y_start + height)
@@ -1,47 +1,300 @@
+import asyncio
 import httpx
 import io
-from pypdf import PdfReader
+import re
+from collections import Counter
+from typing import Optional
+from app.core.config import settings
+from app.core.concurrency import stage, run_blocking
+from app.core.telemetry import span, CACHE_REQUESTS, DOWNLOAD_BYTES
+from app.services.download_cache import DownloadCache
+from app.services.script_document import ScriptDocument
+
+class TableExtractor:
+    """
+    Recovers our "Sc# / Visual Cue & AI Prompt / Audio / Dialogue" table from
+    positioned PDF text fragments, fed one page at a time.
+
+    Columns: the header row gives the rough x position of each column; the real
+    left edge of the Visual and Audio columns is the most common x at which body
+    text starts between consecutive header positions.
+    Rows: a number in the first column starts a new scene; every following
+    fragment belongs to it (content streams draw a row's cells together), which
+    also carries rows over page breaks.
+    """
+
+    # Fragments closer than this (in PDF points) count as the same column edge / row
+    TOLERANCE = 1.5
+
+    def __init__(self):
+        self.header = None  # (set of header texts, sc_x, visual_x, audio_x)
+        self.bounds = None  # (visual_left, audio_left)
+        self.rows = []
+
+    def feed(self, fragments: list):
+        """fragments: [(x, y, text), ...] for one page, in content-stream order."""
+        if self.header is None:
+            start = self._find_header(fragments)
+            if start is None:
+                return
+            fragments = fragments[start:]
+            self.bounds = self._column_bounds(fragments)
+
+        header_texts = self.header[0]
+        for x, y, text in fragments:
+            cleaned = text.strip()
+            if not cleaned or cleaned in header_texts:
+                continue
+            column = self._column(x)
+            if column == 0:
+                if cleaned.isdigit():
+                    self.rows.append([int(cleaned), [], []])
+                    continue
+                column = 1
+            if self.rows:
+                self.rows[-1][column].append(cleaned)
+
+    def scenes(self) -> list:
+        return [
+            {"scene_number": number, "visual_cue": "\n".join(visual), "audio_dialogue": "\n".join(audio)}
+            for number, visual, audio in self.rows
+            if visual or audio
+        ]
+
+    def _find_header(self, fragments: list):
+        """Index just past the header row, or None if this page has no header."""
+        for i, (x, y, text) in enumerate(fragments):
+            if not text.strip().lower().startswith("visual"):
+                continue
+            same_row = [(fx, ft.strip()) for fx, fy, ft in fragments if abs(fy - y) <= self.TOLERANCE and ft.strip()]
+            audio = [fx for fx, ft in same_row if ft.lower().startswith("audio")]
+            if not audio:
+                continue
+            sc = [fx for fx, ft in same_row if fx < x and re.match(r'^(sc|scene|#)', ft.lower())]
+            self.header = ({ft for _, ft in same_row}, min(sc) if sc else 0.0, x, min(audio))
+            last = max(j for j, (_, fy, ft) in enumerate(fragments) if abs(fy - y) <= self.TOLERANCE and ft.strip())
+            return last + 1
+        return None
+
+    def _column_bounds(self, body: list) -> tuple:
+        _, sc_x, visual_x, audio_x = self.header
+
+        def left_edge(low: float, high: float) -> float:
+            xs = Counter(
+                round(x * 2) / 2 for x, _, text in body
+                if low < x <= high + self.TOLERANCE and text.strip() and not text.strip().isdigit()
+            )
+            return xs.most_common(1)[0][0] if xs else high
+
+        visual_left = left_edge(sc_x, visual_x)
+        audio_left = left_edge(visual_x, audio_x)
+        return visual_left, audio_left
+
+    def _column(self, x: float) -> int:
+        visual_left, audio_left = self.bounds
+        if x < visual_left - self.TOLERANCE:
+            return 0
+        if x < audio_left - self.TOLERANCE:
+            return 1
+        return 2
+
+
+class DownloadTooLargeError(ValueError):
+    """Raised when a script download exceeds DOWNLOAD_MAX_BYTES."""
+
+
+PDF_MAGIC = b"%PDF-"
+
+
+def sniff_format(head: bytes, content_type: str = "") -> str:
+    """
+    "pdf" or "text", from the bytes themselves rather than the URL: share links
+    (Google Drive, Dropbox) rarely end in .pdf. The PDF header may sit anywhere in
+    the first 1024 bytes; the Content-Type is only a fallback.
+    """
+    if PDF_MAGIC in head[:1024]:
+        return "pdf"
+    if content_type.split(";")[0].strip().lower() == "application/pdf":
+        return "pdf"
+    return "text"
+
 
 class PDFReaderService:
+    def __init__(self, cache: Optional[DownloadCache] = None):
+        self.cache = cache
+        self._client = None
+        # url -> task, so concurrent requests for the same script share one download
+        self._inflight = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # One pooled client per process instead of a fresh connection per download
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.DOWNLOAD_TIMEOUT_SECONDS),
+                limits=httpx.Limits(max_connections=settings.DOWNLOAD_CONCURRENCY, max_keepalive_connections=settings.DOWNLOAD_CONCURRENCY),
+                # Follow redirects is important for shared links (like Google Drive/Dropbox)
+                follow_redirects=True,
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     async def download_and_parse(self, url: str) -> str:
         """
         Downloads a file from a URL and returns its text content.
-        Supports .pdf and .txt
+        Supports PDF and plain text, detected from the content.
+        """
+        document = await self.download_document(url)
+        return document.text
+
+    async def download_document(self, url: str) -> ScriptDocument:
+        """
+        Same as download_and_parse, but keeps the table structure of PDF inputs:
+        the returned ScriptDocument carries the scenes and a char-offset -> cell map.
+        Concurrent calls for the same URL share a single download.
         """
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.create_task(self._download(url))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        # shield: one caller going away must not cancel the download for the others
+        return await asyncio.shield(task)
+
+    async def _download(self, url: str) -> ScriptDocument:
         print(f"⬇️ Downloading script from: {url}")
-        
-        async with httpx.AsyncClient() as client:
-            try:
-                # Follow redirects is important for shared links (like Google Drive/Dropbox)
-                response = await client.get(url, follow_redirects=True)
+
+        # Blocking SQLite read (and document deserialization): off the event loop
+        cached = await run_blocking("store", self.cache.get, url) if self.cache is not None else None
+        headers = {}
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            async with stage("download"), span("fetch"), self.client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and cached:
+                    print("♻️ Script unchanged since last download, using cached text")
+                    CACHE_REQUESTS.inc(namespace="download", result="hit")
+                    return cached["document"]
+                CACHE_REQUESTS.inc(namespace="download", result="stale" if cached else "miss")
                 response.raise_for_status()
-                content_bytes = response.content
-            except Exception as e:
-                print(f"❌ Download failed: {e}")
-                return ""
+                content_bytes = await self._read_capped(response)
+                content_type = response.headers.get("content-type", "")
+                etag = response.headers.get("etag")
+                last_modified = response.headers.get("last-modified")
+        except DownloadTooLargeError:
+            raise
+        except Exception as e:
+            print(f"❌ Download failed: {e}")
+            return ScriptDocument("")
+
+        script_format = sniff_format(content_bytes, content_type)
+        DOWNLOAD_BYTES.observe(len(content_bytes), format=script_format)
 
-        # Detect File Type based on URL extension
-        lower_url = url.lower()
-        
         # --- CASE A: PDF ---
-        if lower_url.endswith(".pdf"):
+        if script_format == "pdf":
             try:
-                reader = PdfReader(io.BytesIO(content_bytes))
-                text = ""
-                for page in reader.pages:
-                    extracted = page.extract_text()
-                    if extracted:
-                        text += extracted + "\n"
-                return text.strip()
+                # pypdf is pure-Python and CPU-bound: keep it off the event loop
+                with span("parse"):
+                    document = await run_blocking("parse", self.extract_document, content_bytes)
             except Exception as e:
                 print(f"❌ PDF Parsing failed: {e}")
-                return ""
-        
+                return ScriptDocument("")
+
         # --- CASE B: TEXT FILE (or unknown) ---
         else:
+            document = ScriptDocument(self.decode_text(content_bytes))
+
+        # Without a validator there is no way to tell later whether the cached copy is stale
+        if self.cache is not None and document.text and (etag or last_modified):
+            await run_blocking("store", self.cache.set, url, etag, last_modified, document)
+        return document
+
+    async def read_file(self, file, size: int, content_type: str = "") -> ScriptDocument:
+        """
+        Same as a download, for a script that is already in a binary file (an upload).
+        PDFs are parsed from the file in place, without copying it into memory first.
+        """
+        head = file.read(1024)
+        file.seek(0)
+        script_format = sniff_format(head, content_type)
+        DOWNLOAD_BYTES.observe(size, format=script_format)
+
+        if script_format == "pdf":
             try:
-                # Try UTF-8 first
-                return content_bytes.decode('utf-8').strip()
-            except:
-                # Fallback to Latin-1 if UTF-8 fails
-                return content_bytes.decode('latin-1').strip()
\ No newline at end of file
+                with span("parse"):
+                    return await run_blocking("parse", self.extract_document, file)
+            except Exception as e:
+                print(f"❌ PDF Parsing failed: {e}")
+                return ScriptDocument("")
+        return ScriptDocument(self.decode_text(file.read()))
+
+    def decode_text(self, content_bytes: bytes) -> str:
+        try:
+            # Try UTF-8 first
+            return content_bytes.decode('utf-8').strip()
+        except UnicodeDecodeError:
+            # Fallback to Latin-1 if UTF-8 fails
+            return content_bytes.decode('latin-1').strip()
+
+    async def _read_capped(self, response: httpx.Response) -> bytes:
+        """Reads the streamed body, giving up as soon as it passes DOWNLOAD_MAX_BYTES."""
+        limit = settings.DOWNLOAD_MAX_BYTES
+        declared = response.headers.get("content-length", "")
+        if declared.isdigit() and int(declared) > limit:
+            raise DownloadTooLargeError(f"Script is {int(declared)} bytes, the limit is {limit}.")
+
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body += chunk
+            if len(body) > limit:
+                raise DownloadTooLargeError(f"Script is larger than the {limit} byte limit.")
+        return bytes(body)
+
+    def iter_pages(self, reader):
+        """
+        Yields (page_text, fragments) one page at a time, from a single extraction pass.
+        fragments are (x, y, text) in page coordinates, in content-stream order.
+        """
+        for page in reader.pages:
+            fragments = []
+
+            def visit(text, cm, tm, font_dict, font_size):
+                if text and text.strip():
+                    # Text matrix position mapped through the current transformation matrix
+                    x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+                    y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+                    fragments.append((x, y, text))
+
+            page_text = page.extract_text(visitor_text=visit) or ""
+            yield page_text, fragments
+
+    def extract_document(self, source) -> ScriptDocument:
+        """source: the PDF as bytes, or a binary file positioned at its start (read in place)."""
+        # Imported on first use: pypdf is a noticeable part of a worker's cold start
+        from pypdf import PdfReader
+        reader = PdfReader(source if hasattr(source, "read") else io.BytesIO(source))
+        table = TableExtractor()
+        page_texts = []
+        for page_text, fragments in self.iter_pages(reader):
+            if page_text:
+                page_texts.append(page_text)
+            table.feed(fragments)
+
+        scenes = table.scenes()
+        if scenes:
+            print(f"📐 Recovered {len(scenes)} table rows from PDF layout")
+            return ScriptDocument.from_scenes(scenes)
+        return ScriptDocument("\n".join(page_texts).strip())
+
+    def extract_pdf_text(self, content_bytes: bytes) -> str:
+        from pypdf import PdfReader
+        reader = PdfReader(io.BytesIO(content_bytes))
+        return "\n".join(text for text, _ in self.iter_pages(reader) if text).strip()
@@ -0,0 +1,228 @@
+import asyncio
+import time
+from app.core.telemetry import span
+from app.schemas.script import ScriptRequest, ScriptResponse, AnalysisResult, RevisionSummary
+from app.services.cache import script_hash
+from app.services.highlighter import HighlightService
+
+# Stage names reported to progress callbacks, in pipeline order.
+# Between "reconstruct" and "highlight" the pipeline also emits one "scene" event per table row.
+STAGES = ["download", "audit", "patch", "reconstruct", "highlight", "render", "done"]
+
+
+class EmptyScriptError(ValueError):
+    """Raised when neither content nor script_url yields any text."""
+
+
+class ValidationPipeline:
+    """
+    The /validate pipeline: download -> audit -> patch -> reconstruct -> highlight -> render.
+    Shared by the synchronous endpoint and the background job workers.
+    """
+
+    def __init__(self, editor, parser, reader, pdf, research, cache, highlighter=None, revisions=None, reports=None,
+                 hooks=None):
+        self.editor = editor
+        self.parser = parser
+        self.reader = reader
+        self.pdf = pdf
+        self.research = research
+        self.cache = cache
+        self.highlighter = highlighter or HighlightService()
+        # RevisionService: per-scene audits and table blocks, so a revised script only redoes what changed
+        self.revisions = revisions
+        # ReportService: reports are registered by content hash and rendered on first download
+        self.reports = reports
+        # HookMiner: competitor video openings (from their transcripts) fed into the audit prompt
+        self.hooks = hooks
+
+    async def run(self, payload: ScriptRequest, progress=None, competitors=None, document=None) -> ScriptResponse:
+        """
+        Runs every stage for one request.
+        document, if given, is an awaitable ScriptDocument used instead of payload.content / script_url
+        (an upload still arriving: the competitor search starts before the script is complete).
+        progress, if given, is an async callable(stage, data) awaited after each stage completes.
+        competitors, if given, is a task already searching for payload.topic (shared by a batch);
+        it is awaited instead of starting a new search, and never cancelled here.
+        """
+        async def report(stage: str, **data):
+            if progress is not None:
+                await progress(stage, data)
+
+        # Competitor lookup runs alongside the pipeline; search_videos enforces its own
+        # timeout budget and returns [] on failure, so it never delays the response.
+        research_task = None
+        if payload.fetch_competitors and competitors is None:
+            research_task = asyncio.create_task(self.research.search_videos(payload.topic))
+        # Competitor hooks are the one research result the audit uses: it waits for them up to
+        # hooks.wait seconds from here (the download overlaps that), then goes ahead without them
+        started = time.perf_counter()
+        hooks_task = None
+        # The dev-mode placeholder videos have nothing to mine
+        if payload.fetch_competitors and self.hooks is not None and self.research.live:
+            hooks_task = asyncio.create_task(self._mine_hooks(competitors or research_task))
+
+        try:
+            # --- 1. GET RAW TEXT ---
+            with span("download"):
+                script_content = ""
+                if document is not None:
+                    document = await document
+                    script_content = document.text
+                elif payload.script_url:
+                    print(f"📥 [Validator] Downloading PDF: {payload.script_url}")
+                    document = await self.reader.download_document(payload.script_url)
+                    script_content = document.text
+                elif payload.content:
+                    script_content = payload.content
+
+            if not script_content:
+                raise EmptyScriptError("No text found in input.")
+            await report("download", characters=len(script_content))
+
+            # --- 2. GET INTELLIGENT EDITS ---
+            previous = None
+            revision = None
+            scene_audits = None
+            if self.revisions is not None:
+                previous = await self.revisions.load(payload.previous_validation_id, payload.tone)
+                if payload.previous_validation_id:
+                    revision = RevisionSummary(previous_validation_id=payload.previous_validation_id,
+                                               reused=previous is not None)
+            hooks = await self._wait_for_hooks(hooks_task, started)
+            hook_summary = self.hooks.summary(hooks) if hooks else ""
+            with span("audit"):
+                print("🤖 [Validator] Agent is auditing the script...")
+                if self.revisions is not None:
+                    edits, score, critique, scene_audits = await self.revisions.audit(
+                        script_content, payload.tone, previous, revision or RevisionSummary(previous_validation_id=""),
+                        hook_summary)
+                else:
+                    edits, score, critique = await self.editor.analyze_script(script_content, payload.tone, hook_summary)
+            await report("audit", score=score, critique=critique)
+
+            # --- 3. APPLY EDITS TO TEXT ---
+            with span("patch"):
+                # All edits are located against the original text, then applied in one pass
+                patch_report = self.editor.patch_script(script_content, edits)
+            final_script_flat = patch_report.text
+            await report(
+                "patch",
+                edits=[edit.model_dump() for edit in edits],
+                outcomes=[outcome.model_dump() for outcome in patch_report.outcomes],
+            )
+
+            # --- 4. RECONSTRUCT THE TABLE ---
+            with span("reconstruct"):
+                # PDF inputs whose table survived extraction get the edits applied cell by cell
+                blocks = None
+                scenes = document.patched_scenes(patch_report.outcomes, edits) if document else None
+                if scenes is not None:
+                    print("📐 [Validator] Table structure preserved from PDF, skipping reconstruction")
+                elif self.revisions is not None:
+                    print("🏗️  [Validator] Reconstructing original table format...")
+                    scenes, blocks = await self.revisions.reconstruct(
+                        final_script_flat, previous, revision or RevisionSummary(previous_validation_id=""), script_content)
+                else:
+                    print("🏗️  [Validator] Reconstructing original table format...")
+                    scenes = await self.parser.parse_messy_text_to_json(final_script_flat, script_content)
+            await report("reconstruct", scenes=len(scenes))
+
+            # --- 5. GREEN HIGHLIGHT LOGIC ---
+            with span("highlight"):
+                print(f"🎨 [Validator] Highlighting {len(edits)} edits...")
+                # One automaton over all improved snippets, then a single scan per scene
+                matcher = self.highlighter.build_matcher(edits)
+                for scene in scenes:
+                    self.highlighter.highlight_scene(matcher, scene)
+                    # Per-scene event so streaming clients can render rows as they are ready
+                    await report("scene", scene=scene)
+            await report("highlight", edited_scenes=sum(1 for scene in scenes if scene['is_edited']))
+
+            # --- 6. PRINT THE PDF ---
+            with span("render"):
+                # We pass score & critique so they appear at the top of the PDF
+                project_name = payload.topic or "Validated_Script"
+                report_id = None
+                if self.reports is not None:
+                    # Rendered only when a client downloads it (GET /reports/{id}.pdf)
+                    report_id = await self.reports.register(scenes, score, critique, edits, project_name)
+                    pdf_url = self.reports.url(report_id)
+                else:
+                    print("📄 [Validator] Printing Final PDF...")
+                    # Filed under the submitted script, like its audit and table
+                    report_key = self.cache.make_key("report", script_content, script_hash(final_script_flat), scenes, score,
+                                                     critique, project_name)
+                    pdf_url = await self.cache.aget(report_key)
+                    if pdf_url is None:
+                        pdf_url = await self.pdf.create_table_report(
+                            scenes=scenes,
+                            score=score,
+                            critique=critique,
+                            project_name=project_name,
+                            # The /static URL is cached now and replaced by the CDN URL once the upload lands
+                            on_uploaded=lambda cdn_url: self.cache.aset(report_key, cdn_url)
+                        )
+                        await self.cache.aset(report_key, pdf_url)
+            await report("render", pdf_download_url=pdf_url, report_id=report_id)
+
+            # Time spent waiting on the competitor search after everything else was done
+            with span("research_wait"):
+                if competitors is not None:
+                    competitors = await asyncio.shield(competitors)
+                else:
+                    competitors = await research_task if research_task else []
+            # The hooks the audit was grounded on, next to their videos
+            if hooks:
+                by_link = {item["link"]: item["hook"] for item in hooks}
+                competitors = [dict(video, hook=by_link[video.get("link")]) if video.get("link") in by_link else video
+                               for video in competitors]
+
+            print(f"✅ [Validator] Done! URL: {pdf_url}")
+
+            validation_id = None
+            if self.revisions is not None:
+                validation_id = await self.revisions.save(payload.tone, payload.topic, scene_audits, blocks)
+
+            # --- 7. RETURN CLEAN RESPONSE ---
+            response = ScriptResponse(
+                analysis=AnalysisResult(score=score, critique=critique),
+                applied_edits=edits,
+                patch_report=patch_report.outcomes,
+                competitors=competitors,
+                # IMPORTANT: We send empty string here so your JSON response isn't huge.
+                # The full script is already inside the PDF URL.
+                final_script="",
+                pdf_download_url=pdf_url,
+                script_hash=script_hash(script_content),
+                validation_id=validation_id,
+                revision=revision,
+                report_id=report_id
+            )
+            await report("done")
+            return response
+
+        finally:
+            if research_task and not research_task.done():
+                research_task.cancel()
+            if hooks_task and not hooks_task.done():
+                hooks_task.cancel()
+
+    async def _mine_hooks(self, search) -> list:
+        # Shielded: a batch's shared search is not ours to cancel
+        videos = await asyncio.shield(search)
+        return await self.hooks.mine(videos)
+
+    async def _wait_for_hooks(self, hooks_task, started: float) -> list:
+        if hooks_task is None:
+            return []
+        remaining = self.hooks.wait - (time.perf_counter() - started)
+        try:
+            with span("hooks_wait"):
+                # Transcript fetches already under way still finish (and land in the cache) on timeout
+                return await asyncio.wait_for(hooks_task, timeout=max(0.0, remaining))
+        except asyncio.TimeoutError:
+            print(f"⏱️ [Validator] Competitor hooks not ready after {self.hooks.wait}s, auditing without them")
+        except Exception as e:
+            print(f"⚠️ [Validator] Competitor hooks failed ({e}), auditing without them")
+        return []
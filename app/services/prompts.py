@@ -0,0 +1,133 @@
+import re
+
+# --- TOKEN ESTIMATES ---
+# Letter runs, digit runs, then any other single non-space character
+_PIECE = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|_")
+
+# (context window, max output tokens) per model
+MODEL_LIMITS = {
+    "gemini-2.0-flash": (1_048_576, 8_192),
+}
+DEFAULT_LIMITS = (32_768, 8_192)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Local estimate of Gemini's token count (no API call), for budgets and quota.
+    Short words are one token and longer ones one more per ~7 letters; Gemini splits
+    numbers into single digits; punctuation is a token per mark; CJK is about a token
+    per character.
+    """
+    tokens = 1
+    for piece in _PIECE.findall(text or ""):
+        if piece.isdigit():
+            tokens += len(piece)
+        elif piece.isascii() or not any(ord(char) >= 0x2E80 for char in piece):
+            tokens += 1 + len(piece) // 7
+        else:
+            tokens += len(piece)
+    return tokens
+
+
+def model_limits(model_name: str) -> tuple:
+    return MODEL_LIMITS.get(model_name.split("/")[-1], DEFAULT_LIMITS)
+
+
+def input_budget(model_name: str, template: "PromptTemplate", cap: int, output_tokens: int) -> int:
+    """
+    Tokens of input (script) one call may carry: `cap`, or less if the context window
+    can't also hold the template's instructions and `output_tokens` of answer.
+    """
+    context, _ = model_limits(model_name)
+    return max(1, min(cap, context - template.tokens - output_tokens))
+
+
+def chars_for_tokens(text: str, tokens: int) -> int:
+    """How many characters of `text` make `tokens` tokens, at this text's own chars-per-token ratio."""
+    if not text:
+        return max(1, tokens * 4)
+    return max(1, tokens * len(text) // estimate_tokens(text))
+
+
+# --- TEMPLATES ---
+class PromptTemplate:
+    """
+    A versioned prompt: `prefix` is the static instruction block, the same on every call
+    and always sent first (so Gemini can cache it, see llm.ContextCache); `body` holds the
+    per-call parts as str.format fields. Any change to either text needs a new version,
+    since `key` is part of the result-cache keys.
+    """
+
+    def __init__(self, name: str, version: str, prefix: str, body: str):
+        self.name = name
+        self.version = version
+        self.prefix = prefix
+        self.body = body
+        self.prefix_tokens = estimate_tokens(prefix)
+        # Instructions plus the fixed text of the body
+        self.tokens = self.prefix_tokens + estimate_tokens(re.sub(r"\{\w+\}", "", body))
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}-{self.version}"
+
+    def render(self, **fields) -> "Prompt":
+        return Prompt(self, self.body.format(**fields))
+
+
+class Prompt:
+    """One rendered call: the template's prefix followed by the filled-in body."""
+
+    def __init__(self, template: PromptTemplate, body: str):
+        self.template = template
+        self.body = body
+
+    @property
+    def text(self) -> str:
+        return self.template.prefix + self.body
+
+    def __str__(self) -> str:
+        return self.text
+
+
+# PROMPT: We explicitly tell it to capture UNIQUE short phrases to make matching easier
+AUDIT = PromptTemplate("audit", "v5", prefix="""Act as a Ruthless YouTube Script Editor.
+
+INSTRUCTIONS:
+1. Score the script (0-100) on Hooks, Retention, and Payoff, for the target tone given below.
+2. If score < 100, you MUST provide at least 3 edits.
+3. CRITICAL: When choosing "original_snippet", pick a unique 5-10 word phrase that exists EXACTLY in the text. Do not quote huge paragraphs.
+4. "critique" is a list of short points, like "Hook is weak" or "Pacing is slow".
+""", body="""
+Target Tone: {tone}
+{scope}{hooks}
+SCRIPT:
+"{script}"
+""")
+
+# AUDIT's {hooks} when competitor hooks are available (transcripts.HookMiner.summary fills {hooks})
+AUDIT_HOOKS = """COMPETITOR HOOKS (how the top videos on this topic open). Judge the script's hook against them:
+{hooks}
+"""
+
+AUDIT_REPAIR = PromptTemplate("audit-repair", "v1", prefix="""A JSON answer below does not match its schema.
+Return it corrected. Keep its content; if it is cut off, close it after the last complete edit.
+""", body="""
+PROBLEM: {reason}
+
+ANSWER:
+{answer}
+""")
+
+# The row format itself is enforced by the response schema (ai_parser.TABLE_CONFIG)
+TABLE = PromptTemplate("table", "v3", prefix="""I have a YouTube script that lost its table formatting.
+Please reconstruct it into a list of scenes so I can print it as a table again.
+
+RULES:
+1. "visual_cue" usually contains "VEO PROMPT".
+2. "audio_dialogue" contains the spoken words.
+3. Keep the exact text content, just structure it.
+""", body="""{note}
+RAW INPUT TEXT:
+{text}
+""")
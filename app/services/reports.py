@@ -0,0 +1,251 @@
+import asyncio
+import hashlib
+import html
+import json
+import re
+import time
+from typing import List, Optional
+from app.core.concurrency import run_blocking
+from app.core.sqlite import connect, init_db
+from app.core.urls import public_base_url
+from app.core.telemetry import span, PDF_BYTES, REPORT_REQUESTS
+
+# Bump when the PDF / HTML / JSON layout changes: new IDs, so stored artifacts are never served stale
+TEMPLATE_VERSION = "report-v1"
+
+FORMATS = {
+    "pdf": "application/pdf",
+    "html": "text/html; charset=utf-8",
+    "json": "application/json",
+}
+
+
+class ReportNotFoundError(KeyError):
+    """Unknown report ID, or its contents expired."""
+
+
+def report_id(spec: dict) -> str:
+    """Content address of a report: same scenes, score, critique, edits and template -> same ID."""
+    payload = json.dumps([TEMPLATE_VERSION, spec], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class ReportStore:
+    """
+    SQLite store for lazily rendered reports.
+
+    `reports` keeps what a report is made of (small JSON, kept REPORT_TTL_SECONDS);
+    `artifacts` keeps each rendered format once, up to max_bytes in total, evicting
+    the least recently served first. An evicted artifact is simply rendered again.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 ** 2, ttl: float = 30 * 86400):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        init_db(
+            path,
+            "CREATE TABLE IF NOT EXISTS reports (id TEXT PRIMARY KEY, spec TEXT NOT NULL, created_at REAL NOT NULL)",
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            "id TEXT NOT NULL, format TEXT NOT NULL, data BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (id, format))",
+            "CREATE INDEX IF NOT EXISTS artifacts_last_used ON artifacts (last_used)",
+        )
+
+    def _connect(self):
+        return connect(self.path)
+
+    def put_spec(self, report_id: str, spec: dict):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM reports WHERE created_at < ?", (now - self.ttl,))
+            conn.execute("DELETE FROM artifacts WHERE id NOT IN (SELECT id FROM reports)")
+            # Stored once per content; a repeat only extends its lifetime
+            conn.execute(
+                "INSERT INTO reports (id, spec, created_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET created_at = excluded.created_at",
+                (report_id, json.dumps(spec, default=str), now),
+            )
+
+    def get_spec(self, report_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT spec FROM reports WHERE id = ? AND created_at >= ?",
+                               (report_id, time.time() - self.ttl)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_artifact(self, report_id: str, fmt: str) -> Optional[bytes]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM artifacts WHERE id = ? AND format = ?", (report_id, fmt)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE artifacts SET last_used = ? WHERE id = ? AND format = ?", (time.time(), report_id, fmt))
+        return bytes(row[0]) if row else None
+
+    def put_artifact(self, report_id: str, fmt: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO artifacts (id, format, data, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                         (report_id, fmt, data, len(data), time.time()))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            evicted = 0
+            for key, key_format, size in conn.execute(
+                    "SELECT id, format, size FROM artifacts ORDER BY last_used").fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM artifacts WHERE id = ? AND format = ?", (key, key_format))
+                total -= size
+                evicted += 1
+        print(f"🧹 [Reports] Evicted {evicted} artifact(s) to stay under {self.max_bytes // 1024 ** 2} MiB")
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            reports = conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+            artifacts, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+        return {"reports": reports, "artifacts": artifacts, "bytes": size, "max_bytes": self.max_bytes}
+
+
+class ReportService:
+    """
+    Content-addressed reports, rendered on first request.
+
+    /validate only registers what a report contains and hands out
+    /api/v1/reports/{id}.pdf; nothing is drawn until a client asks for a format.
+    Identical reports share one ID, so each format is rendered once and then served
+    from the store. Concurrent requests for the same artifact in a worker share one render.
+    Store reads and writes run in the thread pool, never on the event loop.
+    """
+
+    def __init__(self, store: ReportStore, pdf, base_url: str = ""):
+        self.store = store
+        self.pdf = pdf
+        self.base_url = base_url.rstrip("/")
+        self._rendering = {}
+
+    async def register(self, scenes: list, score: int, critique: list, edits: list, project_name: str) -> str:
+        spec = {
+            "project_name": project_name,
+            "score": score,
+            "critique": critique,
+            "edits": [edit.model_dump() if hasattr(edit, "model_dump") else edit for edit in edits],
+            "scenes": scenes,
+        }
+        key = report_id(spec)
+        await run_blocking("store", self.store.put_spec, key, spec)
+        return key
+
+    def url(self, report_id: str, fmt: str = "pdf") -> str:
+        """Absolute URL: base_url, else PUBLIC_BASE_URL or the origin of the current request."""
+        return f"{self.base_url or public_base_url()}/api/v1/reports/{report_id}.{fmt}"
+
+    def filename(self, report_id: str, spec: dict, fmt: str) -> str:
+        safe_name = re.sub(r'[^A-Za-z0-9_-]+', '_', spec["project_name"])[:40]
+        return f"audit_{safe_name}_{report_id[:8]}.{fmt}"
+
+    async def spec(self, report_id: str) -> dict:
+        """What the report is made of. Raises ReportNotFoundError."""
+        spec = await run_blocking("store", self.store.get_spec, report_id)
+        if spec is None:
+            raise ReportNotFoundError(report_id)
+        return spec
+
+    async def get(self, report_id: str, fmt: str, spec: Optional[dict] = None) -> tuple:
+        """(bytes, spec); pass spec if it was already looked up. Raises ReportNotFoundError."""
+        if spec is None:
+            spec = await self.spec(report_id)
+        data = await run_blocking("store", self.store.get_artifact, report_id, fmt)
+        if data is not None:
+            REPORT_REQUESTS.inc(format=fmt, result="stored")
+            return data, spec
+
+        task = self._rendering.get((report_id, fmt))
+        if task is None:
+            task = asyncio.create_task(self._render(report_id, fmt, spec))
+            self._rendering[(report_id, fmt)] = task
+            task.add_done_callback(lambda _: self._rendering.pop((report_id, fmt), None))
+        REPORT_REQUESTS.inc(format=fmt, result="rendered")
+        # Shielded: a client that disconnects doesn't cancel the render others are waiting on
+        return await asyncio.shield(task), spec
+
+    async def _render(self, report_id: str, fmt: str, spec: dict) -> bytes:
+        if fmt == "pdf":
+            # FPDF rendering is blocking, so it runs in the worker pool under the render limit
+            with span("pdf_draw"):
+                data = await run_blocking("render", self.pdf.render_table_report,
+                                          spec["scenes"], spec["score"], spec["critique"], spec["project_name"])
+            PDF_BYTES.observe(len(data), kind="table")
+        elif fmt == "html":
+            data = render_html(spec).encode("utf-8")
+        else:
+            data = json.dumps(render_diff(report_id, spec), ensure_ascii=False).encode("utf-8")
+        await run_blocking("render", self.store.put_artifact, report_id, fmt, data)
+        return data
+
+
+# --- RENDERINGS ---
+def _marked(text: str, spans: List[list]) -> str:
+    """Escaped cell text with the highlighted (edited) spans wrapped in <mark>."""
+    parts = []
+    position = 0
+    for start, end in spans:
+        parts.append(html.escape(text[position:start]))
+        parts.append(f"<mark>{html.escape(text[start:end])}</mark>")
+        position = end
+    parts.append(html.escape(text[position:]))
+    return "".join(parts).replace("\n", "<br>")
+
+
+def render_html(spec: dict) -> str:
+    """Same content as the PDF (scorecard + table, edited text highlighted) as one self-contained page."""
+    rows = []
+    for scene in spec["scenes"]:
+        highlights = scene.get("highlights") or {}
+        cells = "".join(
+            f"<td>{_marked(str(scene.get(field, '') or ''), highlights.get(field, []))}</td>"
+            for field in ("visual_cue", "audio_dialogue")
+        )
+        css = ' class="edited"' if scene.get("is_edited") else ""
+        rows.append(f"<tr{css}><td>{html.escape(str(scene.get('scene_number', '?')))}</td>{cells}</tr>")
+    critique = "".join(f"<li>{html.escape(str(point))}</li>" for point in spec["critique"])
+    title = html.escape(spec["project_name"])
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+        f"<title>Script Audit: {title}</title><style>"
+        "body{font-family:Arial,sans-serif;margin:2em;color:#323232}"
+        "header{background:#141e46;color:#fff;padding:1em;text-align:center}"
+        ".score{background:#f5f7fa;padding:1em;margin:1em 0}.score h2{color:#141e46;margin:0 0 .5em}"
+        "table{border-collapse:collapse;width:100%}th{background:#141e46;color:#fff}"
+        "td,th{border:1px solid #ccc;padding:.4em;vertical-align:top;text-align:left}"
+        "tr.edited td{color:#008000}mark{background:#dff5df;color:inherit}"
+        "</style></head><body>"
+        f"<header><h1>Script Audit: {title}</h1></header>"
+        f"<section class=\"score\"><h2>Viral Score: {int(spec['score'])}/100</h2><ul>{critique}</ul></section>"
+        "<table><thead><tr><th>Sc#</th><th>Visual Cue &amp; AI Prompt</th><th>Audio / Dialogue</th></tr></thead>"
+        f"<tbody>{''.join(rows)}</tbody></table></body></html>"
+    )
+
+
+def render_diff(report_id: str, spec: dict) -> dict:
+    """What the audit changed: each edit as before/after, and the scenes that now contain edited text."""
+    return {
+        "report_id": report_id,
+        "template": TEMPLATE_VERSION,
+        "project_name": spec["project_name"],
+        "score": spec["score"],
+        "critique": spec["critique"],
+        "changes": [
+            {"before": edit["original_snippet"], "after": edit["improved_snippet"], "reason": edit["reason"]}
+            for edit in spec["edits"]
+        ],
+        "edited_scenes": [
+            {
+                "scene_number": scene.get("scene_number"),
+                "visual_cue": scene.get("visual_cue", ""),
+                "audio_dialogue": scene.get("audio_dialogue", ""),
+                "highlights": scene.get("highlights") or {},
+            }
+            for scene in spec["scenes"] if scene.get("is_edited")
+        ],
+        "scenes_total": len(spec["scenes"]),
+    }
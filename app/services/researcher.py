@@ -1,12 +1,40 @@
-import requests
-import json
+import asyncio
+import httpx
 from app.core.config import settings
+from app.core.concurrency import stage
+from app.core.deadlines import capped
+from app.core.telemetry import traced
 
 class ResearchService:
-    def search_videos(self, query: str):
+    def __init__(self, cache=None):
+        self.cache = cache
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # One pooled client per process instead of a fresh connection per search
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.RESEARCH_TIMEOUT_SECONDS),
+                limits=httpx.Limits(max_connections=settings.RESEARCH_CONCURRENCY, max_keepalive_connections=settings.RESEARCH_CONCURRENCY),
+            )
+        return self._client
+
+    @property
+    def live(self) -> bool:
+        """False in dev mode (no Serper key), where search_videos returns placeholder videos."""
+        return bool(settings.SERPER_API_KEY)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def search_videos(self, query: str):
         """
         Searches Google Videos.
         FALLBACK: If no API key is found, returns MOCK DATA for testing.
+        Never raises and never exceeds RESEARCH_TIMEOUT_SECONDS: on any failure it returns [].
         """
         # --- MOCK MODE (For Testing/Demo) ---
         if not settings.SERPER_API_KEY:
@@ -33,31 +61,52 @@ class ResearchService:
             ]
 
         # --- REAL MODE (Production) ---
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key("research", query.lower())
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                return cached
+
+        # Never past the request's own deadline
+        timeout = capped(settings.RESEARCH_TIMEOUT_SECONDS)
+        try:
+            results = await asyncio.wait_for(self._fetch(query), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"⏱️ Search timed out after {timeout:.1f}s: {query}")
+            return []
+        except Exception as e:
+            print(f"Search Error: {e}")
+            return []
+
+        if cache_key is not None:
+            await self.cache.aset(cache_key, results, ttl=settings.RESEARCH_CACHE_TTL_SECONDS)
+        return results
+
+    @traced("research")
+    async def _fetch(self, query: str) -> list:
         url = "https://google.serper.dev/videos"
-        payload = json.dumps({
+        payload = {
             "q": f"{query} youtube",
-            "num": 3 
-        })
-        
+            "num": 3
+        }
+
         headers = {
             'X-API-KEY': settings.SERPER_API_KEY,
             'Content-Type': 'application/json'
         }
 
-        try:
-            response = requests.request("POST", url, headers=headers, data=payload)
-            results = response.json().get("videos", [])
-            
-            cleaned_results = []
-            for vid in results:
-                cleaned_results.append({
-                    "title": vid.get("title"),
-                    "link": vid.get("link"),
-                    "thumbnail": vid.get("imageUrl"),
-                    "channel": vid.get("channel")
-                })
-            return cleaned_results
-            
-        except Exception as e:
-            print(f"Search Error: {e}")
-            return []
\ No newline at end of file
+        async with stage("research"):
+            response = await self.client.post(url, headers=headers, json=payload)
+        response.raise_for_status()
+        results = response.json().get("videos", [])
+
+        cleaned_results = []
+        for vid in results:
+            cleaned_results.append({
+                "title": vid.get("title"),
+                "link": vid.get("link"),
+                "thumbnail": vid.get("imageUrl"),
+                "channel": vid.get("channel")
+            })
+        return cleaned_results
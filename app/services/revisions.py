@@ -0,0 +1,271 @@
+import asyncio
+import difflib
+import json
+import time
+import uuid
+from typing import List, Optional
+from app.core.config import settings
+from app.core.concurrency import run_blocking
+from app.core.sqlite import connect, init_db
+from app.schemas.script import Edit, RevisionSummary
+from app.services.cache import normalize_script, script_hash
+from app.services.chunker import split_scenes, stitch_scenes
+from app.services.highlighter import snippet_tokens
+from app.services.llm import LLMUnavailableError
+
+
+class RevisionStore:
+    """
+    SQLite table of past validations, so a resubmitted script can be diffed
+    against the version it was validated as. Entries expire after REVISION_TTL_SECONDS.
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 86400):
+        self.path = path
+        self.ttl = ttl
+        init_db(
+            path,
+            "CREATE TABLE IF NOT EXISTS validations (id TEXT PRIMARY KEY, record TEXT NOT NULL, created_at REAL NOT NULL)",
+        )
+
+    def _connect(self):
+        return connect(self.path)
+
+    def get(self, validation_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT record FROM validations WHERE id = ? AND created_at >= ?",
+                (validation_id, time.time() - self.ttl),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def create(self, record: dict) -> str:
+        validation_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM validations WHERE created_at < ?", (now - self.ttl,))
+            conn.execute("INSERT INTO validations (id, record, created_at) VALUES (?, ?, ?)",
+                         (validation_id, json.dumps(record), now))
+        return validation_id
+
+
+def scene_key(text: str) -> str:
+    return script_hash(text)[:16]
+
+
+def match_scenes(old_keys: List[str], new_keys: List[str]) -> List[Optional[int]]:
+    """For each new scene, the index of the identical old scene it continues, or None if it changed."""
+    mapping = [None] * len(new_keys)
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for block in matcher.get_matching_blocks():
+        for offset in range(block.size):
+            mapping[block.b + offset] = block.a + offset
+    return mapping
+
+
+def plan_excerpts(changed: List[int], total: int, context: int) -> List[tuple]:
+    """
+    Groups changed scene indexes into (start, end) runs to re-audit, end exclusive.
+    Runs whose context windows would touch are merged (the unchanged scenes between
+    them are re-audited too, which is cheaper than a second call with the same context).
+    """
+    runs = []
+    for index in changed:
+        if runs and index - runs[-1][1] <= 2 * context:
+            runs[-1][1] = index + 1
+        else:
+            runs.append([index, index + 1])
+    return [(start, min(end, total)) for start, end in runs]
+
+
+def attribute_edits(edits: List[Edit], scenes: List[str], first: int, last: int) -> dict:
+    """scene index -> edits whose original snippet lies in that scene (first..last-1); unplaced ones go to `first`."""
+    placed = {}
+    normalized = [normalize_script(scene).lower() for scene in scenes[first:last]]
+    for edit in edits:
+        snippet = normalize_script(edit.original_snippet).lower()
+        target = next((first + i for i, scene in enumerate(normalized) if snippet and snippet in scene), first)
+        placed.setdefault(target, []).append(edit)
+    return placed
+
+
+def merge_scene_audits(scene_audits: List[dict]) -> tuple:
+    """(edits, score, critique) for the whole script from per-scene results; score weighted by scene length."""
+    edits = []
+    seen_snippets = set()
+    critique = []
+    seen_points = set()
+    weighted = 0
+    total = 0
+    for audit in scene_audits:
+        for item in audit["edits"]:
+            key = snippet_tokens(item["original_snippet"])
+            if key not in seen_snippets:
+                seen_snippets.add(key)
+                edits.append(Edit(**item))
+        for point in audit["critique"]:
+            key = " ".join(str(point).lower().split())
+            if key not in seen_points:
+                seen_points.add(key)
+                critique.append(point)
+        weighted += audit["score"] * audit["chars"]
+        total += audit["chars"]
+    return edits, (round(weighted / total) if total else 0), critique
+
+
+class RevisionService:
+    """
+    Revision-aware audit and table rebuild.
+
+    Every validation is stored with per-scene results: the audit score, edits and
+    critique of each source scene, and the rebuilt table in blocks of whole (patched)
+    scenes. A request that references a previous validation ID is diffed against it
+    scene by scene: only changed scenes (plus REVISION_CONTEXT_SCENES on each side,
+    as read-only context) go back to Gemini, and only table blocks containing changed
+    scenes are rebuilt. The score is recomputed from the per-scene scores.
+    Store reads and writes run in the thread pool, never on the event loop.
+    """
+
+    def __init__(self, store: RevisionStore, editor, parser):
+        self.store = store
+        self.editor = editor
+        self.parser = parser
+
+    async def load(self, validation_id: Optional[str], tone: str) -> Optional[dict]:
+        if not validation_id:
+            return None
+        previous = await run_blocking("store", self.store.get, validation_id)
+        if previous is None:
+            print(f"⚠️ [Revisions] {validation_id} not found or expired, validating from scratch")
+            return None
+        if previous["tone"] != tone.strip().lower():
+            # The stored audits were made for another tone
+            print(f"⚠️ [Revisions] {validation_id} was audited for tone '{previous['tone']}', validating from scratch")
+            return None
+        return previous
+
+    async def audit(self, script: str, tone: str, previous: Optional[dict], summary: RevisionSummary,
+                    hooks: str = "") -> tuple:
+        """(edits, score, critique, scene_audits). Fills in the audit half of `summary`; hooks as in editor.analyze_script."""
+        scenes = split_scenes(script)
+        keys = [scene_key(scene) for scene in scenes]
+        summary.scenes_total = len(scenes)
+
+        mapping = [None] * len(scenes)
+        if previous is not None:
+            mapping = match_scenes([audit["key"] for audit in previous["scenes"]], keys)
+        changed = [i for i, old in enumerate(mapping) if old is None]
+        summary.scenes_changed = len(changed)
+
+        if previous is None or len(changed) > settings.REVISION_MAX_CHANGED_RATIO * len(scenes):
+            # First version, or so much changed that a whole-script audit is the better read
+            edits, score, critique = await self.editor.analyze_script(script, tone, hooks)
+            placed = attribute_edits(edits, scenes, 0, len(scenes))
+            scene_audits = [
+                {"key": keys[i], "chars": len(scenes[i]), "score": score, "critique": critique,
+                 "edits": [edit.model_dump() for edit in placed.get(i, [])]}
+                for i in range(len(scenes))
+            ]
+            summary.scenes_audited = len(scenes)
+            summary.audited_chars = len(script)
+            return edits, score, critique, scene_audits
+
+        scene_audits = [dict(previous["scenes"][old], chars=len(scenes[i])) if old is not None else None
+                        for i, old in enumerate(mapping)]
+        context = settings.REVISION_CONTEXT_SCENES
+        runs = plan_excerpts(changed, len(scenes), context)
+        if runs:
+            print(f"♻️ [Revisions] {len(changed)}/{len(scenes)} scenes changed: re-auditing {len(runs)} excerpt(s)")
+        excerpts = [
+            ("".join(scenes[max(0, start - context):start]), "".join(scenes[start:end]), "".join(scenes[end:end + context]))
+            for start, end in runs
+        ]
+        results = await asyncio.gather(*[self.editor.analyze_excerpt(*excerpt, tone, hooks, source=script) for excerpt in excerpts],
+                                       return_exceptions=True)
+
+        for (start, end), result in zip(runs, results):
+            if isinstance(result, Exception):
+                # A revision without its changed scenes audited is not a result
+                if isinstance(result, LLMUnavailableError):
+                    raise result
+                raise LLMUnavailableError(f"AI analysis failed: {result}") from result
+            edits, score, critique = result
+            placed = attribute_edits(edits, scenes, start, end)
+            for i in range(start, end):
+                scene_audits[i] = {"key": keys[i], "chars": len(scenes[i]), "score": score, "critique": critique,
+                                   "edits": [edit.model_dump() for edit in placed.get(i, [])]}
+        summary.scenes_audited = sum(end - start for start, end in runs)
+        summary.audited_chars = sum(len(part) for excerpt in excerpts for part in excerpt)
+
+        edits, score, critique = merge_scene_audits(scene_audits)
+        return edits, score, critique, scene_audits
+
+    async def reconstruct(self, patched_script: str, previous: Optional[dict], summary: RevisionSummary,
+                          source: Optional[str] = None) -> tuple:
+        """
+        (table rows, blocks). Blocks of the previous version whose scenes are all unchanged are reused as-is.
+        source: the submitted script, as in AIParserService.parse_messy_text_to_json.
+        blocks is None when the local parser read the whole table (cheap enough to redo every time).
+        """
+        parsed = self.parser.local_parser.parse(patched_script)
+        if parsed.confidence >= settings.LOCAL_PARSER_MIN_CONFIDENCE:
+            print(f"⚡ Local parser: {len(parsed.scenes)} scenes ({parsed.layout}, confidence {parsed.confidence})")
+            return parsed.scenes, None
+
+        scenes = split_scenes(patched_script)
+        keys = [scene_key(scene) for scene in scenes]
+
+        # --- REUSE UNCHANGED BLOCKS ---
+        reused = {}
+        covered = [False] * len(scenes)
+        if previous is not None:
+            positions = {}
+            for i, key in enumerate(keys):
+                positions.setdefault(key, []).append(i)
+            for block in previous["blocks"]:
+                block_keys = block["keys"]
+                for start in positions.get(block_keys[0], []):
+                    end = start + len(block_keys)
+                    if keys[start:end] == block_keys and not any(covered[start:end]):
+                        reused[start] = (end, block["rows"])
+                        covered[start:end] = [True] * len(block_keys)
+                        break
+
+        # --- PACK THE REST INTO NEW BLOCKS ---
+        spans = []
+        i = 0
+        while i < len(scenes):
+            if i in reused:
+                spans.append((i, reused[i][0], reused[i][1]))
+                i = reused[i][0]
+                continue
+            start = i
+            size = 0
+            while i < len(scenes) and not covered[i] and (i == start or size + len(scenes[i]) <= settings.REVISION_BLOCK_CHARS):
+                size += len(scenes[i])
+                i += 1
+            spans.append((start, i, None))
+
+        fresh = [(start, end) for start, end, rows in spans if rows is None]
+        if fresh:
+            print(f"🏗️  [Revisions] Rebuilding {len(fresh)} table block(s), reusing {len(reused)}")
+        rebuilt = await asyncio.gather(*[self.parser.parse_messy_text_to_json("".join(scenes[start:end]).strip(), source)
+                                         for start, end in fresh])
+        rebuilt = dict(zip(fresh, rebuilt))
+
+        blocks = []
+        for start, end, rows in spans:
+            rows = rows if rows is not None else rebuilt[(start, end)]
+            blocks.append({"keys": keys[start:end], "rows": rows})
+        summary.table_blocks_reused = len(reused)
+        summary.table_blocks_rebuilt = len(fresh)
+        return stitch_scenes([block["rows"] for block in blocks]), blocks
+
+    async def save(self, tone: str, topic: str, scene_audits: List[dict], blocks: Optional[List[dict]]) -> str:
+        return await run_blocking("store", self.store.create, {
+            "tone": tone.strip().lower(),
+            "topic": topic,
+            "scenes": scene_audits,
+            # None when the table came straight from the PDF layout
+            "blocks": blocks or [],
+        })
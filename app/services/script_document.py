@@ -0,0 +1,95 @@
+from bisect import bisect_right
+from typing import List, Optional
+
+FIELDS = ("visual_cue", "audio_dialogue")
+
+
+class ScriptDocument:
+    """
+    Flat script text, plus (when the source kept its table) the scenes and a map
+    from char offsets in the flat text to the scene cell they came from.
+    Edits located in the flat text can then be applied straight to the cells.
+    """
+
+    def __init__(self, text: str, scenes: Optional[list] = None, cells: Optional[list] = None):
+        self.text = text
+        self.scenes = scenes
+        # (start, end, scene_index, field), sorted by start, non-overlapping
+        self.cells = cells or []
+        self._starts = [cell[0] for cell in self.cells]
+
+    @classmethod
+    def from_scenes(cls, scenes: list) -> "ScriptDocument":
+        """Builds the flat text as labelled blocks ("Scene N / Visual: / Audio:") and records every cell's span."""
+        parts = []
+        cells = []
+        offset = 0
+
+        def emit(text: str):
+            nonlocal offset
+            parts.append(text)
+            offset += len(text)
+
+        for index, scene in enumerate(scenes):
+            emit(f"Scene {scene['scene_number']}\n")
+            for field, label in zip(FIELDS, ("Visual: ", "Audio: ")):
+                emit(label)
+                value = scene.get(field, "") or ""
+                cells.append((offset, offset + len(value), index, field))
+                emit(value)
+                emit("\n")
+            emit("\n")
+        return cls("".join(parts).rstrip("\n"), scenes=scenes, cells=cells)
+
+    def to_dict(self) -> dict:
+        # Cells are derived from the scenes, so they are not stored
+        return {"text": self.text, "scenes": self.scenes}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScriptDocument":
+        if data.get("scenes"):
+            return cls.from_scenes(data["scenes"])
+        return cls(data.get("text", ""))
+
+    @property
+    def has_table(self) -> bool:
+        return bool(self.scenes)
+
+    def cell_at(self, offset: int) -> Optional[tuple]:
+        i = bisect_right(self._starts, offset) - 1
+        if i >= 0 and self.cells[i][0] <= offset < self.cells[i][1]:
+            return self.cells[i]
+        return None
+
+    def patched_scenes(self, outcomes, edits) -> Optional[List[dict]]:
+        """
+        Applies located edits (PatchOutcome spans in self.text) directly to the scene cells.
+        Returns None if any applied edit touches text outside a cell or crosses cell
+        boundaries; the caller then has to rebuild the table from the patched flat text.
+        """
+        if not self.has_table:
+            return None
+
+        per_cell = {}
+        for outcome in outcomes:
+            if outcome.status == "rejected":
+                continue
+            cell = self.cell_at(outcome.start)
+            if cell is None or outcome.end > cell[1]:
+                return None
+            per_cell.setdefault((cell[2], cell[3]), []).append(
+                (outcome.start - cell[0], outcome.end - cell[0], edits[outcome.edit_index].improved_snippet)
+            )
+
+        scenes = [dict(scene) for scene in self.scenes]
+        for (index, field), replacements in per_cell.items():
+            original = scenes[index].get(field, "") or ""
+            pieces = []
+            cursor = 0
+            for start, end, improved in sorted(replacements):
+                pieces.append(original[cursor:start])
+                pieces.append(improved)
+                cursor = end
+            pieces.append(original[cursor:])
+            scenes[index][field] = "".join(pieces)
+        return scenes
@@ -1,67 +1,224 @@
 import re
 
+# Header rows of our "Scene # / Visual Cue & AI Prompt / Audio / Dialogue" tables
+HEADER_RE = re.compile(r'^\s*(?:sc(?:ene)?\s*#?|#)\s*[|\t ]+\s*visual.*audio', re.IGNORECASE)
+SEPARATOR_RE = re.compile(r'^\s*\|?\s*:?-{3,}')
+
+# "Scene 3", "SCENE 3:", "Sc 3 -", "Scene #3" at the start of a line
+SCENE_HEADING_RE = re.compile(r'^\s*(?:scene|sc\.?)\s*#?\s*(\d{1,4})\b\s*[:.\-–—)]?\s*(.*)$', re.IGNORECASE)
+VISUAL_LABEL_RE = re.compile(
+    r'^\s*(?:visual(?:\s+cue)?s?(?:\s*&\s*ai\s+prompt)?|video|shot|b-roll|on[- ]screen)\s*[:\-–]\s*(.*)$',
+    re.IGNORECASE)
+AUDIO_LABEL_RE = re.compile(
+    r'^\s*(?:audio(?:\s*/\s*dialogue)?|dialogue|narration|narrator|voice\s*-?\s*over|v\.?o\.?)\s*[:\-–]\s*(.*)$',
+    re.IGNORECASE)
+
+# Flattened PDF rows: a line that is just the scene number, or starts with it followed by a cell
+# separator or capitalized cell text (so dialogue like "2 minutes later..." doesn't start a row)
+ROW_NUMBER_RE = re.compile(r'^\s*(\d{1,4})(?:\s*$|\s*[|\t]\s*|\s+(?=[A-Z]))(.*)$')
+# The visual column always carries the generator prompt
+VEO_PROMPT_RE = re.compile(r'(?:\?\s*)?VEO PROMPT\s*:', re.IGNORECASE)
+
+
+class ParsedScript:
+    def __init__(self, scenes: list, confidence: float, layout: str):
+        self.scenes = scenes
+        self.confidence = confidence
+        self.layout = layout
+
+
+class _SceneBuilder:
+    """Collects scenes plus the characters that could not be placed in any scene."""
+
+    def __init__(self):
+        self.scenes = []
+        self.unassigned = 0
+
+    def start(self, number: int):
+        self.scenes.append({"scene_number": number, "visual_cue": [], "audio_dialogue": []})
+
+    def add(self, field: str, text: str):
+        text = text.strip()
+        if not text:
+            return
+        if not self.scenes:
+            self.unassigned += len(text)
+            return
+        self.scenes[-1][field].append(text)
+
+    def finish(self) -> list:
+        return [
+            {
+                "scene_number": scene["scene_number"],
+                "visual_cue": "\n".join(scene["visual_cue"]),
+                "audio_dialogue": "\n".join(scene["audio_dialogue"]),
+            }
+            for scene in self.scenes
+        ]
+
+
 class ScriptParser:
+    """
+    Deterministic, layout-aware parser for our scene tables.
+    Tries every known layout (pipe tables, tab-separated rows, labelled
+    "Scene N / Visual: / Audio:" blocks, flattened PDF rows) and keeps the one
+    with the highest confidence. Callers fall back to the LLM when confidence is low.
+    """
+
+    def parse(self, raw_text: str) -> ParsedScript:
+        text = (raw_text or "").replace("\r\n", "\n").replace("\r", "\n")
+        total = len(re.sub(r'\s+', '', text))
+        if not total:
+            return ParsedScript([], 0.0, "empty")
+
+        best = ParsedScript([], 0.0, "none")
+        for layout, parse in (
+            ("pipe_table", lambda t: self._parse_delimited(t, "|")),
+            ("tab_table", lambda t: self._parse_delimited(t, "\t")),
+            ("labelled_blocks", self._parse_labelled),
+            ("pdf_rows", self._parse_pdf_rows),
+        ):
+            builder = parse(text)
+            scenes = builder.finish()
+            confidence = self._confidence(scenes, builder.unassigned, total)
+            if confidence > best.confidence:
+                best = ParsedScript(scenes, confidence, layout)
+                if confidence >= 0.999:
+                    break
+        return best
+
     def parse_text_to_scenes(self, raw_text: str) -> list:
         """
         Attempts to reconstruct the table structure from raw PDF text.
-        Returns a list of dicts: [{'id': 1, 'visual': '...', 'audio': '...'}]
+        Returns a list of dicts: [{'scene_number': 1, 'visual_cue': '...', 'audio_dialogue': '...'}]
+        """
+        return self.parse(raw_text).scenes
+
+    # --- CONFIDENCE ---
+
+    def _confidence(self, scenes: list, unassigned: int, total: int) -> float:
+        """
+        min() of three signals, each in [0, 1]:
+          coverage     - share of the input text that landed in some scene
+          sequential   - share of scenes numbered exactly one after the previous
+          completeness - share of scenes with both a visual cue and dialogue
         """
-        scenes = []
-        
-        # This regex looks for the pattern: 
-        # "1" (Scene ID) -> followed by text -> followed by "? VEO PROMPT" (Visuals) -> followed by text (Audio)
-        # It relies on your specific format "Visual Cue & AI Prompt" vs "Audio / Dialogue"
-        
-        # Heuristic: Split by Scene Numbers (e.g., "1", "2", "3" at start of lines)
-        # Note: This is a "best effort" parser for raw text.
-        
-        # Split text by lines that look like just a number "1", "2"
-        # pattern = r"\n(\d+)\n" 
-        # This is tricky with raw PDF text. 
-        # A safer bet for now is to ask Gemini to restructure it, 
-        # but let's try a regex for your specific table layout.
-        
-        # Assuming the standard format you showed:
-        matches = re.split(r'\n(\d+)\s+(?=[A-Z])', raw_text)
-        
-        if len(matches) < 2:
-            # Fallback: Treat whole thing as Scene 1 if parsing fails
-            return [{'id': 1, 'visual': 'Could not parse columns', 'audio': raw_text}]
-
-        # Skip index 0 if it's header junk
-        current_id = 1
-        for i in range(1, len(matches), 2):
-            scene_num = matches[i]
-            content = matches[i+1] if i+1 < len(matches) else ""
-            
-            # Heuristic to split Visual vs Audio
-            # We look for the "? VEO PROMPT" tag which is always in the visual column
-            parts = content.split("? VEO PROMPT:")
-            
-            visual = ""
-            audio = ""
-            
-            if len(parts) > 1:
-                # The part BEFORE 'VEO PROMPT' is the visual cue description
-                # The part AFTER includes the prompt AND likely the audio dialogue
-                # This is hard to separate perfectly without OCR, but let's try:
-                
-                visual_part = parts[0].strip() + "\n\n? VEO PROMPT: " + parts[1].split('\n\n')[0]
-                
-                # Assume everything else is audio
-                # This is messy. A better way: The Validator AI will fix the split.
-                audio_part = parts[1].split('\n\n')[-1] # Last paragraph is usually audio
-                
-                visual = visual_part
-                audio = audio_part
+        if not scenes:
+            return 0.0
+        coverage = 1.0 - min(unassigned, total) / total
+        in_order = sum(1 for i in range(1, len(scenes)) if scenes[i]["scene_number"] == scenes[i - 1]["scene_number"] + 1)
+        sequential = (in_order + 1) / len(scenes)
+        complete = sum(1 for s in scenes if s["visual_cue"] and s["audio_dialogue"]) / len(scenes)
+        return round(min(coverage, sequential, complete), 3)
+
+    # --- LAYOUT 1 & 2: DELIMITED TABLE ROWS ---
+
+    def _parse_delimited(self, text: str, delimiter: str) -> _SceneBuilder:
+        builder = _SceneBuilder()
+        for line in text.split("\n"):
+            if delimiter not in line:
+                builder.unassigned += len(line.strip())
+                continue
+            if HEADER_RE.match(line.replace(delimiter, "\t")) or SEPARATOR_RE.match(line):
+                continue
+            cells = [cell.strip() for cell in line.strip().strip(delimiter).split(delimiter)]
+            if len(cells) >= 3:
+                number, visual, audio = cells[0], cells[1], " ".join(cells[2:])
+            elif len(cells) == 2:
+                number, visual, audio = "", cells[0], cells[1]
             else:
-                visual = "Parsed content"
-                audio = content
-            
-            scenes.append({
-                "id": scene_num,
-                "visual": visual,
-                "audio": audio
-            })
-            
-        return scenes
\ No newline at end of file
+                builder.unassigned += len(line.strip())
+                continue
+
+            number = number.lstrip("#").strip()
+            if number.isdigit():
+                builder.start(int(number))
+            elif number or not builder.scenes:
+                if len(cells) == 2 and not number:
+                    # Two-column table without a scene number column
+                    builder.start(len(builder.scenes) + 1)
+                else:
+                    builder.unassigned += len(line.strip())
+                    continue
+            # Rows with an empty number cell continue the previous scene (wrapped cells)
+            builder.add("visual_cue", visual)
+            builder.add("audio_dialogue", audio)
+        return builder
+
+    # --- LAYOUT 3: "SCENE N" BLOCKS WITH VISUAL / AUDIO LABELS ---
+
+    def _parse_labelled(self, text: str) -> _SceneBuilder:
+        builder = _SceneBuilder()
+        field = "audio_dialogue"
+        for line in text.split("\n"):
+            heading = SCENE_HEADING_RE.match(line)
+            if heading:
+                builder.start(int(heading.group(1)))
+                # Unlabelled text right after a heading is the shot description
+                field = "visual_cue"
+                line = heading.group(2)
+
+            visual = VISUAL_LABEL_RE.match(line)
+            audio = AUDIO_LABEL_RE.match(line)
+            if visual:
+                field = "visual_cue"
+                line = visual.group(1)
+            elif audio:
+                field = "audio_dialogue"
+                line = audio.group(1)
+            # Unlabelled lines continue whichever column we are in
+            builder.add(field, line)
+        return builder
+
+    # --- LAYOUT 4: FLATTENED PDF TABLE ROWS ---
+
+    def _parse_pdf_rows(self, text: str) -> _SceneBuilder:
+        builder = _SceneBuilder()
+        rows = []
+        current = None
+        for line in text.split("\n"):
+            if HEADER_RE.match(line) or self._is_header_fragment(line):
+                continue
+            match = ROW_NUMBER_RE.match(line)
+            expected = (rows[-1][0] + 1) if rows else 1
+            # Only accept the next number in sequence, so numbers inside dialogue don't split rows
+            if match and int(match.group(1)) == expected:
+                current = [expected, []]
+                rows.append(current)
+                line = match.group(2)
+            if current is None:
+                builder.unassigned += len(line.strip())
+            elif line.strip():
+                current[1].append(line)
+
+        for number, lines in rows:
+            builder.start(number)
+            visual, audio = self._split_visual_audio("\n".join(lines))
+            builder.add("visual_cue", visual)
+            builder.add("audio_dialogue", audio)
+        return builder
+
+    def _is_header_fragment(self, line: str) -> bool:
+        stripped = line.strip().lower()
+        return stripped in ("scene #", "sc#", "visual cue & ai prompt", "audio / dialogue", "audio/dialogue")
+
+    def _split_visual_audio(self, content: str):
+        """
+        The visual cell ends with the "VEO PROMPT: ..." paragraph; everything after it is dialogue.
+        Without that marker, quoted speech is taken as the start of the dialogue.
+        """
+        marker = VEO_PROMPT_RE.search(content)
+        if marker:
+            paragraph_end = content.find("\n\n", marker.end())
+            if paragraph_end < 0:
+                # PDF text has no blank lines: the prompt is the marker's line
+                paragraph_end = content.find("\n", marker.end())
+            if paragraph_end < 0:
+                return content, ""
+            return content[:paragraph_end], content[paragraph_end:]
+
+        quote = re.search(r'["“]', content)
+        if quote and quote.start() > 0:
+            return content[:quote.start()], content[quote.start():]
+        return "", content
+
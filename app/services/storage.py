@@ -0,0 +1,58 @@
+import io
+import os
+from app.core.config import settings
+
+
+class CloudinaryStorage:
+    """Uploads report PDFs to Cloudinary and returns their CDN URL. Blocking (SDK call)."""
+
+    def __init__(self):
+        # Imported here: only deployments that upload to Cloudinary pay for the SDK import
+        import cloudinary
+        cloudinary.config(
+            cloud_name=settings.CLOUDINARY_CLOUD_NAME,
+            api_key=settings.CLOUDINARY_API_KEY,
+            api_secret=settings.CLOUDINARY_API_SECRET,
+            secure=True
+        )
+
+    def upload(self, data: bytes, filename: str) -> str:
+        import cloudinary.uploader
+        import cloudinary.utils
+        public_id = f"scripts/{filename.rsplit('.', 1)[0]}"
+        cloudinary.uploader.upload(io.BytesIO(data), public_id=public_id, resource_type="image", format="pdf", overwrite=True)
+        pdf_url, _ = cloudinary.utils.cloudinary_url(public_id, resource_type="image", format="pdf")
+        return pdf_url
+
+
+class LocalStorage:
+    """
+    Writes reports into a directory and returns base_url + filename.
+    Used for the immediate /static copy, and as an offline stand-in for the CDN.
+    """
+
+    def __init__(self, directory: str, base_url: str):
+        self.directory = directory
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(directory, exist_ok=True)
+
+    def upload(self, data: bytes, filename: str) -> str:
+        path = os.path.join(self.directory, filename)
+        # Write then rename, so a half-written file is never served
+        with open(path + ".part", "wb") as f:
+            f.write(data)
+        os.replace(path + ".part", path)
+        return f"{self.base_url}/{filename}"
+
+    def delete(self, filename: str):
+        path = os.path.join(self.directory, filename)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def storage_from_settings():
+    """CDN backend for finished reports. Falls back to local files when Cloudinary isn't configured."""
+    if settings.REPORT_STORAGE == "cloudinary" and settings.CLOUDINARY_CLOUD_NAME:
+        return CloudinaryStorage()
+    print("⚠️ DEV MODE: No Cloudinary config. Reports are 'uploaded' to local storage.")
+    return LocalStorage(os.path.join(settings.STATIC_DIR, "uploads"), f"{settings.PUBLIC_BASE_URL}/static/uploads")
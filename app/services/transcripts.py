@@ -0,0 +1,211 @@
+import asyncio
+import re
+import time
+from typing import List, Optional
+from urllib.parse import parse_qs, urlparse
+from app.core.concurrency import get_executor, run_blocking, stage
+from app.core.sqlite import connect, init_db
+from app.core.telemetry import span, TRANSCRIPT_LOOKUPS
+
+# Caption noise: [Music], (applause), speaker-change arrows
+_NOISE = re.compile(r"\[[^\]]*\]|\([^)]*\)|>>")
+_VIDEO_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class TranscriptUnavailableError(LookupError):
+    """The video has no usable transcript (captions disabled, none in our languages, video gone...)."""
+
+
+def video_id(link: str) -> Optional[str]:
+    """YouTube video ID from a watch, youtu.be, shorts, embed or live link; None for anything else."""
+    parsed = urlparse(link or "")
+    host = parsed.netloc.lower().removeprefix("www.").removeprefix("m.")
+    candidate = None
+    if host == "youtu.be":
+        candidate = parsed.path.strip("/").split("/")[0]
+    elif host.endswith("youtube.com"):
+        if parsed.path == "/watch":
+            candidate = parse_qs(parsed.query).get("v", [""])[0]
+        else:
+            parts = parsed.path.strip("/").split("/")
+            if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live"):
+                candidate = parts[1]
+    return candidate if candidate and _VIDEO_ID.match(candidate) else None
+
+
+def extract_hook(snippets: List[dict], min_seconds: float, max_seconds: float) -> str:
+    """
+    The opening of a transcript: snippets from the start until the first sentence end
+    after min_seconds, and never past max_seconds. Caption noise is dropped.
+    """
+    parts = []
+    for snippet in sorted(snippets, key=lambda item: item["start"]):
+        if snippet["start"] >= max_seconds:
+            break
+        text = " ".join(_NOISE.sub(" ", snippet["text"]).split())
+        if text:
+            parts.append(text)
+        if snippet["start"] + snippet.get("duration", 0) >= min_seconds and text.endswith((".", "!", "?")):
+            break
+    return " ".join(parts)
+
+
+class YouTubeTranscriptFetcher:
+    """
+    Captions from YouTube through youtube-transcript-api. The library is blocking, so each
+    fetch runs in the shared worker pool. Any fetcher with the same async fetch(video_id)
+    can stand in for it (benchmarks use a local fake).
+    """
+
+    def __init__(self, languages=("en",)):
+        self.languages = tuple(languages)
+
+    async def fetch(self, video_id: str) -> List[dict]:
+        """[{"text", "start", "duration"}, ...]. Raises TranscriptUnavailableError."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), self._fetch, video_id)
+
+    def _fetch(self, video_id: str) -> List[dict]:
+        from youtube_transcript_api import YouTubeTranscriptApi, YouTubeTranscriptApiException
+        try:
+            transcript = YouTubeTranscriptApi().fetch(video_id, languages=self.languages)
+        except YouTubeTranscriptApiException as e:
+            raise TranscriptUnavailableError(f"{video_id}: {type(e).__name__}") from e
+        return [{"text": snippet.text, "start": snippet.start, "duration": snippet.duration} for snippet in transcript]
+
+
+class TranscriptCache:
+    """
+    On-disk cache of competitor hooks, keyed by video ID and hook window. Only the hook
+    is kept, not the transcript. Videos without one are stored as "" for the shorter
+    miss_ttl, so they are not asked for on every request.
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 86400, miss_ttl: float = 86400):
+        self.path = path
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        init_db(
+            path,
+            "CREATE TABLE IF NOT EXISTS hooks ("
+            "video_id TEXT NOT NULL, window TEXT NOT NULL, hook TEXT NOT NULL, fetched_at REAL NOT NULL, "
+            "PRIMARY KEY (video_id, window))",
+        )
+
+    def _connect(self):
+        return connect(self.path)
+
+    def get(self, video_id: str, window: str) -> Optional[str]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT hook, fetched_at FROM hooks WHERE video_id = ? AND window = ?",
+                               (video_id, window)).fetchone()
+        if row is None or row[1] < now - (self.ttl if row[0] else self.miss_ttl):
+            return None
+        return row[0]
+
+    def set(self, video_id: str, window: str, hook: str):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM hooks WHERE fetched_at < ?", (now - max(self.ttl, self.miss_ttl),))
+            conn.execute("INSERT OR REPLACE INTO hooks (video_id, window, hook, fetched_at) VALUES (?, ?, ?, ?)",
+                         (video_id, window, hook, now))
+
+
+class HookMiner:
+    """
+    How the top competitor videos open, to ground the audit.
+
+    Transcripts of the first `videos` YouTube results are fetched concurrently (bounded by
+    the "transcripts" stage limit), each within `timeout` seconds, and cut down to their
+    hook (see extract_hook). Never raises: videos without a transcript, or whose fetch
+    fails or times out, are left out. Concurrent requests for the same video share one
+    fetch, which finishes (and lands in the cache) even if the request that started it
+    stops waiting. `wait` is how long the pipeline holds the audit for the result.
+    """
+
+    def __init__(self, fetcher, cache: Optional[TranscriptCache] = None, videos: int = 3,
+                 min_seconds: float = 30, max_seconds: float = 60, timeout: float = 4,
+                 wait: float = 5, summary_chars: int = 1500):
+        self.fetcher = fetcher
+        self.cache = cache
+        self.videos = videos
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.timeout = timeout
+        self.wait = wait
+        self.summary_chars = summary_chars
+        self._fetching = {}
+
+    @property
+    def window(self) -> str:
+        return f"{self.min_seconds:g}-{self.max_seconds:g}"
+
+    async def mine(self, competitors: List[dict]) -> List[dict]:
+        """
+        [{"link", "title", "channel", "hook"}] for the competitors that have a hook, in search order.
+        A video listed more than once is mined (and counts towards `videos`) once.
+        """
+        targets = {}
+        for competitor in competitors:
+            key = video_id(competitor.get("link"))
+            if key and key not in targets:
+                targets[key] = competitor
+        targets = [(competitor, key) for key, competitor in targets.items()][:self.videos]
+        with span("hooks"):
+            hooks = await asyncio.gather(*[self.hook(key) for _, key in targets])
+        return [
+            {"link": competitor.get("link"), "title": competitor.get("title") or "", "channel": competitor.get("channel") or "",
+             "hook": hook}
+            for (competitor, _), hook in zip(targets, hooks) if hook
+        ]
+
+    async def hook(self, video_id: str) -> str:
+        """The video's hook, or "" if it has none."""
+        if self.cache is not None:
+            cached = await run_blocking("store", self.cache.get, video_id, self.window)
+            if cached is not None:
+                TRANSCRIPT_LOOKUPS.inc(result="cached")
+                return cached
+        task = self._fetching.get(video_id)
+        if task is None:
+            task = asyncio.create_task(self._fetch_hook(video_id))
+            self._fetching[video_id] = task
+            task.add_done_callback(lambda _: self._fetching.pop(video_id, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_hook(self, video_id: str) -> str:
+        try:
+            async with stage("transcripts"):
+                snippets = await asyncio.wait_for(self.fetcher.fetch(video_id), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            # Not cached: it may well answer next time
+            print(f"⏱️ Transcript timed out after {self.timeout}s: {video_id}")
+            TRANSCRIPT_LOOKUPS.inc(result="timeout")
+            return ""
+        except TranscriptUnavailableError:
+            hook = ""
+        except Exception as e:
+            print(f"Transcript Error ({video_id}): {e}")
+            TRANSCRIPT_LOOKUPS.inc(result="error")
+            return ""
+        else:
+            hook = extract_hook(snippets, self.min_seconds, self.max_seconds)
+        TRANSCRIPT_LOOKUPS.inc(result="fetched" if hook else "unavailable")
+        if self.cache is not None:
+            await run_blocking("store", self.cache.set, video_id, self.window, hook)
+        return hook
+
+    def summary(self, hooks: List[dict]) -> str:
+        """One line per hook, the hooks shortened (at a word) to share summary_chars between them."""
+        if not hooks:
+            return ""
+        share = max(80, self.summary_chars // len(hooks))
+        lines = []
+        for item in hooks:
+            hook = item["hook"]
+            if len(hook) > share:
+                hook = hook[:share].rsplit(" ", 1)[0] + "..."
+            source = f'"{item["title"]}"' + (f' ({item["channel"]})' if item["channel"] else "")
+            lines.append(f'- {source}: "{hook}"')
+        return "\n".join(lines)
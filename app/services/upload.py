@@ -0,0 +1,135 @@
+import tempfile
+from typing import AsyncIterator
+from app.core.telemetry import span
+from app.services.pdf_reader import DownloadTooLargeError
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:
+    # python-multipart before 0.0.13 only ships the `multipart` package name
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# Plain form fields are small; anything bigger is not a form we expect
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class UploadFormatError(ValueError):
+    """The body is not the multipart/form-data upload /validate/upload expects."""
+
+
+class ScriptUpload:
+    """
+    Receives a multipart/form-data script upload while it streams in.
+
+    Form fields must come before the file part ("file"): receive_fields() returns as
+    soon as the file starts, so the pipeline can start (competitor search included)
+    while the rest of the file is still arriving. receive_file() then drains the body.
+    The file is written straight into a SpooledTemporaryFile (memory up to spool_bytes,
+    then disk), so the document is only ever held once; passing max_bytes aborts the
+    upload with DownloadTooLargeError.
+    """
+
+    FILE_FIELD = "file"
+
+    def __init__(self, content_type: str, chunks: AsyncIterator[bytes], max_bytes: int, spool_bytes: int):
+        media_type, options = parse_options_header(content_type)
+        if media_type != b"multipart/form-data" or not options.get(b"boundary"):
+            raise UploadFormatError("Send the script as multipart/form-data with a 'file' part.")
+        self.chunks = chunks.__aiter__()
+        self.max_bytes = max_bytes
+        self.file = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+        self.size = 0
+        self.fields = {}
+        self.filename = None
+        self.content_type = ""
+
+        self._headers = {}
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._part = None  # field name, or FILE_FIELD while the file part is being written
+        self._value = bytearray()
+        self._file_started = False
+        self._file_done = False
+        self.parser = MultipartParser(options[b"boundary"], callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": lambda data, start, end: self._header_field.extend(data[start:end]),
+            "on_header_value": lambda data, start, end: self._header_value.extend(data[start:end]),
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    # --- PARSER CALLBACKS ---
+    def _on_part_begin(self):
+        if self._file_done:
+            raise UploadFormatError("Form fields must come before the file part.")
+        self._headers = {}
+
+    def _on_header_end(self):
+        self._headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def _on_headers_finished(self):
+        _, disposition = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = disposition.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" in disposition or name == self.FILE_FIELD:
+            if name != self.FILE_FIELD:
+                raise UploadFormatError(f"Unexpected file part '{name}', send the script as '{self.FILE_FIELD}'.")
+            self.filename = disposition.get(b"filename", b"").decode("utf-8", "replace") or None
+            self.content_type = self._headers.get(b"content-type", b"").decode("latin-1")
+            self._file_started = True
+        self._part = name
+        self._value.clear()
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._part == self.FILE_FIELD:
+            self.size += end - start
+            if self.size > self.max_bytes:
+                raise DownloadTooLargeError(f"Upload is larger than the {self.max_bytes} byte limit.")
+            # memoryview: no intermediate copy of the chunk on its way to the spool file
+            self.file.write(memoryview(data)[start:end])
+        else:
+            self._value.extend(data[start:end])
+            if len(self._value) > MAX_FIELD_BYTES:
+                raise UploadFormatError(f"Form field '{self._part}' is too large.")
+
+    def _on_part_end(self):
+        if self._part == self.FILE_FIELD:
+            self._file_done = True
+        elif self._part:
+            self.fields[self._part] = self._value.decode("utf-8", "replace")
+        self._part = None
+
+    # --- RECEIVING ---
+    async def _feed(self) -> bool:
+        """Feeds the next body chunk to the parser. False once the body has ended."""
+        try:
+            chunk = await self.chunks.__anext__()
+        except StopAsyncIteration:
+            return False
+        if chunk:
+            self.parser.write(chunk)
+        return True
+
+    async def receive_fields(self) -> dict:
+        """Reads up to the start of the file part and returns the form fields sent before it."""
+        while not self._file_started:
+            if not await self._feed():
+                raise UploadFormatError(f"No '{self.FILE_FIELD}' part in the upload.")
+        return self.fields
+
+    async def receive_file(self):
+        """Reads the rest of the body and returns the spooled file, rewound."""
+        with span("receive"):
+            while await self._feed():
+                pass
+            self.parser.finalize()
+        if not self._file_done:
+            raise UploadFormatError("The upload ended before the file was complete.")
+        self.file.seek(0)
+        return self.file
+
+    def close(self):
+        self.file.close()
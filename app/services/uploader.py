@@ -0,0 +1,100 @@
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+from app.core.concurrency import run_blocking
+from app.core import telemetry
+from app.core.telemetry import span
+
+
+class ReportUploader:
+    """
+    Uploads rendered reports to the CDN in the background.
+    Requests get the local /static URL straight away; once an upload lands, the
+    on_uploaded coroutine function receives the CDN URL and resolve() maps the local URL to it.
+    The queue is bounded: when it is full the report simply stays local.
+    With a cache, resolved URLs are also written there, so other worker processes resolve them too.
+    """
+
+    def __init__(self, storage, workers: int = 2, queue_size: int = 100, retries: int = 3, resolved_entries: int = 4096,
+                 cache=None):
+        self.storage = storage
+        self.cache = cache
+        self.workers = workers
+        self.queue_size = queue_size
+        self.retries = retries
+        self.resolved_entries = resolved_entries
+        self._queue = None
+        self._tasks = []
+        # local URL -> CDN URL, most recent last
+        self._resolved = OrderedDict()
+
+    def start(self):
+        if any(not task.done() for task in self._tasks):
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, data: bytes, filename: str, local_url: str,
+               on_uploaded: Optional[Callable[[str], Awaitable]] = None) -> bool:
+        """Queues an upload. Returns False (report stays local only) if the queue is full."""
+        self.start()
+        try:
+            self._queue.put_nowait((data, filename, local_url, on_uploaded))
+            return True
+        except asyncio.QueueFull:
+            print(f"⚠️ [Upload] Queue full, keeping {filename} local only")
+            return False
+
+    async def resolve(self, url: str) -> str:
+        """The CDN URL for a local report URL once its upload has landed, else the URL unchanged."""
+        resolved = self._resolved.get(url)
+        if resolved is None and self.cache is not None:
+            resolved = await self.cache.aget(self.cache.make_key("upload", url))
+        return resolved or url
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self):
+        # Started lazily from whichever request submits first: don't report into its trace
+        telemetry.detach()
+        while True:
+            item = await self._queue.get()
+            try:
+                await self._upload(*item)
+            finally:
+                self._queue.task_done()
+
+    async def _upload(self, data: bytes, filename: str, local_url: str, on_uploaded):
+        for attempt in range(self.retries):
+            try:
+                # Runs outside any request, so this only feeds the stage histogram
+                with span("upload"):
+                    cdn_url = await run_blocking("upload", self.storage.upload, data, filename)
+                break
+            except Exception as e:
+                print(f"⚠️ [Upload] Attempt {attempt + 1} failed for {filename}: {e}")
+                if attempt + 1 < self.retries:
+                    await asyncio.sleep(2 ** attempt)
+        else:
+            print(f"❌ [Upload] Giving up on {filename}, it stays at {local_url}")
+            return
+
+        self._resolved[local_url] = cdn_url
+        while len(self._resolved) > self.resolved_entries:
+            self._resolved.popitem(last=False)
+        if self.cache is not None:
+            await self.cache.aset(self.cache.make_key("upload", local_url), cdn_url)
+        print(f"☁️ [Upload] {filename} -> {cdn_url}")
+        if on_uploaded is not None:
+            try:
+                await on_uploaded(cdn_url)
+            except Exception as e:
+                print(f"⚠️ [Upload] Callback failed for {filename}: {e}")
@@ -0,0 +1,99 @@
+"""
+Cold start: how long a fresh process takes before it can answer.
+
+  python -m benchmarks.bench_cold_start --runs 5
+
+  import      `import app.main` in a fresh interpreter (median of --runs)
+  uvicorn     spawn -> first 200 from GET /, single process
+  gunicorn    spawn -> first 200 from GET /, gunicorn.conf.py with --workers workers
+
+Each server gets its own temporary SQLite files and static dir, so runs don't
+share state with each other or with a dev server.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import app.main; print(time.perf_counter() - start)"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_env(workdir: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=ROOT, GEMINI_API_KEY=os.getenv("GEMINI_API_KEY", "bench-key"))
+    for name in ("CACHE_PATH", "JOBS_DB_PATH", "DOWNLOAD_CACHE_PATH", "REVISIONS_DB_PATH", "REPORTS_DB_PATH",
+                 "TRANSCRIPTS_DB_PATH", "RATE_LIMIT_DB_PATH"):
+        env[name] = os.path.join(workdir, name.lower() + ".sqlite3")
+    env["STATIC_DIR"] = os.path.join(workdir, "static")
+    os.makedirs(env["STATIC_DIR"], exist_ok=True)
+    return env
+
+
+def time_import(runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, capture_output=True, text=True, check=True,
+                             env=dict(os.environ, PYTHONPATH=ROOT))
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def time_first_response(command: list, port: int, timeout: float = 30) -> float:
+    with tempfile.TemporaryDirectory(prefix="cold-start-") as workdir:
+        start = time.perf_counter()
+        server = subprocess.Popen(command, cwd=ROOT, env=dict(server_env(workdir), PORT=str(port)),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        # One client for all polls: building one per attempt costs more than the server's own startup steps
+        client = httpx.Client(timeout=1)
+        try:
+            while time.perf_counter() - start < timeout:
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/").status_code == 200:
+                        return time.perf_counter() - start
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None:
+                    raise SystemExit(f"{command[0]} exited with {server.returncode} before serving")
+                time.sleep(0.01)
+            raise SystemExit(f"{command[0]} did not answer within {timeout}s")
+        finally:
+            client.close()
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"import app.main   {time_import(args.runs) * 1000:7.0f} ms  (median of {args.runs})")
+
+    servers = {
+        "uvicorn": lambda port: [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        "gunicorn": lambda port: [sys.executable, "-m", "gunicorn", "app.main:app", "-c", "gunicorn.conf.py",
+                                  "--workers", str(args.workers), "--bind", f"127.0.0.1:{port}"],
+    }
+    for name, command in servers.items():
+        samples = []
+        for _ in range(args.runs):
+            port = free_port()
+            samples.append(time_first_response(command(port), port))
+        print(f"{name:<9} first 200 {statistics.median(samples) * 1000:7.0f} ms  (median of {args.runs})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+End-to-end benchmark of /api/v1/validate, reproducible offline.
+
+  python -m benchmarks.bench_e2e                                   # default matrix
+  python -m benchmarks.bench_e2e --scenes 12 240 --concurrency 1 16 --output run.json
+  python -m benchmarks.bench_e2e --save-baseline baseline.json     # on the reference machine
+  python -m benchmarks.bench_e2e --baseline baseline.json          # exit 1 on regression
+  python -m benchmarks.bench_e2e --record                          # live Gemini -> fixtures
+  python -m benchmarks.bench_e2e --record --from-stubs             # seed fixtures from the stubs
+
+Everything runs in one process: the FastAPI app through httpx.ASGITransport,
+Gemini replayed from benchmarks/recordings (recorded latency x --latency-scale),
+cloudinary.uploader, Serper and YouTube transcripts stubbed. Result caches are off,
+so every request does the full work. Per-stage timings come from each response's
+Server-Timing header.
+
+Scenarios are named "<input>-<scenes>s-c<concurrency>" (input: text, pdf by URL, or
+the same pdf sent to /validate/upload). Each keeps `concurrency` requests in flight
+until `requests` have finished. Peak RSS is sampled for the whole process while the
+scenario runs.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from benchmarks import stubs
+from benchmarks.fixtures import DEFAULT_PATH, GeminiFixtures, RecordingModel, ReplayModel
+
+# Stages in pipeline order, as named by the telemetry spans
+STAGES = ["download", "fetch", "receive", "parse", "hooks", "hooks_wait", "audit", "gemini", "patch", "reconstruct", "highlight",
+          "pdf_draw", "pdf_save", "render", "research_wait"]
+
+
+class RssSampler:
+    """Polls the process RSS from a background thread and keeps the peak since the last reset()."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def current() -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            # Not Linux: the lifetime high-water mark is the best we have
+            import resource
+            scale = 1 if sys.platform == "darwin" else 1024
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def start(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def reset(self) -> int:
+        self.peak = self.current()
+        return self.peak
+
+    def stop(self):
+        self._stop.set()
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    ordered = sorted(values)
+
+    def rank(q: float) -> float:
+        # Nearest-rank percentile
+        return ordered[max(0, min(len(ordered) - 1, int(round(q * len(ordered) + 0.5)) - 1))]
+
+    return {"p50": round(rank(0.50), 2), "p95": round(rank(0.95), 2), "p99": round(rank(0.99), 2)}
+
+
+def parse_server_timing(header: str) -> dict:
+    timings = {}
+    for part in header.split(","):
+        name, _, rest = part.strip().partition(";dur=")
+        if name and rest:
+            timings[name] = float(rest)
+    return timings
+
+
+def make_scenes(count: int) -> list:
+    return [
+        {"scene_number": i, "visual_cue": f"Medium shot {i}: the creator at a standing desk.", "audio_dialogue": block}
+        for i, block in enumerate(stubs.sample_script(count).split("\n\n"), start=1)
+    ]
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.fixtures = GeminiFixtures(args.fixtures)
+        self.pdf_inputs = {}
+
+    def install(self):
+        """Points the container services at fixtures and stubs, with result caches off."""
+        from app.api.deps import container
+        from app.core import telemetry
+        from app.core.config import settings
+        from app.services import ai_parser, editor
+        from app.services.cache import MemoryCacheBackend, ResultCache
+        from app.services.reports import ReportStore
+        from app.services.revisions import RevisionStore
+
+        # Server-Timing carries the per-stage numbers
+        telemetry.enabled = True
+
+        if self.args.record:
+            source = "stubs" if self.args.from_stubs else "gemini"
+            if self.args.from_stubs:
+                inner_editor = inner_parser = stubs.FakeGeminiModel(latency=0)
+            else:
+                import google.generativeai as genai
+                inner_editor, inner_parser = genai.GenerativeModel(editor.MODEL_NAME), genai.GenerativeModel(ai_parser.MODEL_NAME)
+            container.editor_service.model = RecordingModel(inner_editor, self.fixtures, editor.MODEL_NAME, source)
+            container.parser_service.model = RecordingModel(inner_parser, self.fixtures, ai_parser.MODEL_NAME, source)
+        else:
+            container.editor_service.model = ReplayModel(self.fixtures, editor.MODEL_NAME, self.args.latency_scale)
+            container.parser_service.model = ReplayModel(self.fixtures, ai_parser.MODEL_NAME, self.args.latency_scale)
+
+        # A cache that never keeps anything: every request does the full work
+        no_cache = ResultCache(MemoryCacheBackend(max_entries=0))
+        for service in (container.editor_service, container.parser_service, container.research_service, container.pipeline):
+            service.cache = no_cache
+        container.reader_service.cache = None
+        # Revision records go to a throwaway file; no request references a previous validation
+        workdir = tempfile.mkdtemp(prefix="bench-")
+        container.pipeline.revisions.store = RevisionStore(os.path.join(workdir, "revisions.sqlite3"))
+        container.report_service.store = ReportStore(os.path.join(workdir, "reports.sqlite3"))
+        container.reader_service._client = httpx.AsyncClient(transport=httpx.MockTransport(self.serve_pdf))
+
+        container.report_uploader.storage = stubs.FakeCloudinary(self.args.upload_latency).install()
+        settings.SERPER_API_KEY = settings.SERPER_API_KEY or "stub-key"
+        container.research_service._client = httpx.AsyncClient(transport=stubs.FakeSerper(self.args.serper_latency).transport())
+        container.hook_miner.fetcher = stubs.FakeTranscripts(self.args.transcript_latency)
+        container.hook_miner.cache = None
+        settings.WORKER_THREADS = max(settings.WORKER_THREADS, 16)
+        return container
+
+    def pdf_input(self, scenes: int) -> bytes:
+        if scenes not in self.pdf_inputs:
+            from app.services.pdf_builder import PDFService
+            self.pdf_inputs[scenes] = PDFService().render_table_report(make_scenes(scenes), 0, [], "Script")
+        return self.pdf_inputs[scenes]
+
+    def serve_pdf(self, request: httpx.Request) -> httpx.Response:
+        scenes = int(request.url.path.strip("/").split("-")[0])
+        return httpx.Response(200, content=self.pdf_input(scenes), headers={"content-type": "application/pdf"})
+
+    def payload(self, input_kind: str, scenes: int, index: int) -> dict:
+        payload = {"tone": "engaging", "topic": "Morning routines", "fetch_competitors": True}
+        if input_kind == "pdf":
+            # Distinct URLs, so concurrent requests don't share one download
+            payload["script_url"] = f"https://scripts.example.invalid/{scenes}-{index}.pdf"
+        else:
+            payload["content"] = stubs.sample_script(scenes)
+        return payload
+
+    async def run_scenario(self, client: httpx.AsyncClient, sampler: RssSampler, input_kind: str,
+                           scenes: int, concurrency: int, requests: int) -> dict:
+        from app.api.deps import container
+        from app.services.llm import LLMClient
+
+        # Fresh quota buckets and breaker, so one scenario can't throttle the next
+        container.editor_service.llm = container.parser_service.llm = LLMClient.from_settings()
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one(index: int):
+            async with limit:
+                start = time.perf_counter()
+                if input_kind == "upload":
+                    # Same PDF as the "pdf" input, sent as multipart/form-data instead of fetched by URL
+                    fields = {name: str(value) for name, value in self.payload("text", scenes, index).items() if name != "content"}
+                    response = await client.post("/api/v1/validate/upload", data=fields,
+                                                 files={"file": ("script.pdf", self.pdf_input(scenes), "application/pdf")})
+                else:
+                    response = await client.post("/api/v1/validate", json=self.payload(input_kind, scenes, index))
+                timings = parse_server_timing(response.headers.get("server-timing", ""))
+                if self.args.fetch_pdf and response.status_code == 200:
+                    # Reports are rendered on first download: count that render as part of the request
+                    download = await client.get(response.json()["pdf_download_url"])
+                    timings.update(parse_server_timing(download.headers.get("server-timing", "")))
+                    response = download
+                elapsed = (time.perf_counter() - start) * 1000
+                return response.status_code, elapsed, timings
+
+        rss_start = sampler.reset()
+        start = time.perf_counter()
+        results = await asyncio.gather(*[one(i) for i in range(requests)])
+        wall = time.perf_counter() - start
+
+        ok = [r for r in results if r[0] == 200]
+        stages = {}
+        for name in STAGES:
+            values = [timings[name] for _, _, timings in ok if name in timings]
+            if values:
+                stages[name] = percentiles(values)
+        return {
+            "input": input_kind,
+            "scenes": scenes,
+            "concurrency": concurrency,
+            "requests": requests,
+            "errors": len(results) - len(ok),
+            "throughput_rps": round(len(ok) / wall, 3),
+            "latency_ms": percentiles([elapsed for _, elapsed, _ in ok]),
+            "stages_ms": stages,
+            "peak_rss_mib": round(sampler.peak / 2**20, 1),
+            "rss_growth_mib": round((sampler.peak - rss_start) / 2**20, 1),
+        }
+
+    async def run(self) -> dict:
+        from app.main import app
+
+        self.install()
+        sampler = RssSampler().start()
+        scenarios = {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for input_kind in self.args.input:
+                for scenes in self.args.scenes:
+                    for concurrency in ([1] if self.args.record else self.args.concurrency):
+                        requests = 1 if self.args.record else self.args.requests or max(8, 2 * concurrency)
+                        name = f"{input_kind}-{scenes}s-c{concurrency}"
+                        # The pipeline logs every stage with print(); keep the report readable
+                        with contextlib.redirect_stdout(io.StringIO()):
+                            scenarios[name] = await self.run_scenario(client, sampler, input_kind, scenes, concurrency, requests)
+                        print_scenario(name, scenarios[name])
+        sampler.stop()
+        return {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "latency_scale": self.args.latency_scale,
+                "fixtures": os.path.relpath(self.args.fixtures),
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "scenarios": scenarios,
+        }
+
+
+def print_scenario(name: str, result: dict):
+    latency = result["latency_ms"]
+    print(f"{name:<20} {result['throughput_rps']:>7.2f} req/s  p50 {latency['p50']:>8.1f}  p95 {latency['p95']:>8.1f}  "
+          f"p99 {latency['p99']:>8.1f} ms  peak RSS {result['peak_rss_mib']:>6.1f} MiB"
+          + (f"  ERRORS {result['errors']}" if result["errors"] else ""))
+    for stage, values in result["stages_ms"].items():
+        print(f"{'':<22}{stage:<14} p50 {values['p50']:>8.1f}  p95 {values['p95']:>8.1f}  p99 {values['p99']:>8.1f} ms")
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta_ms: float, min_delta_mib: float) -> list:
+    """Regressions of `current` against `baseline`, as readable lines (empty list = pass)."""
+    problems = []
+    for name, base in baseline["scenarios"].items():
+        result = current["scenarios"].get(name)
+        if result is None:
+            continue
+        if result["errors"]:
+            problems.append(f"{name}: {result['errors']} failed requests")
+
+        checks = [("p95 latency", result["latency_ms"]["p95"], base["latency_ms"]["p95"], min_delta_ms)]
+        checks += [(f"{stage} p95", values["p95"], base["stages_ms"][stage]["p95"], min_delta_ms)
+                   for stage, values in result["stages_ms"].items() if stage in base["stages_ms"]]
+        checks.append(("peak RSS", result["peak_rss_mib"], base["peak_rss_mib"], min_delta_mib))
+        for label, now, before, min_delta in checks:
+            # Small absolute changes on tiny numbers are noise, not regressions
+            if now > before * (1 + tolerance) and now - before > min_delta:
+                problems.append(f"{name}: {label} {before:.1f} -> {now:.1f} (+{(now / before - 1) * 100 if before else 100:.0f}%)")
+
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            problems.append(f"{name}: throughput {base['throughput_rps']:.2f} -> {result['throughput_rps']:.2f} req/s")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenes", type=int, nargs="+", default=[12, 60, 240])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--input", nargs="+", choices=["text", "pdf", "upload"], default=["text"])
+    parser.add_argument("--requests", type=int, default=0, help="per scenario (default: max(8, 2 x concurrency))")
+    parser.add_argument("--latency-scale", type=float, default=0.05, help="multiplier on recorded Gemini latency")
+    parser.add_argument("--upload-latency", type=float, default=0.3)
+    parser.add_argument("--serper-latency", type=float, default=0.2)
+    parser.add_argument("--transcript-latency", type=float, default=0.3)
+    parser.add_argument("--fetch-pdf", action="store_true", help="also download each report (rendered on first GET)")
+    parser.add_argument("--fixtures", default=DEFAULT_PATH)
+    parser.add_argument("--record", action="store_true", help="call Gemini (GEMINI_API_KEY) and save the answers")
+    parser.add_argument("--from-stubs", action="store_true", help="with --record: answers from stubs.FakeGeminiModel")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--save-baseline", help="write the results as a baseline for --baseline")
+    parser.add_argument("--baseline", help="compare against a baseline and exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0)
+    parser.add_argument("--min-delta-mib", type=float, default=16.0)
+    args = parser.parse_args()
+
+    harness = Harness(args)
+    results = asyncio.run(harness.run())
+
+    if args.record:
+        harness.fixtures.save()
+        print(f"Recorded {len(harness.fixtures.entries)} responses to {args.fixtures}")
+        return
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {path}")
+
+    if any(result["errors"] for result in results["scenarios"].values()):
+        print("❌ Some requests failed (missing fixtures? re-record with --record)")
+        sys.exit(1)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, args.tolerance, args.min_delta_ms, args.min_delta_mib)
+        for problem in problems:
+            print(f"❌ {problem}")
+        if problems:
+            sys.exit(1)
+        print(f"✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Concurrent throughput of /api/v1/validate against stubbed backends.
+
+  python -m benchmarks.bench_event_loop --requests 32
+
+"before" replays the old behaviour (sync Gemini/Cloudinary calls on the
+event loop), "after" uses the async execution layer. Both run the real
+FastAPI app in-process with the same stub latencies.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+import httpx
+
+from benchmarks import stubs
+
+
+async def fire(app, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    payload = {"content": stubs.sample_script(), "tone": "engaging", "topic": "Bench", "fetch_competitors": False}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[client.post("/api/v1/validate", json=payload) for _ in range(requests)])
+        elapsed = time.perf_counter() - start
+    failed = [r for r in responses if r.status_code != 200]
+    if failed:
+        raise SystemExit(f"{len(failed)} requests failed: {failed[0].text}")
+    return elapsed
+
+
+def run(mode: str, requests: int, gemini_latency: float, upload_latency: float) -> float:
+    from app.main import app
+
+    stubs.install(gemini_latency, upload_latency, blocking=(mode == "before"))
+    # The pipeline logs every stage with print(); keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(fire(app, requests))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--gemini-latency", type=float, default=0.5)
+    parser.add_argument("--upload-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    print(f"{args.requests} concurrent requests, gemini={args.gemini_latency}s upload={args.upload_latency}s")
+    for mode in ("before", "after"):
+        elapsed = run(mode, args.requests, args.gemini_latency, args.upload_latency)
+        print(f"{mode:>7}: {elapsed:6.2f}s wall  {args.requests / elapsed:6.2f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Micro-benchmark for the green-highlight step.
+
+  python -m benchmarks.bench_highlighter --scenes 500 --edits 200
+
+Compares the old per-scene, per-edit substring scan with the
+Aho-Corasick matcher in app/services/highlighter.py.
+"""
+import argparse
+import random
+import time
+
+from app.schemas.script import Edit
+from app.services.highlighter import HighlightService
+
+WORDS = ("camera hook viewer creator morning routine faster habit stick week desk light "
+         "story payoff retention cut zoom narrator explains secret mistake result").split()
+
+
+def make_scenes(count: int, rng: random.Random) -> list:
+    return [
+        {
+            "scene_number": i + 1,
+            "visual_cue": " ".join(rng.choice(WORDS) for _ in range(40)),
+            "audio_dialogue": " ".join(rng.choice(WORDS) for _ in range(80)),
+        }
+        for i in range(count)
+    ]
+
+
+def make_edits(scenes: list, count: int, rng: random.Random) -> list:
+    edits = []
+    for _ in range(count):
+        words = rng.choice(scenes)["audio_dialogue"].split()
+        start = rng.randrange(len(words) - 6)
+        snippet = " ".join(words[start:start + 6])
+        edits.append(Edit(original_snippet=snippet, improved_snippet=snippet, reason="bench"))
+    return edits
+
+
+def legacy_highlight(scenes: list, edits: list):
+    for scene in scenes:
+        scene['is_edited'] = False
+        row_text = (str(scene.get('visual_cue', '')) + " " + str(scene.get('audio_dialogue', ''))).lower()
+        for edit in edits:
+            snippet = edit.improved_snippet.strip().lower()
+            if len(snippet) > 5 and snippet in row_text:
+                scene['is_edited'] = True
+                break
+
+
+def timed(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenes", type=int, default=500)
+    parser.add_argument("--edits", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    scenes = make_scenes(args.scenes, rng)
+    edits = make_edits(scenes, args.edits, rng)
+    service = HighlightService()
+
+    legacy = timed(lambda: legacy_highlight([dict(s) for s in scenes], edits), args.repeat)
+    matcher_only = timed(lambda: service.build_matcher(edits), args.repeat)
+    current = timed(lambda: service.highlight_scenes([dict(s) for s in scenes], edits), args.repeat)
+
+    highlighted = service.highlight_scenes([dict(s) for s in scenes], edits)
+    spans = sum(len(v) for s in highlighted for v in s["highlights"].values())
+    edited = sum(1 for s in highlighted if s["is_edited"])
+
+    print(f"{args.scenes} scenes x {args.edits} edits (best of {args.repeat})")
+    print(f"  legacy substring scan : {legacy * 1000:8.2f} ms  (boolean is_edited only)")
+    print(f"  aho-corasick build    : {matcher_only * 1000:8.2f} ms")
+    print(f"  aho-corasick total    : {current * 1000:8.2f} ms  ({edited} edited scenes, {spans} spans)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Resilience of the shared Gemini client against the local fake Gemini server.
+
+  python -m benchmarks.bench_llm_client --calls 40 --error-rate 0.2 --slow-rate 0.1
+
+Fires concurrent audits through the real SDK (REST transport) at a fake server
+that injects 429s and slow answers, and compares:
+  no-retry   the old behaviour: one attempt, any error fails the audit
+  retry      jittered backoff within the deadline
+  hedged     retry + a hedge request after --hedge-after seconds
+then takes the server down to show the circuit breaker failing fast.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+
+from app.core import concurrency
+from app.core.config import settings
+from app.services import llm
+from app.services.editor import ScriptEditorService
+from benchmarks import stubs
+from benchmarks.fake_gemini import FakeGeminiServer
+
+
+def make_client(max_retries: int, hedge_after: float = 0.0) -> llm.LLMClient:
+    return llm.LLMClient(
+        rpm=6000, tpm=10_000_000, max_retries=max_retries, backoff_base=0.1, backoff_max=1.0,
+        attempt_timeout=10, deadline=15, hedge_after=hedge_after,
+        breaker=llm.CircuitBreaker(failure_threshold=5, reset_seconds=5), sync_transport=True,
+    )
+
+
+def fire(client: llm.LLMClient, calls: int) -> tuple:
+    # Stage semaphores are bound to the event loop they were first used on
+    concurrency.shutdown()
+    return asyncio.run(_fire(client, calls))
+
+
+async def _fire(client: llm.LLMClient, calls: int) -> tuple:
+    editor = ScriptEditorService(llm=client)
+    script = stubs.sample_script(8)
+
+    async def one(i: int):
+        start = time.perf_counter()
+        try:
+            # Distinct tones keep every call a real Gemini call (no cache on this service)
+            await editor.analyze_script(script, f"tone {i}")
+            return True, time.perf_counter() - start
+        except Exception:
+            return False, time.perf_counter() - start
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = await asyncio.gather(*[one(i) for i in range(calls)])
+    return [ok for ok, _ in results], sorted(elapsed for _, elapsed in results)
+
+
+def report(name: str, oks: list, latencies: list, client: llm.LLMClient):
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:>10}: {sum(oks):>3}/{len(oks)} ok  p50 {statistics.median(latencies):5.2f}s  p95 {p95:5.2f}s  "
+          f"retries {client.stats['retries']:>3}  hedges {client.stats['hedges']:>3}  rejected {client.stats['rejected']:>3}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--slow-rate", type=float, default=0.1)
+    parser.add_argument("--slow-latency", type=float, default=4.0)
+    parser.add_argument("--hedge-after", type=float, default=1.0)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(port=0, latency=args.latency, slow_latency=args.slow_latency,
+                              slow_rate=args.slow_rate, error_rate=args.error_rate).start()
+    settings.GEMINI_API_ENDPOINT = server.endpoint
+    llm.configure_genai()
+    settings.WORKER_THREADS = max(settings.WORKER_THREADS, args.calls * 2)
+
+    print(f"{args.calls} audits, {args.error_rate:.0%} 429s, {args.slow_rate:.0%} slow ({args.slow_latency}s)")
+    for name, client in (("no-retry", make_client(0)), ("retry", make_client(4)),
+                         ("hedged", make_client(4, args.hedge_after))):
+        oks, latencies = fire(client, args.calls)
+        report(name, oks, latencies, client)
+
+    server.down = True
+    client = make_client(4)
+    start = time.perf_counter()
+    oks, latencies = fire(client, args.calls)
+    print(f"{'down':>10}: {sum(oks):>3}/{len(oks)} ok  all answered in {time.perf_counter() - start:5.2f}s  "
+          f"breaker {client.breaker.state}  rejected {client.stats['rejected']}")
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
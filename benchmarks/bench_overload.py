@@ -0,0 +1,112 @@
+"""
+/api/v1/validate under overload, with and without admission control.
+
+  python -m benchmarks.bench_overload --rate 40 --duration 10 --limit 8 --queue 8
+
+Open-loop load: requests arrive at --rate per second for --duration seconds no matter
+how fast they are answered (as real clients do), each with an X-Request-Timeout of
+--deadline seconds, against the real app in-process with stubbed Gemini. Set the
+rate above what GEMINI_CONCURRENCY / --gemini-latency can serve.
+
+  unbounded   every request is admitted: they queue behind Gemini, latency keeps
+              growing, and late requests hit their deadline after doing work
+  admission   --limit running, --queue waiting (--queue-timeout): the excess gets a
+              fast 429/503 with Retry-After, the admitted requests keep a flat p99
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks import stubs
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(q * len(values))) - 1))]
+
+
+async def fire(app, rate: float, duration: float, deadline: float) -> list:
+    transport = httpx.ASGITransport(app=app)
+    results = []
+
+    async def one(client, i: int):
+        start = time.perf_counter()
+        # Distinct tones: no result cache hits
+        payload = {"content": stubs.sample_script(12), "tone": f"engaging {i}", "topic": "Bench", "fetch_competitors": False}
+        response = await client.post("/api/v1/validate", json=payload, headers={"X-Request-Timeout": str(deadline)})
+        results.append((response.status_code, time.perf_counter() - start, response.headers.get("retry-after")))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        tasks = []
+        start = time.perf_counter()
+        for i in range(int(rate * duration)):
+            # Open loop: the i-th request goes out at i / rate, whatever happened to the others
+            await asyncio.sleep(max(0.0, start + i / rate - time.perf_counter()))
+            tasks.append(asyncio.create_task(one(client, i)))
+        await asyncio.gather(*tasks)
+    return results
+
+
+def run(name: str, controller, args) -> None:
+    from app.api.deps import container
+    from app.core import telemetry
+    from app.main import app
+    from app.services.reports import ReportStore
+    from app.services.revisions import RevisionStore
+
+    stubs.install(gemini_latency=args.gemini_latency)
+    container.admission = controller
+    workdir = tempfile.mkdtemp(prefix="bench-overload-")
+    container.pipeline.revisions.store = RevisionStore(os.path.join(workdir, "revisions.sqlite3"))
+    container.report_service.store = ReportStore(os.path.join(workdir, "reports.sqlite3"))
+    model = container.editor_service.model
+    calls_before = model.calls
+    cancelled_before = dict(telemetry.REQUEST_CANCELLATIONS.values)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(fire(app, args.rate, args.duration, args.deadline))
+
+    statuses = Counter(status for status, _, _ in results)
+    ok = [elapsed for status, elapsed, _ in results if status == 200]
+    shed = [elapsed for status, elapsed, _ in results if status in (429, 503)]
+    cancelled = sum(value - cancelled_before.get(key, 0) for key, value in telemetry.REQUEST_CANCELLATIONS.values.items())
+    print(f"{name:>10}: sent {len(results):>4}  " + "  ".join(f"{code}: {count}" for code, count in sorted(statuses.items())))
+    print(f"{'':>10}  200 p50 {percentile(ok, 0.5):6.2f}s  p99 {percentile(ok, 0.99):6.2f}s  "
+          f"goodput {len(ok) / args.duration:5.1f}/s  |  shed p99 {percentile(shed, 0.99) * 1000:6.1f} ms  "
+          f"|  gemini calls {model.calls - calls_before:>4}  cancelled pipelines {cancelled:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=40, help="arrivals per second")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--deadline", type=float, default=5, help="X-Request-Timeout sent with every request")
+    parser.add_argument("--gemini-latency", type=float, default=0.5)
+    parser.add_argument("--limit", type=int, default=8)
+    parser.add_argument("--queue", type=int, default=8)
+    parser.add_argument("--queue-timeout", type=float, default=2)
+    args = parser.parse_args()
+
+    from app.core import telemetry
+    from app.core.admission import AdmissionController
+    from app.core.config import settings
+    telemetry.enabled = True
+    settings.WORKER_THREADS = max(settings.WORKER_THREADS, 32)
+
+    print(f"{args.rate:g} req/s for {args.duration:g}s, deadline {args.deadline:g}s, "
+          f"Gemini {args.gemini_latency}s x {settings.GEMINI_CONCURRENCY} concurrent")
+    run("unbounded", AdmissionController(limit=1_000_000, queue=0, queue_timeout=0), args)
+    run("admission", AdmissionController(args.limit, args.queue, args.queue_timeout), args)
+
+
+if __name__ == "__main__":
+    main()
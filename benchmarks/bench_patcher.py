@@ -0,0 +1,88 @@
+"""
+Scaling benchmark for the patch step.
+
+  python -m benchmarks.bench_patcher --chars 25000
+
+Runs the old replace-per-edit loop and the single-pass PatchEngine on the
+same script for growing edit counts. PatchEngine time should grow with
+script size + edits, not script size x edits.
+"""
+import argparse
+import random
+import re
+import time
+
+from app.schemas.script import Edit
+from app.services.patcher import PatchEngine
+
+WORDS = ("camera hook viewer creator morning routine faster habit stick week desk light "
+         "story payoff retention cut zoom narrator explains secret mistake result").split()
+
+
+def make_script(chars: int, rng: random.Random) -> str:
+    words = []
+    size = 0
+    while size < chars:
+        word = rng.choice(WORDS)
+        words.append(word + ("\n" if rng.random() < 0.1 else " "))
+        size += len(word) + 1
+    return "".join(words)
+
+
+def make_edits(script: str, count: int, rng: random.Random) -> list:
+    words = script.split()
+    edits = []
+    for _ in range(count):
+        start = rng.randrange(len(words) - 8)
+        snippet = " ".join(words[start:start + 7])
+        edits.append(Edit(original_snippet=snippet, improved_snippet=snippet.upper(), reason="bench"))
+    return edits
+
+
+def legacy_apply(original_script: str, edits: list) -> str:
+    final_script = original_script
+    for edit in edits:
+        if edit.original_snippet in final_script:
+            final_script = final_script.replace(edit.original_snippet, edit.improved_snippet, 1)
+            continue
+        flexible_pattern = re.escape(edit.original_snippet).replace(r'\ ', r'\s+')
+        match = re.search(flexible_pattern, final_script, re.IGNORECASE)
+        if match:
+            final_script = final_script[:match.start()] + edit.improved_snippet + final_script[match.end():]
+    return final_script
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chars", type=int, default=25000)
+    parser.add_argument("--edits", type=int, nargs="+", default=[50, 100, 200, 400, 800])
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    script = make_script(args.chars, rng)
+    engine = PatchEngine()
+
+    print(f"script: {len(script)} chars")
+    print(f"{'edits':>6} {'legacy ms':>10} {'engine ms':>10}  applied/fuzzy/rejected")
+    for count in args.edits:
+        edits = make_edits(script, count, rng)
+        legacy = timed(lambda: legacy_apply(script, edits))
+        report = None
+
+        def run():
+            nonlocal report
+            report = engine.apply(script, edits)
+
+        current = timed(run)
+        print(f"{count:>6} {legacy * 1000:>10.2f} {current * 1000:>10.2f}  "
+              f"{report.count('applied')}/{report.count('fuzzy')}/{report.count('rejected')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Render time and peak memory of the audit table PDF.
+
+  python -m benchmarks.bench_pdf_render --scenes 50 500 2000
+
+"legacy" is the old row loop (two multi_cell(split_only=True) measurements
+plus a multi_cell layout per cell); "layout" is PDFService.render_table_report
+on the TableLayout engine, cold (fresh line-break cache) and warm.
+Peak memory is the tracemalloc high-water mark during a second, untimed render.
+"""
+import argparse
+import time
+import tracemalloc
+
+from fpdf import FPDF
+
+from app.services.pdf_builder import PDFService
+from app.services.pdf_layout import LineBreaker
+
+
+def make_scenes(count: int) -> list:
+    return [
+        {
+            "scene_number": i,
+            "visual_cue": f"Medium shot {i}: the creator at a standing desk, morning light. "
+                          f"VEO PROMPT: cinematic 35mm, shallow depth of field, warm tones, slow push-in.",
+            "audio_dialogue": f"Step {i}: most people quit their morning routine by day four. "
+                              f"Here's the one change that made mine stick for a whole year, and why it works.",
+            "is_edited": i % 4 == 0,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def legacy_render(service: PDFService, scenes: list) -> bytes:
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Arial", '', 9)
+    for scene in scenes:
+        s_id = str(scene.get('scene_number', '?'))
+        visual = service.sanitize_text(scene.get('visual_cue', ''))
+        audio = service.sanitize_text(scene.get('audio_dialogue', ''))
+        is_edited = scene.get('is_edited', False)
+        lines_visual = pdf.multi_cell(85, 5, visual, split_only=True)
+        lines_audio = pdf.multi_cell(90, 5, audio, split_only=True)
+        row_height = max(len(lines_visual), len(lines_audio)) * 5
+        if pdf.get_y() + row_height > 270:
+            pdf.add_page()
+            pdf.set_font("Arial", 'B', 10)
+            pdf.set_fill_color(220, 220, 220)
+            pdf.cell(15, 10, "Sc#", 1, 0, 'C', True)
+            pdf.cell(85, 10, "Visual Cue & AI Prompt", 1, 0, 'C', True)
+            pdf.cell(90, 10, "Audio / Dialogue", 1, 1, 'C', True)
+            pdf.set_font("Arial", '', 9)
+        x_start = pdf.get_x()
+        y_start = pdf.get_y()
+        pdf.set_text_color(0, 0, 0)
+        pdf.rect(x_start, y_start, 15, row_height)
+        pdf.multi_cell(15, row_height, s_id, border=0, align='C')
+        pdf.set_xy(x_start + 15, y_start)
+        pdf.set_text_color(*((0, 128, 0) if is_edited else (0, 0, 0)))
+        pdf.rect(pdf.get_x(), y_start, 85, row_height)
+        pdf.multi_cell(85, 5, visual, border=0)
+        pdf.set_xy(x_start + 100, y_start)
+        pdf.set_text_color(*((0, 128, 0) if is_edited else (0, 0, 0)))
+        pdf.rect(pdf.get_x(), y_start, 90, row_height)
+        pdf.multi_cell(90, 5, audio, border=0)
+        pdf.set_xy(x_start, y_start + row_height)
+        pdf.set_text_color(0, 0, 0)
+    return bytes(pdf.output())
+
+
+def measure(func) -> tuple:
+    # tracemalloc slows allocation-heavy code several-fold, so time and memory are separate runs
+    start = time.perf_counter()
+    data = func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenes", type=int, nargs="+", default=[50, 500, 2000])
+    parser.add_argument("--skip-legacy", action="store_true", help="legacy takes ~10 ms per scene")
+    args = parser.parse_args()
+
+    print(f"{'scenes':>6} {'renderer':>12} {'ms':>9} {'peak MiB':>9} {'PDF KiB':>8}")
+    for count in args.scenes:
+        scenes = make_scenes(count)
+        service = PDFService()
+        runs = [
+            ("layout cold", lambda: service.render_table_report(scenes, 72, ["Hook is weak"], "Bench")),
+            ("layout warm", lambda: service.render_table_report(scenes, 72, ["Hook is weak"], "Bench")),
+        ]
+        if not args.skip_legacy:
+            runs.insert(0, ("legacy", lambda: legacy_render(service, scenes)))
+        for name, func in runs:
+            if name == "layout cold":
+                service.breaker = LineBreaker()
+            elapsed, peak, size = measure(func)
+            print(f"{count:>6} {name:>12} {elapsed * 1000:>9.1f} {peak / 2**20:>9.1f} {size / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
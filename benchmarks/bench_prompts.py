@@ -0,0 +1,69 @@
+"""
+Prompt tokens per audit, with and without the context cache.
+
+  python -m benchmarks.bench_prompts --scenes 8 40 --calls 5
+
+Runs audits through the real SDK (REST transport) against the local fake Gemini
+server and prints LLMClient.usage per prompt template: tokens sent ("in"), the
+part of them served from a context cache ("cached") and tokens answered ("out").
+The template prefixes are below Gemini's caching minimum, so the "cached" run
+lowers GEMINI_CACHE_MIN_TOKENS to 0 to show the mechanism end to end.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+
+from app.core import concurrency
+from app.core.config import settings
+from app.services import llm
+from app.services.editor import ScriptEditorService
+from app.services.prompts import AUDIT, TABLE
+from benchmarks import stubs
+from benchmarks.fake_gemini import FakeGeminiServer
+
+
+def make_client(context_cache) -> llm.LLMClient:
+    return llm.LLMClient(rpm=6000, tpm=10_000_000, max_retries=0, sync_transport=True, context_cache=context_cache)
+
+
+def run(client: llm.LLMClient, scenes: int, calls: int) -> dict:
+    # Stage semaphores are bound to the event loop they were first used on
+    concurrency.shutdown()
+    editor = ScriptEditorService(llm=client)
+    script = stubs.sample_script(scenes)
+
+    async def audits():
+        # Distinct tones keep every call a real Gemini call
+        await asyncio.gather(*[editor.analyze_script(script, f"tone {i}") for i in range(calls)])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(audits())
+    return client.usage
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenes", type=int, nargs="+", default=[8, 40])
+    parser.add_argument("--calls", type=int, default=5)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(port=0, latency=0.01).start()
+    settings.GEMINI_API_ENDPOINT = server.endpoint
+    llm.configure_genai()
+
+    print(f"static prefixes: {AUDIT.key} {AUDIT.prefix_tokens} tokens, {TABLE.key} {TABLE.prefix_tokens} tokens "
+          f"(cache minimum {settings.GEMINI_CACHE_MIN_TOKENS})")
+    for scenes in args.scenes:
+        for name, context_cache in (("inline", None), ("cached", llm.ContextCache(ttl=600, min_tokens=0))):
+            usage = run(make_client(context_cache), scenes, args.calls)
+            for template, totals in sorted(usage.items()):
+                share = totals["cached"] / totals["in"] if totals["in"] else 0
+                print(f"{scenes:>3} scenes {name:>6} {template:<10} calls {totals['calls']:>3}  in {totals['in']:>7}  "
+                      f"cached {totals['cached']:>6} ({share:4.0%})  out {totals['out']:>6}")
+    print(f"context caches created on the server: {server.counts['caches']}")
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
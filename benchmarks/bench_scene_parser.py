@@ -0,0 +1,113 @@
+"""
+Accuracy and speed of the local ScriptParser on a generated corpus.
+
+  python -m benchmarks.bench_scene_parser --scripts 200
+
+Every script is rendered in one of the layouts we receive (pipe table,
+tab-separated copy from Docs, labelled Scene/Visual/Audio blocks, flattened
+PDF rows) from known ground-truth scenes, with some noise: a title line,
+numbers inside the dialogue, unstructured prose. Reports how often the parser
+is confident enough to skip Gemini, and how accurate those confident parses are.
+"""
+import argparse
+import random
+import re
+import time
+
+from app.core.config import settings
+from app.services.script_parser import ScriptParser
+
+WORDS = ("camera hook viewer creator morning routine faster habit stick week desk light "
+         "story payoff retention cut zoom narrator explains secret mistake result").split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def make_scenes(rng: random.Random) -> list:
+    scenes = []
+    for i in range(rng.randint(3, 40)):
+        visual = f"{sentence(rng, 8)}\n? VEO PROMPT: {sentence(rng, 10)}"
+        audio = f'"{sentence(rng, 12)} Step {rng.randint(2, 9)} matters."'
+        scenes.append({"scene_number": i + 1, "visual_cue": visual, "audio_dialogue": audio})
+    return scenes
+
+
+def render(scenes: list, layout: str, rng: random.Random) -> str:
+    title = "Script: " + sentence(rng, 4) + "\n"
+    if layout == "pipe_table":
+        rows = ["| Scene # | Visual Cue & AI Prompt | Audio / Dialogue |", "|---|---|---|"]
+        rows += [f"| {s['scene_number']} | {s['visual_cue'].replace(chr(10), ' ')} | {s['audio_dialogue']} |" for s in scenes]
+        return title + "\n".join(rows)
+    if layout == "tab_table":
+        rows = ["Scene #\tVisual Cue & AI Prompt\tAudio / Dialogue"]
+        rows += [f"{s['scene_number']}\t{s['visual_cue'].replace(chr(10), ' ')}\t{s['audio_dialogue']}" for s in scenes]
+        return "\n".join(rows)
+    if layout == "labelled_blocks":
+        blocks = [f"Scene {s['scene_number']}\nVisual: {s['visual_cue']}\nAudio: {s['audio_dialogue']}" for s in scenes]
+        return title + "\n\n".join(blocks)
+    if layout == "pdf_rows":
+        rows = ["Scene # Visual Cue & AI Prompt Audio / Dialogue"]
+        rows += [f"{s['scene_number']} {s['visual_cue']}\n{s['audio_dialogue']}" for s in scenes]
+        return "\n".join(rows)
+    # Unstructured prose: the parser must NOT be confident here
+    return "\n\n".join(s["audio_dialogue"].strip('"') for s in scenes)
+
+
+def normalize(text: str) -> str:
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def matches(expected: list, actual: list) -> bool:
+    if len(expected) != len(actual):
+        return False
+    return all(
+        e["scene_number"] == a["scene_number"]
+        and normalize(e["visual_cue"]) == normalize(a["visual_cue"])
+        and normalize(e["audio_dialogue"]) == normalize(a["audio_dialogue"])
+        for e, a in zip(expected, actual)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scripts", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=8.0, help="assumed seconds per Gemini rebuild")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    layouts = ["pipe_table", "tab_table", "labelled_blocks", "pdf_rows", "prose"]
+    local = ScriptParser()
+    threshold = settings.LOCAL_PARSER_MIN_CONFIDENCE
+
+    stats = {layout: {"total": 0, "confident": 0, "correct": 0, "seconds": 0.0} for layout in layouts}
+    for i in range(args.scripts):
+        layout = layouts[i % len(layouts)]
+        scenes = make_scenes(rng)
+        text = render(scenes, layout, rng)
+
+        start = time.perf_counter()
+        parsed = local.parse(text)
+        elapsed = time.perf_counter() - start
+
+        row = stats[layout]
+        row["total"] += 1
+        row["seconds"] += elapsed
+        if parsed.confidence >= threshold:
+            row["confident"] += 1
+            row["correct"] += matches(scenes, parsed.scenes)
+
+    print(f"threshold {threshold}, {args.scripts} scripts")
+    print(f"{'layout':>16} {'skip LLM':>9} {'accuracy':>9} {'avg ms':>8}")
+    skipped = 0
+    for layout, row in stats.items():
+        skipped += row["confident"]
+        accuracy = f"{row['correct'] / row['confident']:.1%}" if row["confident"] else "n/a"
+        print(f"{layout:>16} {row['confident']:>4}/{row['total']:<4} {accuracy:>9} {row['seconds'] / row['total'] * 1000:>8.2f}")
+    print(f"Gemini rebuilds avoided: {skipped}/{args.scripts} (~{skipped * args.llm_latency:.0f}s of LLM time at {args.llm_latency}s each)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Overhead of the telemetry layer (app/core/telemetry.py), on and off.
+
+  python -m benchmarks.bench_telemetry --requests 200
+
+  span        one `with span(...)` block, per call
+  pipeline    ValidationPipeline.run on the stubs with zero Gemini latency,
+              i.e. almost pure pipeline overhead, per request
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+from app.core import concurrency, telemetry
+from benchmarks import stubs
+
+
+def time_span(calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        with telemetry.span("bench"):
+            pass
+    return (time.perf_counter() - start) / calls
+
+
+async def time_pipeline(requests: int, tag: str) -> float:
+    from app.api.deps import container
+    from app.schemas.script import ScriptRequest
+
+    # Distinct tones per run, so no run is served from the previous run's audit cache
+    payloads = [ScriptRequest(content=stubs.sample_script(), tone=f"{tag} {i}", topic="Bench", fetch_competitors=False)
+                for i in range(requests)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for payload in payloads:
+            telemetry.start_trace()
+            await container.pipeline.run(payload)
+        elapsed = time.perf_counter() - start
+    return elapsed / requests
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--spans", type=int, default=200_000)
+    args = parser.parse_args()
+
+    stubs.install(gemini_latency=0, upload_latency=0)
+    # Warm-up: imports, fonts, line-break cache
+    asyncio.run(time_pipeline(10, "warm-up"))
+    for enabled in (False, True):
+        telemetry.enabled = enabled
+        concurrency.shutdown()
+        per_span = time_span(args.spans)
+        label = "on" if enabled else "off"
+        per_request = asyncio.run(time_pipeline(args.requests, label))
+        print(f"telemetry {label:>3}: span {per_span * 1e9:6.0f} ns   pipeline {per_request * 1000:6.2f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Local stand-in for the Gemini REST API (generateContent), with fault injection.
+
+  python -m benchmarks.fake_gemini --port 8765 --error-rate 0.2 --slow-rate 0.05
+  GEMINI_API_ENDPOINT=http://127.0.0.1:8765 uvicorn app.main:app
+
+Answers audit and table-rebuild prompts the same way stubs.FakeGeminiModel does,
+streamGenerateContent included (a JSON array of partial responses). Context caches
+(POST cachedContents) are kept in memory and count as cachedContentTokenCount.
+  --error-rate   share of calls answered 429 RESOURCE_EXHAUSTED
+  --slow-rate    share of calls that take --slow-latency instead of --latency (tail latency)
+  --down         every call answers 503 UNAVAILABLE (circuit breaker testing)
+"""
+import argparse
+import datetime
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.stubs import FakeGeminiModel
+
+
+class FakeGeminiServer:
+    def __init__(self, port: int = 8765, latency: float = 0.2, slow_latency: float = 3.0,
+                 slow_rate: float = 0.0, error_rate: float = 0.0, down: bool = False, seed: int = 7):
+        self.port = port
+        self.latency = latency
+        self.slow_latency = slow_latency
+        self.slow_rate = slow_rate
+        self.error_rate = error_rate
+        self.down = down
+        self.rng = random.Random(seed)
+        self.model = FakeGeminiModel(latency=0)
+        self.counts = {"requests": 0, "errors": 0, "slow": 0, "caches": 0}
+        # cachedContents/<id> -> cached instruction text
+        self.caches = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _decide(self) -> tuple:
+        with self._lock:
+            self.counts["requests"] += 1
+            if self.down:
+                self.counts["errors"] += 1
+                return 503, 0.0
+            if self.rng.random() < self.error_rate:
+                self.counts["errors"] += 1
+                return 429, 0.0
+            if self.rng.random() < self.slow_rate:
+                self.counts["slow"] += 1
+                return 200, self.slow_latency
+            return 200, self.latency
+
+    def handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+                if self.path.split("?")[0].endswith("/cachedContents"):
+                    return self._create_cache(body)
+                streaming = ":streamGenerateContent" in self.path
+                if ":generateContent" not in self.path and not streaming:
+                    return self._send(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+                status, delay = server._decide()
+                if status == 429:
+                    return self._send(429, {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}})
+                if status == 503:
+                    return self._send(503, {"error": {"code": 503, "message": "The model is overloaded", "status": "UNAVAILABLE"}})
+
+                time.sleep(delay)
+                prompt = "".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+                cached = server.caches.get(body.get("cachedContent"), "")
+                text = server.model._answer(cached + prompt).text
+                usage = {"promptTokenCount": len(cached + prompt) // 4, "candidatesTokenCount": len(text) // 4,
+                         "totalTokenCount": (len(cached + prompt) + len(text)) // 4}
+                if cached:
+                    usage["cachedContentTokenCount"] = len(cached) // 4
+                if not streaming:
+                    return self._send(200, {
+                        "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+                        "usageMetadata": usage,
+                    })
+                pieces = [text[i:i + 256] for i in range(0, len(text), 256)] or [""]
+                self._send(200, [
+                    {"candidates": [{"content": {"parts": [{"text": piece}], "role": "model"}, "index": 0,
+                                     **({"finishReason": "STOP"} if last else {})}],
+                     **({"usageMetadata": usage} if last else {})}
+                    for piece, last in ((piece, i == len(pieces) - 1) for i, piece in enumerate(pieces))
+                ])
+
+            def _create_cache(self, body: dict):
+                instruction = body.get("systemInstruction", {})
+                text = "".join(part.get("text", "") for part in instruction.get("parts", []))
+                text += "".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+                name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+                with server._lock:
+                    server.caches[name] = text
+                    server.counts["caches"] += 1
+                now = datetime.datetime.now(datetime.timezone.utc)
+                ttl = float(str(body.get("ttl", "3600s")).rstrip("s"))
+                stamp = lambda moment: moment.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+                self._send(200, {
+                    "name": name, "model": body.get("model", ""), "displayName": "",
+                    "createTime": stamp(now), "updateTime": stamp(now),
+                    "expireTime": stamp(now + datetime.timedelta(seconds=ttl)),
+                    "usageMetadata": {"totalTokenCount": len(text) // 4},
+                })
+
+            def _send(self, status: int, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeGeminiServer":
+        """Serves from a daemon thread, for use inside benchmarks."""
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), self.handler())
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--slow-latency", type=float, default=3.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--down", action="store_true")
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(args.port, args.latency, args.slow_latency, args.slow_rate, args.error_rate, args.down)
+    print(f"Fake Gemini listening on {server.endpoint}")
+    ThreadingHTTPServer(("127.0.0.1", args.port), server.handler()).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Recorded Gemini responses, replayed by prompt.
+
+Each line of a recordings file (benchmarks/recordings/*.jsonl) is one call:
+  {"key", "model", "latency", "text", "prompt_tokens", "output_tokens", "source"}
+key hashes the model name, generation config and the exact prompt, so any prompt
+change (PROMPT_VERSION bump, chunking, script text) shows up as a miss instead of
+silently replaying a stale answer. "source" is "gemini" for live recordings and
+"stubs" for entries seeded from stubs.FakeGeminiModel.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+from benchmarks.stubs import FakeResponse, FakeStream
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "recordings", "gemini.jsonl")
+
+
+class FixtureMissError(KeyError):
+    """No recording for this prompt. Re-record with `python -m benchmarks.bench_e2e --record`."""
+
+
+def fixture_key(model_name: str, prompt: str, generation_config: Optional[dict] = None) -> str:
+    payload = json.dumps([model_name, generation_config or {}, prompt], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def synthetic_latency(output_tokens: int) -> float:
+    # For entries seeded from the stubs: time-to-first-token plus ~250 output tokens/s
+    return round(0.4 + output_tokens / 250, 3)
+
+
+class GeminiFixtures:
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.entries.get(key)
+
+    def add(self, entry: dict):
+        self.entries[entry["key"]] = entry
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            # Sorted so re-recording the same prompts gives a clean diff
+            for key in sorted(self.entries):
+                f.write(json.dumps(self.entries[key], sort_keys=True) + "\n")
+
+
+def _response(entry: dict) -> FakeResponse:
+    return FakeResponse(entry["text"], usage=SimpleNamespace(
+        prompt_token_count=entry["prompt_tokens"], candidates_token_count=entry["output_tokens"]))
+
+
+class ReplayModel:
+    """
+    Drop-in for genai.GenerativeModel that answers from fixtures after the
+    recorded latency (times latency_scale). Unknown prompts raise FixtureMissError.
+    """
+
+    def __init__(self, fixtures: GeminiFixtures, model_name: str, latency_scale: float = 1.0):
+        self.fixtures = fixtures
+        self.model_name = model_name
+        self.latency_scale = latency_scale
+        self.calls = 0
+        self.misses = 0
+
+    def _lookup(self, prompt: str, generation_config: Optional[dict]) -> dict:
+        self.calls += 1
+        entry = self.fixtures.get(fixture_key(self.model_name, prompt, generation_config))
+        if entry is None:
+            self.misses += 1
+            raise FixtureMissError(f"No recorded response for this {self.model_name} prompt ({len(prompt)} chars)")
+        return entry
+
+    def generate_content(self, prompt, generation_config=None, stream=False, **kwargs):
+        entry = self._lookup(prompt, generation_config)
+        time.sleep(entry["latency"] * self.latency_scale)
+        return FakeStream(_response(entry)) if stream else _response(entry)
+
+    async def generate_content_async(self, prompt, generation_config=None, stream=False, **kwargs):
+        entry = self._lookup(prompt, generation_config)
+        await asyncio.sleep(entry["latency"] * self.latency_scale)
+        return FakeStream(_response(entry)) if stream else _response(entry)
+
+
+class RecordingModel:
+    """
+    Wraps a real model (or stubs.FakeGeminiModel, source="stubs") and stores every
+    answer in the fixtures. Stub answers get a synthetic latency instead of the measured one.
+    """
+
+    def __init__(self, inner, fixtures: GeminiFixtures, model_name: str, source: str = "gemini"):
+        self.inner = inner
+        self.fixtures = fixtures
+        self.model_name = model_name
+        self.source = source
+
+    def _record(self, prompt: str, generation_config: Optional[dict], response, elapsed: float):
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", 0) or len(prompt) // 4
+        output_tokens = getattr(usage, "candidates_token_count", 0) or len(response.text) // 4
+        self.fixtures.add({
+            "key": fixture_key(self.model_name, prompt, generation_config),
+            "model": self.model_name,
+            "latency": round(elapsed, 3) if self.source == "gemini" else synthetic_latency(output_tokens),
+            "text": response.text,
+            "prompt_tokens": prompt_tokens,
+            "output_tokens": output_tokens,
+            "source": self.source,
+        })
+
+    def generate_content(self, prompt, generation_config=None, stream=False, **kwargs):
+        start = time.perf_counter()
+        response = self.inner.generate_content(prompt, generation_config=generation_config, stream=stream, **kwargs)
+        if stream:
+            # Streams are recorded (and replayed) whole
+            response = _joined(list(response))
+        self._record(prompt, generation_config, response, time.perf_counter() - start)
+        return FakeStream(response) if stream else response
+
+    async def generate_content_async(self, prompt, generation_config=None, stream=False, **kwargs):
+        start = time.perf_counter()
+        response = await self.inner.generate_content_async(prompt, generation_config=generation_config, stream=stream, **kwargs)
+        if stream:
+            response = _joined([chunk async for chunk in response])
+        self._record(prompt, generation_config, response, time.perf_counter() - start)
+        return FakeStream(response) if stream else response
+
+
+def _joined(chunks: list) -> FakeResponse:
+    return FakeResponse("".join(chunk.text for chunk in chunks), usage=getattr(chunks[-1], "usage_metadata", None) if chunks else None)
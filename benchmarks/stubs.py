@@ -0,0 +1,226 @@
+"""
+Stubbed backends (Gemini, report storage, Serper, YouTube transcripts) for running the pipeline offline.
+Each stub sleeps for a configurable latency so benchmarks behave like the
+real services without touching the network.
+"""
+import asyncio
+import json
+import re
+import time
+from concurrent.futures import Executor, Future
+
+import httpx
+
+
+class FakeResponse:
+    def __init__(self, text: str, usage=None):
+        self.text = text
+        self.usage_metadata = usage
+
+
+class FakeStream:
+    """What generate_content(stream=True) returns: the answer in pieces, usage metadata on the last one."""
+    def __init__(self, response: FakeResponse, chunk_chars: int = 256):
+        text = response.text
+        self.chunks = [FakeResponse(text[i:i + chunk_chars]) for i in range(0, len(text), chunk_chars)] or [FakeResponse("")]
+        self.chunks[-1].usage_metadata = response.usage_metadata
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+
+class FakeGeminiModel:
+    """
+    Drop-in for genai.GenerativeModel.
+    blocking=True makes the async method sleep on the event loop, which is
+    how the pipeline behaved before the async execution layer.
+    """
+    def __init__(self, latency: float = 0.5, blocking: bool = False):
+        self.latency = latency
+        self.blocking = blocking
+        self.calls = 0
+
+    def _answer(self, prompt: str) -> FakeResponse:
+        self.calls += 1
+        if "RAW INPUT TEXT:" in prompt:
+            raw = prompt.split("RAW INPUT TEXT:", 1)[1]
+            blocks = [b.strip() for b in re.split(r"\n\s*\n", raw) if b.strip()]
+            scenes = [
+                {"scene_number": i + 1, "visual_cue": "Scene visual", "audio_dialogue": block}
+                for i, block in enumerate(blocks)
+            ]
+            return FakeResponse(json.dumps(scenes))
+
+        script = prompt.split("SCRIPT:", 1)[-1]
+        if "[[REVISED]]" in script:
+            # Excerpt audits only suggest edits inside the revised part
+            script = script.split("[[REVISED]]", 1)[1].split("[[/REVISED]]", 1)[0]
+        words = re.findall(r"[A-Za-z']+", script)
+        edits = []
+        for start in range(0, min(len(words), 60), 20):
+            snippet = " ".join(words[start:start + 6])
+            if snippet:
+                edits.append({
+                    "original_snippet": snippet,
+                    "improved_snippet": snippet.upper(),
+                    "reason": "Punchier wording",
+                })
+        return FakeResponse(json.dumps({"final_score": 72, "critique": ["Hook is weak"], "edits": edits}))
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        time.sleep(self.latency)
+        response = self._answer(prompt)
+        return FakeStream(response) if stream else response
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        response = self._answer(prompt)
+        return FakeStream(response) if stream else response
+
+
+class FakeStorage:
+    """Report storage backend (see app.services.storage) that only sleeps and counts."""
+    def __init__(self, latency: float = 0.3):
+        self.latency = latency
+        self.uploads = 0
+
+    def upload(self, data: bytes, filename: str) -> str:
+        time.sleep(self.latency)
+        self.uploads += 1
+        return f"https://cdn.example.invalid/scripts/{filename}"
+
+
+class FakeCloudinary:
+    """
+    Stands in for cloudinary.uploader.upload, so the real CloudinaryStorage code path runs.
+    install() patches the module function; the URL is still built by cloudinary.utils.
+    """
+    def __init__(self, latency: float = 0.3):
+        self.latency = latency
+        self.uploads = 0
+
+    def upload(self, file, public_id=None, **options):
+        time.sleep(self.latency)
+        self.uploads += 1
+        size = len(file.getvalue()) if hasattr(file, "getvalue") else 0
+        return {"public_id": public_id, "bytes": size, "secure_url": f"https://res.cloudinary.com/bench/{public_id}.pdf"}
+
+    def install(self):
+        import cloudinary.uploader
+        from app.core.config import settings
+        from app.services.storage import CloudinaryStorage
+
+        settings.CLOUDINARY_CLOUD_NAME = settings.CLOUDINARY_CLOUD_NAME or "bench"
+        settings.CLOUDINARY_API_KEY = settings.CLOUDINARY_API_KEY or "bench"
+        settings.CLOUDINARY_API_SECRET = settings.CLOUDINARY_API_SECRET or "bench"
+        cloudinary.uploader.upload = self.upload
+        return CloudinaryStorage()
+
+
+class FakeSerper:
+    """httpx transport that answers google.serper.dev/videos after a delay."""
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self.calls = 0
+
+    async def handle(self, request):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        query = json.loads(request.content).get("q", "")
+        return httpx.Response(200, json={"videos": [
+            {"title": f"{query} #{i}", "link": f"https://www.youtube.com/watch?v=fake{i}",
+             "imageUrl": "", "channel": "Fake Channel"}
+            for i in range(3)
+        ]})
+
+    def transport(self):
+        return httpx.MockTransport(self.handle)
+
+
+class FakeTranscripts:
+    """
+    Stands in for YouTubeTranscriptFetcher: every video opens with the same few captions,
+    a few seconds apart, after `latency`. IDs in `unavailable` have no transcript.
+    """
+    def __init__(self, latency: float = 0.3, unavailable=()):
+        self.latency = latency
+        self.unavailable = set(unavailable)
+        self.calls = 0
+
+    async def fetch(self, video_id: str) -> list:
+        from app.services.transcripts import TranscriptUnavailableError
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if video_id in self.unavailable:
+            raise TranscriptUnavailableError(video_id)
+        lines = ["[Music]", f"Stop scrolling: this is the one change behind video {video_id}.",
+                 "Most people get their mornings wrong", "in the first ten minutes.",
+                 "By the end you'll have a routine that sticks.", "Let's get into it."]
+        return [{"text": text, "start": i * 8.0, "duration": 8.0} for i, text in enumerate(lines)]
+
+
+class InlineExecutor(Executor):
+    """Runs 'thread pool' work directly on the calling thread (the old behaviour)."""
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def install(gemini_latency: float = 0.5, upload_latency: float = 0.3, blocking: bool = False, serper_latency: float = 0.2,
+            transcript_latency: float = 0.3, patch=setattr):
+    """
+    Patches the container services with stubs. Returns the stubs for inspection.
+    Every patch goes through `patch(obj, name, value)`: tests pass monkeypatch.setattr,
+    so all of it is undone after the test.
+    """
+    from app.api.deps import container
+    from app.core import concurrency
+    from app.core.config import settings
+
+    model = FakeGeminiModel(gemini_latency, blocking=blocking)
+    patch(container.editor_service, "model", model)
+    patch(container.parser_service, "model", model)
+
+    storage = FakeStorage(upload_latency)
+    patch(container.report_uploader, "storage", storage)
+
+    serper = FakeSerper(serper_latency)
+    patch(settings, "SERPER_API_KEY", settings.SERPER_API_KEY or "stub-key")
+    patch(container.research_service, "_client", httpx.AsyncClient(transport=serper.transport()))
+    patch(container.hook_miner, "fetcher", FakeTranscripts(transcript_latency))
+    patch(container.hook_miner, "cache", None)
+    # Bursts are the point of most benchmarks: no load shedding unless one sets its own controller.
+    # A fresh one also keeps its semaphore off the previous benchmark's event loop.
+    from app.core.admission import AdmissionController
+    patch(container, "admission", AdmissionController(limit=1_000_000, queue=0, queue_timeout=0))
+
+    # Every run starts cold so cache hits don't skew comparisons
+    container.result_cache.invalidate()
+    concurrency.shutdown()
+    if blocking:
+        patch(concurrency, "_executor", InlineExecutor())
+
+    return model, storage, serper
+
+
+def sample_script(scenes: int = 12) -> str:
+    lines = []
+    for i in range(1, scenes + 1):
+        lines.append(
+            f"Scene {i}. The camera pushes in on the creator at the desk while the "
+            f"narrator explains step number {i} of building a faster morning routine "
+            f"that actually sticks for more than a week."
+        )
+    return "\n\n".join(lines)
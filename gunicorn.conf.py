@@ -0,0 +1,25 @@
+# Multi-worker profile: gunicorn app.main:app -c gunicorn.conf.py
+# The master only forks and supervises; the app (and every client, pool and SQLite
+# handle in app.api.deps.container) is imported and built inside each worker.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(4, multiprocessing.cpu_count()))))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# A validation can wait a long time on Gemini; keep the worker timeout above the slowest request
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Recycle workers now and then so slow leaks (PDF rendering, SDK buffers) don't pile up
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+accesslog = "-"
+
+# State every worker must see goes to SQLite unless set explicitly:
+# result cache, Gemini quota buckets (jobs and revisions always live there)
+os.environ.setdefault("CACHE_BACKEND", "sqlite")
+os.environ.setdefault("RATE_LIMIT_BACKEND", "sqlite")
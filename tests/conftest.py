@@ -0,0 +1,28 @@
+import pytest
+
+# Imported before any test patches STATIC_DIR: the app mounts the real static folder once
+import app.main  # noqa: F401
+from app.core import concurrency
+from app.core.config import settings
+
+# Every on-disk store the service graph can create
+STORE_PATHS = ("CACHE_PATH", "TRANSCRIPTS_DB_PATH", "JOBS_DB_PATH", "DOWNLOAD_CACHE_PATH", "REPORTS_DB_PATH",
+               "REVISIONS_DB_PATH", "RATE_LIMIT_DB_PATH")
+
+
+@pytest.fixture
+def container(tmp_path, monkeypatch):
+    """
+    A fresh service graph (app.api.deps.container) whose SQLite stores and static files
+    live in tmp_path. The settings and the container are restored after the test.
+    """
+    from app.api import deps
+
+    for name in STORE_PATHS:
+        monkeypatch.setattr(settings, name, str(tmp_path / f"{name.lower()}.sqlite3"))
+    (tmp_path / "static").mkdir()
+    monkeypatch.setattr(settings, "STATIC_DIR", str(tmp_path / "static"))
+    fresh = deps.Container()
+    monkeypatch.setattr(deps, "container", fresh)
+    yield fresh
+    concurrency.shutdown()
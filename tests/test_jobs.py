@@ -0,0 +1,43 @@
+import asyncio
+
+from app.core.sqlite import connect
+from app.schemas.script import JobRequest
+from app.services.jobs import RUNNING, JobQueue, JobStore
+
+
+class SlowPipeline:
+    def __init__(self):
+        self.cancelled = False
+
+    async def run(self, payload, progress=None):
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def test_lost_lease_cancels_the_pipeline_and_keeps_the_new_owners_state(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    pipeline = SlowPipeline()
+    queue = JobQueue(store, pipeline, workers=0, lease=0.3)
+
+    async def run_then_lose_lease():
+        job_id = await queue.submit(JobRequest(content="INT. OFFICE - DAY\nHello."))
+        assert await asyncio.to_thread(store.claim, queue.owner, queue.lease) == (job_id, False)
+        run = asyncio.create_task(queue._run(job_id))
+        await asyncio.sleep(0.05)
+        # Another worker takes the job over (as if this one had missed its lease)
+        with connect(store.path) as conn:
+            conn.execute("UPDATE jobs SET owner = ? WHERE id = ?", ("other", job_id))
+        await asyncio.wait_for(run, timeout=5)
+        return job_id
+
+    job_id = asyncio.run(run_then_lose_lease())
+
+    assert pipeline.cancelled
+    job = store.get(job_id)
+    assert job.status == RUNNING
+    assert job.result is None and job.error is None
+    # The old owner can no longer finish it either
+    assert store.set_status(job_id, queue.owner, "failed", error="late") is False
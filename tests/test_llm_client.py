@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+from app.services.llm import CircuitBreaker, LLMClient, SQLiteTokenBucket
+
+
+class NeverCalledModel:
+    def generate_content(self, *args, **kwargs):
+        raise AssertionError("quota was never granted, Gemini must not be called")
+
+
+def test_cancel_while_waiting_for_quota_releases_half_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+    client = LLMClient(rpm=60, tpm=1_000_000, max_retries=0, deadline=30, breaker=breaker, sync_transport=True)
+    # Half-open (the reset period is over) and the RPM bucket empty: the call holds the probe while it waits
+    breaker.opened_at = 0.0
+    client.requests.tokens = 0.0
+
+    async def cancel_waiting_call():
+        task = asyncio.create_task(client.generate(NeverCalledModel(), "prompt"))
+        await asyncio.sleep(0.05)
+        assert breaker.probing and breaker.in_flight == 1
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(cancel_waiting_call())
+
+    assert breaker.probing is False
+    assert breaker.in_flight == 0
+    # The next call can probe again instead of failing with "probe in flight"
+    breaker.before_call()
+    assert breaker.probing is True
+
+
+def test_sqlite_buckets_share_one_quota_and_reserve_it_in_batches(tmp_path):
+    path = str(tmp_path / "ratelimit.sqlite3")
+    # Two worker processes, 60 RPM between them, reserving 6 requests at a time
+    first = SQLiteTokenBucket(path, "rpm", 60, batch=0.1)
+    second = SQLiteTokenBucket(path, "rpm", 60, batch=0.1)
+    transactions = []
+    for bucket in (first, second):
+        bucket._take = lambda need, take=bucket._take: transactions.append(need) or take(need)
+
+    async def take_all(count: int):
+        for i in range(count):
+            await (first if i % 2 else second).acquire(1)
+
+    start = time.time()
+    asyncio.run(take_all(50))
+    # One file transaction per batch, not one (or four) per call
+    assert len(transactions) <= 10
+
+    async def try_more() -> int:
+        granted = 0
+        for _ in range(30):
+            for bucket in (first, second):
+                try:
+                    await asyncio.wait_for(bucket.acquire(1), timeout=0.01)
+                    granted += 1
+                except asyncio.TimeoutError:
+                    pass
+        return granted
+
+    granted = 50 + asyncio.run(try_more())
+    # Never more than the shared minute's worth, plus what refilled meanwhile (1/s)
+    assert 60 <= granted + first.reserved + second.reserved <= 60 + (time.time() - start) + 1
@@ -0,0 +1,23 @@
+from app.schemas.script import Edit
+from app.services.patcher import APPLIED, REJECTED, PatchEngine
+
+
+def edit(original: str, improved: str) -> Edit:
+    return Edit(original_snippet=original, improved_snippet=improved, reason="test")
+
+
+def test_blank_snippets_are_rejected_instead_of_matching_anywhere():
+    report = PatchEngine().apply("Hook. Payoff.", [edit("   ", "X"), edit("", "Y")])
+
+    assert report.text == "Hook. Payoff."
+    assert [(o.status, o.reason) for o in report.outcomes] == [(REJECTED, "empty"), (REJECTED, "empty")]
+
+
+def test_mid_word_fallback_skips_past_accepted_spans():
+    original = "ab ab abab xab"
+    report = PatchEngine().apply(original, [edit("ab ab abab", "AB AB ABAB"), edit("xa", "XA"), edit("b x", "-")])
+
+    assert [(o.status, o.start, o.end) for o in report.outcomes][:2] == [(APPLIED, 0, 10), (APPLIED, 11, 13)]
+    # Overlaps both accepted spans: a conflict, not "not found"
+    assert (report.outcomes[2].status, report.outcomes[2].reason) == (REJECTED, "conflict")
+    assert report.text == "AB AB ABAB XAb"
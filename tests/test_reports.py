@@ -0,0 +1,48 @@
+import asyncio
+
+import httpx
+
+from app.services.reports import ReportStore
+
+
+def test_conditional_get_answers_304_only_for_reports_that_still_exist(container):
+    from app.main import app
+
+    service = container.report_service
+
+    async def fetch(report_id: str):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(f"/api/v1/reports/{report_id}.json", headers={"If-None-Match": f'"{report_id}.json"'})
+
+    async def register() -> str:
+        scenes = [{"scene_number": 1, "visual_cue": "Desk", "audio_dialogue": "Hi.", "is_edited": False}]
+        return await service.register(scenes, 80, ["Fine"], [], "Test")
+
+    report_id = asyncio.run(register())
+    assert asyncio.run(fetch(report_id)).status_code == 304
+    # Unknown or expired: the ETag alone is not proof the report is still there
+    assert asyncio.run(fetch("0" * 32)).status_code == 404
+
+
+def test_report_links_use_the_request_origin_when_public_base_url_is_unset(tmp_path, monkeypatch):
+    from starlette.responses import PlainTextResponse
+
+    from app.core.config import settings
+    from app.core.urls import BaseURLMiddleware
+    from app.services.reports import ReportService
+
+    monkeypatch.setattr(settings, "PUBLIC_BASE_URL", "")
+    service = ReportService(ReportStore(str(tmp_path / "reports.sqlite3")), pdf=None)
+
+    async def endpoint(scope, receive, send):
+        await PlainTextResponse(service.url("abc"))(scope, receive, send)
+
+    async def fetch() -> str:
+        transport = httpx.ASGITransport(app=BaseURLMiddleware(endpoint))
+        async with httpx.AsyncClient(transport=transport, base_url="https://api.example") as client:
+            return (await client.get("/anything")).text
+
+    assert asyncio.run(fetch()) == "https://api.example/api/v1/reports/abc.pdf"
+    monkeypatch.setattr(settings, "PUBLIC_BASE_URL", "https://cdn.example/")
+    assert asyncio.run(fetch()) == "https://cdn.example/api/v1/reports/abc.pdf"
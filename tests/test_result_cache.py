@@ -0,0 +1,32 @@
+import asyncio
+
+from app.core.config import settings
+from app.schemas.script import ScriptRequest
+from benchmarks import stubs
+
+
+def namespaces(cache) -> set:
+    return {key.split(":", 1)[0] for key in cache.backend._data}
+
+
+def test_invalidating_a_script_hash_drops_its_audit_table_and_report(container, monkeypatch):
+    stubs.install(gemini_latency=0, upload_latency=0, patch=monkeypatch.setattr)
+    pipeline = container.pipeline
+    # Table rebuilt by Gemini (cached under "scenes") and the PDF rendered now (cached under "report")
+    monkeypatch.setattr(settings, "LOCAL_PARSER_MIN_CONFIDENCE", 1.1)
+    monkeypatch.setattr(pipeline, "reports", None)
+    monkeypatch.setattr(pipeline, "revisions", None)
+    monkeypatch.setattr(pipeline, "hooks", None)
+    cache = container.result_cache
+
+    async def validate():
+        response = await pipeline.run(ScriptRequest(content=stubs.sample_script(4), fetch_competitors=False))
+        await container.report_uploader.stop()
+        return response
+
+    response = asyncio.run(validate())
+    assert {"audit", "scenes", "report"} <= namespaces(cache)
+
+    cache.invalidate(script_hash=response.script_hash)
+
+    assert not {"audit", "scenes", "report"} & namespaces(cache)
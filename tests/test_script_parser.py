@@ -0,0 +1,20 @@
+from app.services.script_parser import ScriptParser
+
+PDF_ROWS = """Scene # Visual Cue & AI Prompt Audio / Dialogue
+1 Close-up of a coffee cup on a desk.
+? VEO PROMPT: steam rising from a mug, morning light
+"Most mornings start wrong.
+2 minutes later, it's already too late."
+2 Wide shot of the desk at noon.
+? VEO PROMPT: sunlit desk, timelapse
+"Here's the fix."
+"""
+
+
+def test_dialogue_line_starting_with_the_next_number_does_not_start_a_row():
+    parsed = ScriptParser().parse(PDF_ROWS)
+
+    assert parsed.layout == "pdf_rows"
+    assert [scene["scene_number"] for scene in parsed.scenes] == [1, 2]
+    assert "2 minutes later, it's already too late." in parsed.scenes[0]["audio_dialogue"]
+    assert parsed.scenes[1]["visual_cue"].startswith("Wide shot of the desk at noon.")
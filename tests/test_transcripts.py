@@ -0,0 +1,31 @@
+import asyncio
+
+from app.services.transcripts import HookMiner, TranscriptCache
+
+
+class CountingFetcher:
+    def __init__(self):
+        self.fetched = []
+
+    async def fetch(self, video_id: str) -> list:
+        self.fetched.append(video_id)
+        return [{"start": 0.0, "duration": 40.0, "text": f"Opening of {video_id}."}]
+
+
+def test_a_video_listed_twice_is_mined_once_and_the_next_one_takes_its_place(tmp_path):
+    fetcher = CountingFetcher()
+    miner = HookMiner(fetcher, cache=TranscriptCache(str(tmp_path / "transcripts.sqlite3")), videos=2)
+    competitors = [
+        {"title": "A", "link": "https://www.youtube.com/watch?v=aaaaaaaaaaa"},
+        {"title": "A again", "link": "https://youtu.be/aaaaaaaaaaa"},
+        {"title": "B", "link": "https://www.youtube.com/watch?v=bbbbbbbbbbb"},
+    ]
+
+    hooks = asyncio.run(miner.mine(competitors))
+
+    # Fetched concurrently: any order
+    assert sorted(fetcher.fetched) == ["aaaaaaaaaaa", "bbbbbbbbbbb"]
+    assert [item["title"] for item in hooks] == ["A", "B"]
+    # Cached: mining again fetches nothing
+    asyncio.run(miner.mine(competitors))
+    assert len(fetcher.fetched) == 2